@@ -0,0 +1,112 @@
+"""Compare the character and token chunkers on the same pages.
+
+For each chunker it reports chunks per second and the truncation rate: the
+share of chunks longer than the model's ``max_seq_length`` (less its special
+tokens). Those chunks are cut by the encoder, so their tail is never embedded.
+Tokens are counted with the model's tokenizer, the same way for both chunkers.
+
+    python bench_chunking.py --folder ./data --max-tokens 256
+    python bench_chunking.py --synthetic-pages 500
+
+Prints one JSON object.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+from chunking import SPECIAL_TOKENS, ChunkerSpec, load_token_spans
+
+_WORDS = (
+    "the index stores vectors for every chunk of text and the service searches them by cosine similarity "
+    "while the pipeline parses files in worker processes encodes batches and writes records to the store "
+    "error E-102 configuration timeout retry backoff throughput latency tokenizer embedding dimension"
+).split()
+
+
+def load_pages(folder: str) -> List[SimpleNamespace]:
+    from langchain_community.document_loaders import PyPDFLoader
+
+    pages = []
+    for pdf_file in sorted(glob.glob(os.path.join(folder, "**", "*.pdf"), recursive=True)):
+        try:
+            pages.extend(PyPDFLoader(pdf_file).load())
+        except Exception as e:
+            print(f"Skipping {pdf_file}: {str(e)}", file=sys.stderr)
+    return pages
+
+
+def synthetic_pages(count: int, seed: int = 0) -> List[SimpleNamespace]:
+    """Pages of headings and paragraphs of random sentences."""
+    rng = random.Random(seed)
+    pages = []
+    for page in range(count):
+        blocks = []
+        for section in range(rng.randint(1, 3)):
+            blocks.append(f"Section {page}.{section} {rng.choice(_WORDS).title()}")
+            for _ in range(rng.randint(1, 4)):
+                sentences = [
+                    " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 30))).capitalize() + "."
+                    for _ in range(rng.randint(2, 8))
+                ]
+                blocks.append(" ".join(sentences))
+        pages.append(SimpleNamespace(page_content="\n\n".join(blocks), metadata={"page": page}))
+    return pages
+
+
+def measure(spec: ChunkerSpec, pages, token_spans, limit: int) -> dict:
+    chunker = spec.build()
+    started = time.perf_counter()
+    chunks = chunker.split_documents(pages)
+    seconds = time.perf_counter() - started
+
+    tokens = [len(token_spans(chunk.page_content)) for chunk in chunks]
+    truncated = [count for count in tokens if count > limit]
+    return {
+        "chunks": len(chunks),
+        "seconds": round(seconds, 4),
+        "chunks_per_second": round(len(chunks) / seconds, 1) if seconds > 0 else None,
+        "mean_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+        "max_tokens": max(tokens, default=0),
+        "truncation_rate": round(len(truncated) / len(chunks), 4) if chunks else 0.0,
+        "tokens_lost_to_truncation": sum(count - limit for count in truncated),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--folder", help="Folder of PDFs; synthetic pages are used when omitted")
+    parser.add_argument("--synthetic-pages", type=int, default=200)
+    parser.add_argument("--model", default=ChunkerSpec.model_name)
+    parser.add_argument("--max-tokens", type=int, default=ChunkerSpec.max_tokens, help="The model's max_seq_length")
+    parser.add_argument("--overlap-tokens", type=int, default=ChunkerSpec.overlap_tokens)
+    parser.add_argument("--chunk-size", type=int, default=ChunkerSpec.chunk_size)
+    parser.add_argument("--chunk-overlap", type=int, default=ChunkerSpec.chunk_overlap)
+    args = parser.parse_args()
+
+    pages = load_pages(args.folder) if args.folder else synthetic_pages(args.synthetic_pages)
+    token_spans = load_token_spans(args.model)
+    limit = args.max_tokens - SPECIAL_TOKENS
+
+    results = {"pages": len(pages), "model": args.model, "max_seq_length": args.max_tokens}
+    for kind in ("character", "token"):
+        spec = ChunkerSpec(
+            kind=kind,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            model_name=args.model,
+            max_tokens=args.max_tokens,
+            overlap_tokens=args.overlap_tokens
+        )
+        results[kind] = measure(spec, pages, token_spans, limit)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
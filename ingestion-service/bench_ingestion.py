@@ -0,0 +1,222 @@
+"""Throughput and latency benchmark of ``load_all_pdfs_from_folder``.
+
+Corpora of synthetic PDFs of increasing size are ingested into an
+``InMemoryVectorStore`` (``--store-latency`` simulates the network round
+trip of a real store). One engine is shared by every run and warmed up
+first, so model loading is not timed. Runs go without a manifest, so each
+of the ``--repeats`` runs of a corpus parses and embeds all of it.
+
+    python bench_ingestion.py --files 10,50,200 --output results.json
+    python bench_ingestion.py --output results.json --baseline baseline.json
+
+Writes JSON with, per corpus, texts (chunks) and files per second (median of
+the repeats) and p50/p95/p99 of the encode and upsert calls. With
+``--baseline``, every ``*_per_second`` that dropped or ``*_ms`` that grew by
+more than ``--tolerance`` counts as a regression and the exit status is 1.
+The embedding service's ``benchmark.py`` writes and compares the same format.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config import IngestionConfig
+from engine import IngestionEngine
+from ingestion import load_all_pdfs_from_folder
+from vector_store import InMemoryVectorStore
+
+_WORDS = (
+    "printer error code reset password network timeout driver update firmware cable battery screen display "
+    "install configure account login license server client request response queue retry memory disk sensor "
+    "replace check restart power button light warning manual section step contact support warranty model"
+).split()
+
+
+def write_pdf(path: str, pages: Sequence[Sequence[str]]) -> None:
+    """Write a minimal PDF with one Helvetica text line per string, readable by pypdf."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(pages):
+        text = " ".join(f"({line}) Tj T*" for line in lines)
+        content = f"BT /F1 10 Tf 12 TL 50 780 Td {text} ET".encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_corpus(folder: str, files: int, pages: int, seed: int = 0) -> None:
+    """``files`` PDFs of ``pages`` pages of random sentences; no two sentences repeat, so nothing is deduplicated."""
+    rng = random.Random(seed)
+    counter = 0
+    for i in range(files):
+        document = []
+        for _ in range(pages):
+            lines = []
+            for _ in range(40):
+                counter += 1
+                lines.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14))).capitalize() + f" {counter}.")
+            document.append(lines)
+        write_pdf(os.path.join(folder, f"doc{i:05d}.pdf"), document)
+
+
+def percentiles(samples: Sequence[float], prefix: str) -> Dict[str, float]:
+    """p50/p95/p99 of ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return {}
+    values = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {f"{prefix}p{q}_ms": round(float(v), 3) for q, v in zip((50, 95, 99), values)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline``, as readable lines."""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for key, value in current.items():
+            before = previous.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or before <= 0:
+                continue
+            change = (value - before) / before
+            if (key.endswith("_per_second") and change < -tolerance) or (key.endswith("_ms") and change > tolerance):
+                regressions.append(f"{name}.{key}: {before} -> {value} ({change:+.1%})")
+    return regressions
+
+
+class TimedEngine(IngestionEngine):
+    """Engine that records how long each encode call takes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encode_seconds: List[float] = []
+
+    def encode(self, texts, stats=None):
+        started = time.perf_counter()
+        vectors = super().encode(texts, stats)
+        self.encode_seconds.append(time.perf_counter() - started)
+        return vectors
+
+
+class TimedStore(InMemoryVectorStore):
+    """In-memory store that records how long each upsert call takes. Records are dropped to keep memory flat."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upsert_seconds: List[float] = []
+        self._timing_lock = threading.Lock()
+
+    def upsert(self, records) -> None:
+        started = time.perf_counter()
+        super().upsert(records)
+        with self._timing_lock:
+            self.upsert_seconds.append(time.perf_counter() - started)
+            self.records.clear()
+
+
+def bench_corpus(engine: TimedEngine, store: TimedStore, folder: str, repeats: int) -> dict:
+    runs = []
+    engine.encode_seconds.clear()
+    store.upsert_seconds.clear()
+    for _ in range(repeats):
+        runs.append(load_all_pdfs_from_folder(folder, engine=engine))
+    seconds = [max(summary.seconds, 1e-9) for summary in runs]
+    last = runs[-1]
+    result = {
+        "files": last.files_processed,
+        "pages": last.pages,
+        "texts": last.embeddings,
+        "texts_per_second": round(statistics.median(summary.embeddings / s for summary, s in zip(runs, seconds)), 2),
+        "files_per_second": round(statistics.median(summary.files_processed / s for summary, s in zip(runs, seconds)), 3),
+    }
+    result.update(percentiles(seconds, "run_"))
+    result.update(percentiles(engine.encode_seconds, "encode_"))
+    result.update(percentiles(store.upsert_seconds, "upsert_"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", default="10,50,200", help="Corpus sizes in files, comma-separated")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per file")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--store-latency", type=float, default=0.02, help="Seconds added to every upsert call")
+    parser.add_argument("--output", help="Write the results to this file as well as stdout")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before it counts as a regression")
+    args = parser.parse_args()
+
+    # No manifest, so every repeat embeds the whole corpus
+    config = replace(IngestionConfig.from_env(), manifest_path="", lexical_index=False)
+    store = TimedStore(latency=args.store_latency)
+    engine = TimedEngine(config, store=store)
+    engine.warmup()
+    engine.encode(["warm up the encoder"] * 8)
+
+    results = {
+        "suite": "ingestion",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": config.model_name,
+            "chunker": config.chunker,
+            "parse_workers": config.parse_workers,
+            "store_latency": args.store_latency,
+        },
+        "results": {},
+    }
+    try:
+        for files in (int(size) for size in args.files.split(",")):
+            with tempfile.TemporaryDirectory(prefix="bench-ingestion-") as folder:
+                write_corpus(folder, files, args.pages)
+                results["results"][f"ingest.files_{files}"] = bench_corpus(engine, store, folder, args.repeats)
+    finally:
+        engine.close()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Recall, memory and latency of the local index's quantization modes.
+
+Each mode indexes the same vectors, trains, and answers the same queries,
+with and without full-precision reranking. Recall@k is measured against exact
+search over the float32 vectors; the ``none`` row is the loss from
+IVF probing alone. Vectors are the encoder's embeddings of
+synthetic support text (``--dimension`` random clustered vectors with
+``--synthetic``, so no model is needed).
+
+    python bench_quantization.py --vectors 100000 --output quantization.json
+    python bench_quantization.py --synthetic --vectors 200000 --dimension 384
+
+Writes JSON with, per mode and rerank depth, recall@k, bytes per vector of
+the codes kept in memory, p50/p95/p99 search latency and training time.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, Sequence
+
+import numpy as np
+
+from local_index import QUANTIZATIONS, LocalIndex
+
+_WORDS = (
+    "printer error code reset password network timeout driver update firmware cable battery screen display "
+    "install configure account login license server client request response queue retry memory disk sensor "
+    "replace check restart power button light warning manual section step contact support warranty model"
+).split()
+
+
+def percentiles(samples: Sequence[float], prefix: str = "") -> Dict[str, float]:
+    """p50/p95/p99 of ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return {}
+    values = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {f"{prefix}p{q}_ms": round(float(v), 3) for q, v in zip((50, 95, 99), values)}
+
+
+def synthetic_vectors(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around a few hundred topics, roughly like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(count // 500, 16), dimension)).astype(np.float32)
+    vectors = topics[rng.integers(0, len(topics), count)] + 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def encoded_vectors(count: int, seed: int = 0) -> np.ndarray:
+    from config import IngestionConfig
+    from engine import IngestionEngine
+
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 40))) for _ in range(count)]
+    engine = IngestionEngine(replace(IngestionConfig.from_env(), vector_store="none", lexical_index=False))
+    try:
+        vectors = np.asarray(engine.encode(texts), dtype=np.float32)
+    finally:
+        engine.close()
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def bench_mode(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, mode: str, args) -> dict:
+    folder = tempfile.mkdtemp(prefix="bench-quantization-")
+    try:
+        index = LocalIndex(folder, quantization=mode, nprobe=args.nprobe, train_threshold=len(vectors) + 1)
+        for start in range(0, len(vectors), 10000):
+            index.upsert([
+                {"id": str(i), "values": vectors[i]} for i in range(start, min(start + 10000, len(vectors)))
+            ])
+        started = time.perf_counter()
+        index.train()
+        train_seconds = time.perf_counter() - started
+        report = index.memory_report()
+
+        results = {}
+        for rerank in args.rerank:
+            index.rerank = rerank
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                found = index.search(query, top_k=args.top_k)
+                latencies.append(time.perf_counter() - started)
+                hits += len({int(match["id"]) for match in found} & set(expected.tolist()))
+            results[f"{mode}.rerank_{rerank}"] = {
+                f"recall_at_{args.top_k}": round(hits / (len(queries) * args.top_k), 4),
+                "code_bytes_per_vector": report["code_bytes_per_vector"] or report["float32_bytes_per_vector"],
+                "resident_mb": round(report["resident_vector_bytes"] / 2 ** 20, 2),
+                "train_seconds": round(train_seconds, 2),
+                **percentiles(latencies, "search_"),
+            }
+            if mode == "none":
+                break
+        index.close()
+        return results
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--modes", default=",".join(QUANTIZATIONS), help="Comma-separated quantization modes")
+    parser.add_argument("--rerank", default="0,4,8", help="Rerank depths to measure, comma-separated")
+    parser.add_argument("--synthetic", action="store_true", help="Use random clustered vectors instead of the encoder")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--output", help="Write the results to this file as well as stdout")
+    args = parser.parse_args()
+    args.rerank = [int(value) for value in args.rerank.split(",")]
+
+    if args.synthetic:
+        data = synthetic_vectors(args.vectors + args.queries, args.dimension)
+    else:
+        data = encoded_vectors(args.vectors + args.queries)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.top_k]
+
+    results = {
+        "suite": "quantization",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "vectors": args.vectors,
+            "dimension": vectors.shape[1],
+            "nprobe": args.nprobe,
+            "synthetic": args.synthetic,
+        },
+        "results": {},
+    }
+    for mode in args.modes.split(","):
+        results["results"].update(bench_mode(vectors, queries, truth, mode.strip(), args))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
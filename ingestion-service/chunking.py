@@ -0,0 +1,247 @@
+"""Token-aware, structure-preserving chunking of page text.
+
+``CharacterTextSplitter`` counts characters, so a 1000-character chunk of
+dense text can run past the model's ``max_seq_length`` and be silently
+truncated by the encoder. ``TokenChunker`` counts the model's own tokens and
+packs whole sentences into chunks up to the token budget. Chunks never span
+two pages or cross a section heading, and only a sentence longer than the
+budget is cut mid-sentence, at a token boundary.
+
+Chunks are ``Chunk`` spans, ``(page text, start, end)``, over the page text
+they came from rather than copies of it. Their text is sliced only when it is
+read (for hashing, encoding and the stored metadata). Pickling a parsed file
+back from a worker process writes each page once, however many chunks
+overlap it.
+
+Token offsets come from the model's fast tokenizer (``tokenizers``, without
+torch). Where it cannot be loaded, words are approximated as one token per
+six characters, which slightly overcounts WordPiece.
+"""
+
+import bisect
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# [CLS] and [SEP] take two of the model's positions
+SPECIAL_TOKENS = 2
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+_HEADING = re.compile(
+    r"[ \t]*(?:#{1,6}[ \t]+\S[^\n]*"                     # Markdown heading
+    r"|(?:Chapter|Section|Part)[ \t]+\w+[^\n.!?]*"        # Chapter 3, Section 2.1 ...
+    r"|(?=[^\n]*[A-Z]{3})[A-Z][A-Z0-9&/,:()\- \t]+)[ \t]*$"  # ALL CAPS TITLE
+)
+_APPROXIMATE_TOKEN = re.compile(r"\w{1,6}|[^\w\s]")
+
+TokenSpans = Callable[[str], List[Tuple[int, int]]]
+
+
+class Chunk:
+    """A span of one page's text, read like a LangChain ``Document``."""
+
+    __slots__ = ("text", "start", "end", "page", "tokens")
+
+    def __init__(self, text: str, start: int, end: int, page, tokens: int = 0):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.page = page
+        self.tokens = tokens
+
+    @property
+    def page_content(self) -> str:
+        return self.text[self.start:self.end]
+
+    @property
+    def metadata(self) -> dict:
+        return {"page": self.page, "start_index": self.start}
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Chunk(page={self.page!r}, start={self.start}, end={self.end}, tokens={self.tokens})"
+
+
+@dataclass
+class _Unit:
+    """A sentence, heading or token window: the smallest piece a chunk is built from."""
+
+    start: int
+    end: int
+    tokens: int
+    heading: bool = False
+
+
+def _approximate_token_spans(text: str) -> List[Tuple[int, int]]:
+    return [match.span() for match in _APPROXIMATE_TOKEN.finditer(text)]
+
+
+@lru_cache(maxsize=4)
+def load_token_spans(model_name: str) -> TokenSpans:
+    """``text -> [(start, end), ...]`` character offsets of the model's tokens, without special tokens.
+
+    Cached per process, so each parse worker loads the tokenizer once.
+    """
+    try:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_pretrained(model_name)
+        tokenizer.no_truncation()
+    except Exception as e:
+        logger.warning(f"Could not load the {model_name} tokenizer ({str(e)}); approximating token counts")
+        return _approximate_token_spans
+
+    def token_spans(text: str) -> List[Tuple[int, int]]:
+        return [span for span in tokenizer.encode(text, add_special_tokens=False).offsets if span[1] > span[0]]
+
+    return token_spans
+
+
+class TokenChunker:
+    """Splits page text into chunks of at most ``max_tokens`` model tokens.
+
+    ``max_tokens`` is the model's ``max_seq_length``; the special tokens the
+    encoder adds are subtracted from it. Consecutive chunks within a section
+    share up to ``overlap_tokens`` tokens of whole trailing sentences.
+    """
+
+    def __init__(self, token_spans: TokenSpans, max_tokens: int = 256, overlap_tokens: int = 32):
+        self.token_spans = token_spans
+        self.budget = max(max_tokens - SPECIAL_TOKENS, 1)
+        self.overlap_tokens = max(min(overlap_tokens, self.budget // 2), 0)
+
+    def _units(self, text: str, token_starts: List[int], token_ends: List[int]) -> List[_Unit]:
+        """Headings, sentences and, for sentences over the budget, token windows, in page order."""
+
+        def count(start: int, end: int) -> int:
+            return bisect.bisect_left(token_starts, end) - bisect.bisect_left(token_starts, start)
+
+        def add(start: int, end: int, heading: bool = False) -> None:
+            # Trim surrounding whitespace so spans are tight
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start == end:
+                return
+            tokens = count(start, end)
+            if tokens <= self.budget:
+                units.append(_Unit(start, end, tokens, heading))
+                return
+            first = bisect.bisect_left(token_starts, start)
+            last = bisect.bisect_left(token_starts, end)
+            for i in range(first, last, self.budget):
+                j = min(i + self.budget, last)
+                units.append(_Unit(token_starts[i], min(token_ends[j - 1], end), j - i, heading and i == first))
+
+        def add_sentences(start: int, end: int) -> None:
+            for sentence in self._spans(text, _SENTENCE_END, start, end):
+                add(*sentence)
+
+        units: List[_Unit] = []
+        for paragraph_start, paragraph_end in self._spans(text, _PARAGRAPH_BREAK, 0, len(text)):
+            body_start = line_start = paragraph_start
+            while line_start < paragraph_end:
+                line_end = text.find("\n", line_start, paragraph_end)
+                if line_end == -1:
+                    line_end = paragraph_end
+                if line_end - line_start <= 100 and _HEADING.match(text, line_start, line_end):
+                    add_sentences(body_start, line_start)
+                    add(line_start, line_end, heading=True)
+                    body_start = line_end
+                line_start = line_end + 1
+            add_sentences(body_start, paragraph_end)
+        return units
+
+    @staticmethod
+    def _spans(text: str, separator: re.Pattern, start: int, end: int) -> List[Tuple[int, int]]:
+        """Pieces of ``text[start:end]`` split after each separator match."""
+        if start >= end:
+            return []
+        spans = []
+        for match in separator.finditer(text, start, end):
+            spans.append((start, match.end()))
+            start = match.end()
+        if start < end:
+            spans.append((start, end))
+        return spans
+
+    def split_text(self, text: str, page=0) -> List[Chunk]:
+        spans = self.token_spans(text)
+        token_starts = [span[0] for span in spans]
+        token_ends = [span[1] for span in spans]
+        units = self._units(text, token_starts, token_ends)
+
+        chunks: List[Chunk] = []
+        current: List[_Unit] = []
+        tokens = 0
+
+        def flush(keep_overlap: bool) -> List[_Unit]:
+            if current:
+                chunks.append(Chunk(text, current[0].start, current[-1].end, page, tokens))
+            if not keep_overlap:
+                return []
+            # Whole trailing sentences, up to the overlap budget
+            carried, carried_tokens = [], 0
+            for unit in reversed(current[1:]):
+                if carried_tokens + unit.tokens > self.overlap_tokens:
+                    break
+                carried.insert(0, unit)
+                carried_tokens += unit.tokens
+            return carried
+
+        for unit in units:
+            if unit.heading and current:
+                current = flush(keep_overlap=False)
+                tokens = 0
+            elif tokens + unit.tokens > self.budget and current:
+                current = flush(keep_overlap=True)
+                tokens = sum(carried.tokens for carried in current)
+                if tokens + unit.tokens > self.budget:
+                    current, tokens = [], 0
+            current.append(unit)
+            tokens += unit.tokens
+        flush(keep_overlap=False)
+        return chunks
+
+    def split_documents(self, documents: Sequence) -> List[Chunk]:
+        """Chunk LangChain documents page by page, like ``CharacterTextSplitter.split_documents``."""
+        chunks = []
+        for document in documents:
+            chunks.extend(self.split_text(document.page_content, page=document.metadata.get("page", 0)))
+        return chunks
+
+
+@dataclass(frozen=True)
+class ChunkerSpec:
+    """Which splitter to use and its settings; small and picklable for the parse workers."""
+
+    kind: str = "token"
+    chunk_size: int = 1000
+    chunk_overlap: int = 100
+    model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    max_tokens: int = 256
+    overlap_tokens: int = 32
+
+    def build(self):
+        return _build_chunker(self)
+
+
+@lru_cache(maxsize=4)
+def _build_chunker(spec: ChunkerSpec):
+    """The splitter for a spec: ``token`` (``TokenChunker``) or ``character`` (``CharacterTextSplitter``)."""
+    if spec.kind == "character":
+        from langchain_text_splitters import CharacterTextSplitter
+
+        # start_index gives each chunk a stable character offset within its page
+        return CharacterTextSplitter(chunk_size=spec.chunk_size, chunk_overlap=spec.chunk_overlap, add_start_index=True)
+    if spec.kind == "token":
+        return TokenChunker(load_token_spans(spec.model_name), max_tokens=spec.max_tokens, overlap_tokens=spec.overlap_tokens)
+    raise ValueError(f"Unknown chunker '{spec.kind}', expected 'token' or 'character'")
@@ -0,0 +1,142 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from chunking import ChunkerSpec
+from lexical_index import LEXICAL_INDEX_FILE
+
+
+def normalize_index_name(index_name: Optional[str]) -> Optional[str]:
+    """Normalize an index name for Pinecone (lowercase, alphanumeric + hyphens only)."""
+    if not index_name:
+        return index_name
+    index_name = index_name.lower().replace(' ', '-').replace('_', '-')
+    return re.sub(r'[^a-z0-9-]', '', index_name)
+
+
+@dataclass
+class IngestionConfig:
+    """Settings for one ingestion run, read from the environment by default."""
+
+    # Pinecone
+    pinecone_api_key: Optional[str] = None
+    pinecone_env: Optional[str] = None
+    index_name: Optional[str] = None
+
+    # Where vectors go: auto (Pinecone if configured, else local), pinecone, local or none
+    vector_store: str = "auto"
+    local_index_path: str = "vector_index"
+    local_index_nprobe: int = 16
+    # Compact codes searched in the local index: none, float16, int8 or pq; empty keeps the index's own
+    local_index_quantization: str = ""
+    # Candidates per result rescored at full precision after a quantized search; 0 turns reranking off
+    local_index_rerank: int = 8
+    # BM25 index of chunk text, kept in LOCAL_INDEX_PATH whichever vector store is used
+    lexical_index: bool = True
+
+    # Embedding model and batch shape
+    model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embed_batch_size: int = 32
+    embed_max_tokens_per_batch: int = 4096
+    # Chunks gathered from any number of files before they are encoded together
+    embed_buffer_chunks: int = 512
+
+    # Chunking: token (model tokens, sentence and section aware) or character
+    # (CharacterTextSplitter). chunk_size and chunk_overlap are characters and
+    # apply to the character splitter; chunk_max_tokens is the model's max_seq_length
+    chunker: str = "token"
+    chunk_size: int = 1000
+    chunk_overlap: int = 100
+    chunk_max_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+
+    # Chunks repeating an already embedded one reuse its vector. dedup_threshold
+    # is the share of SimHash bits near-duplicates agree on; 1.0 matches exact duplicates only
+    dedup: bool = True
+    dedup_threshold: float = 0.95
+
+    # PDF parsing runs in this many worker processes (1 parses in-process)
+    parse_workers: int = 0
+    parse_start_method: str = "spawn"
+
+    # Upserts: records per batch, capped by the batch's estimated payload size
+    # (Pinecone rejects requests over 2 MB), batches in flight at once, and
+    # retries with exponential backoff before a batch counts as failed
+    upsert_batch_size: int = 100
+    upsert_max_bytes: int = 2_000_000
+    upsert_concurrency: int = 4
+    upsert_retries: int = 3
+    upsert_retry_backoff: float = 0.5
+
+    # SQLite manifest of ingested files and chunks for incremental re-runs; empty disables it
+    manifest_path: str = ".ingestion_manifest.db"
+
+    # Bounded hand-offs between pipeline stages: parsed files waiting to be
+    # embedded, and upsert batches waiting to be written
+    parse_queue_size: int = 4
+    upsert_queue_size: int = 8
+
+    # Gateway jobs: SQLite table of submitted runs, and how many run at once
+    jobs_path: str = ".ingestion_jobs.db"
+    max_concurrent_jobs: int = 1
+
+    def __post_init__(self):
+        if self.parse_workers <= 0:
+            self.parse_workers = max((os.cpu_count() or 2) - 1, 1)
+
+    @property
+    def chunker_spec(self) -> ChunkerSpec:
+        return ChunkerSpec(
+            kind=self.chunker,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            model_name=self.model_name,
+            max_tokens=self.chunk_max_tokens,
+            overlap_tokens=self.chunk_overlap_tokens
+        )
+
+    @property
+    def lexical_index_path(self) -> str:
+        return os.path.join(self.local_index_path, LEXICAL_INDEX_FILE)
+
+    @property
+    def pinecone_enabled(self) -> bool:
+        return bool(self.pinecone_api_key and self.pinecone_env and self.index_name)
+
+    @classmethod
+    def from_env(cls) -> "IngestionConfig":
+        return cls(
+            pinecone_api_key=os.environ.get("PINECONE_API_KEY"),
+            pinecone_env=os.environ.get("PINECONE_ENVIRONMENT"),
+            index_name=normalize_index_name(os.environ.get("INDEX_NAME")),
+            vector_store=os.environ.get("VECTOR_STORE", cls.vector_store).lower(),
+            local_index_path=os.environ.get("LOCAL_INDEX_PATH", cls.local_index_path),
+            local_index_nprobe=int(os.environ.get("LOCAL_INDEX_NPROBE", cls.local_index_nprobe)),
+            local_index_quantization=os.environ.get("LOCAL_INDEX_QUANTIZATION", cls.local_index_quantization).lower(),
+            local_index_rerank=int(os.environ.get("LOCAL_INDEX_RERANK", cls.local_index_rerank)),
+            lexical_index=os.environ.get("LEXICAL_INDEX", "true").lower() in ("1", "true", "yes"),
+            model_name=os.environ.get("EMBED_MODEL_NAME", cls.model_name),
+            embed_batch_size=int(os.environ.get("EMBED_BATCH_SIZE", cls.embed_batch_size)),
+            embed_max_tokens_per_batch=int(os.environ.get("EMBED_MAX_TOKENS_PER_BATCH", cls.embed_max_tokens_per_batch)),
+            embed_buffer_chunks=int(os.environ.get("EMBED_BUFFER_CHUNKS", cls.embed_buffer_chunks)),
+            chunk_size=int(os.environ.get("CHUNK_SIZE", cls.chunk_size)),
+            chunk_overlap=int(os.environ.get("CHUNK_OVERLAP", cls.chunk_overlap)),
+            chunker=os.environ.get("CHUNKER", cls.chunker).lower(),
+            chunk_max_tokens=int(os.environ.get("CHUNK_MAX_TOKENS", cls.chunk_max_tokens)),
+            chunk_overlap_tokens=int(os.environ.get("CHUNK_OVERLAP_TOKENS", cls.chunk_overlap_tokens)),
+            dedup=os.environ.get("DEDUP", "true").lower() in ("1", "true", "yes"),
+            dedup_threshold=float(os.environ.get("DEDUP_THRESHOLD", cls.dedup_threshold)),
+            parse_workers=int(os.environ.get("PARSE_WORKERS", cls.parse_workers)),
+            parse_start_method=os.environ.get("PARSE_START_METHOD", cls.parse_start_method),
+            upsert_batch_size=int(os.environ.get("UPSERT_BATCH_SIZE", cls.upsert_batch_size)),
+            upsert_max_bytes=int(os.environ.get("UPSERT_MAX_BYTES", cls.upsert_max_bytes)),
+            upsert_concurrency=int(os.environ.get("UPSERT_CONCURRENCY", cls.upsert_concurrency)),
+            upsert_retries=int(os.environ.get("UPSERT_RETRIES", cls.upsert_retries)),
+            upsert_retry_backoff=float(os.environ.get("UPSERT_RETRY_BACKOFF", cls.upsert_retry_backoff)),
+            manifest_path=os.environ.get("MANIFEST_PATH", cls.manifest_path),
+            parse_queue_size=int(os.environ.get("PARSE_QUEUE_SIZE", cls.parse_queue_size)),
+            upsert_queue_size=int(os.environ.get("UPSERT_QUEUE_SIZE", cls.upsert_queue_size)),
+            jobs_path=os.environ.get("JOBS_PATH", cls.jobs_path),
+            max_concurrent_jobs=int(os.environ.get("MAX_CONCURRENT_JOBS", cls.max_concurrent_jobs)),
+        )
@@ -0,0 +1,214 @@
+"""Exact and near-duplicate detection for chunks, before they are embedded.
+
+Support manuals repeat themselves: headers, footers, legal notices, whole
+chapters copied between product versions. A chunk whose normalized text was
+already embedded, or whose SimHash lies within a few bits of one that was,
+reuses that chunk's vector id instead of being encoded and upserted again.
+
+SimHash fingerprints are 64 bits over word 3-gram shingles; the share of
+matching bits tracks how much of the text two chunks share. A fingerprint
+split into ``d + 1`` bands agrees exactly on at least one band with any
+fingerprint within ``d`` bits of it, so only chunks sharing a band are compared.
+Chunks of fewer than ``MIN_NEAR_WORDS`` words only match exactly; their
+fingerprints are too coarse to tell apart.
+
+Chunks stored by earlier runs are looked up in the manifest, band by band,
+rather than loaded, so memory does not grow with the corpus.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+EXACT = "exact"
+NEAR = "near"
+
+SHINGLE_SIZE = 3
+MIN_NEAR_WORDS = 8
+
+_WORD = re.compile(r"\w+")
+
+# (digest of the normalized text, SimHash or None for short chunks)
+Signature = Tuple[str, Optional[int]]
+
+
+def text_digest(text: str) -> str:
+    """Digest of the text lowercased with whitespace collapsed."""
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()[:32]
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of the text's word 3-grams, or None below ``MIN_NEAR_WORDS`` words."""
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_NEAR_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles),
+        dtype="<u8",
+        count=len(shingles)
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def chunk_signature(text: str) -> Signature:
+    return text_digest(text), simhash(text)
+
+
+class DedupEntry:
+    """A chunk whose vector others may reuse; ``vector_id`` is None until it is written."""
+
+    __slots__ = ("signature", "vector_id", "failed", "waiters")
+
+    def __init__(self, signature: Signature, vector_id: Optional[str] = None):
+        self.signature = signature
+        self.vector_id = vector_id
+        self.failed = False
+        self.waiters: list = []
+
+    @property
+    def settled(self) -> bool:
+        return self.vector_id is not None or self.failed
+
+
+class ChunkDeduplicator:
+    """Index of chunks already embedded or being embedded, by text digest and SimHash.
+
+    Chunks count as near-duplicates when at least ``threshold`` of their
+    fingerprint bits agree; 1.0 only matches exact duplicates. Vector ids handed
+    out to duplicates, and those written during the run, are protected:
+    ``retire`` never returns them for deletion. Thread-safe.
+
+    Chunks of this run are indexed in memory. ``stored`` finds those already in
+    the store: an object with ``index_bands``, ``find_text_hash`` and
+    ``find_near`` like ``Manifest``.
+    """
+
+    def __init__(self, threshold: float = 0.95, stored=None):
+        self.max_distance = int((1.0 - threshold) * 64 + 1e-9) if threshold < 1.0 else None
+        self._exact: Dict[str, DedupEntry] = {}
+        self._bands: List[Dict[int, List[DedupEntry]]] = []
+        self._band_bits: List[Tuple[int, int]] = []
+        if self.max_distance is not None:
+            count = self.max_distance + 1
+            edges = [round(i * 64 / count) for i in range(count + 1)]
+            self._band_bits = [(edges[i], (1 << (edges[i + 1] - edges[i])) - 1) for i in range(count)]
+            self._bands = [{} for _ in range(count)]
+        self._by_vector: Dict[str, List[DedupEntry]] = {}
+        self._protected: Set[str] = set()
+        # Stored vectors about to be deleted, no longer offered to duplicates
+        self._retired: Set[str] = set()
+        self._stored = stored
+        self._lock = threading.Lock()
+        if stored is not None and self._band_bits:
+            stored.index_bands(self._band_bits)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._by_vector.values())
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> shift) & mask for shift, mask in self._band_bits]
+
+    def _insert(self, entry: DedupEntry) -> None:
+        digest, fingerprint = entry.signature
+        self._exact.setdefault(digest, entry)
+        if fingerprint is not None and self._bands:
+            for band, key in zip(self._bands, self._band_keys(fingerprint)):
+                band.setdefault(key, []).append(entry)
+
+    def _remove(self, entry: DedupEntry) -> None:
+        digest, fingerprint = entry.signature
+        if self._exact.get(digest) is entry:
+            del self._exact[digest]
+        if fingerprint is not None and self._bands:
+            for band, key in zip(self._bands, self._band_keys(fingerprint)):
+                bucket = band.get(key, [])
+                if entry in bucket:
+                    bucket.remove(entry)
+                if not bucket:
+                    band.pop(key, None)
+
+    def _match(self, signature: Signature) -> Optional[Tuple[str, DedupEntry]]:
+        digest, fingerprint = signature
+        entry = self._exact.get(digest)
+        if entry is not None:
+            return EXACT, entry
+        if self._stored is not None:
+            vector_id = self._stored.find_text_hash(digest)
+            if vector_id is not None and vector_id not in self._retired:
+                return EXACT, DedupEntry(signature, vector_id)
+        if fingerprint is None or not self._bands:
+            return None
+        best, best_distance = None, self.max_distance + 1
+        keys = self._band_keys(fingerprint)
+        for band, key in zip(self._bands, keys):
+            for candidate in band.get(key, ()):
+                distance = (candidate.signature[1] ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        if self._stored is not None:
+            for candidate, vector_id in self._stored.find_near(self._band_bits, keys):
+                distance = (candidate ^ fingerprint).bit_count()
+                if distance < best_distance and vector_id not in self._retired:
+                    best, best_distance = DedupEntry((None, candidate), vector_id), distance
+        return (NEAR, best) if best is not None else None
+
+    def find(self, signature: Signature) -> Optional[Tuple[str, DedupEntry]]:
+        """``(kind, entry)`` of the chunk this one duplicates, or None.
+
+        The entry's ``vector_id`` is None while that chunk is still being
+        written; ``wait`` on it to learn the outcome.
+        """
+        with self._lock:
+            match = self._match(signature)
+            if match is not None and match[1].vector_id is not None:
+                self._protected.add(match[1].vector_id)
+            return match
+
+    def wait(self, entry: DedupEntry, waiter) -> bool:
+        """True if the entry is settled; otherwise ``waiter`` is handed back by ``resolve`` or ``discard``."""
+        with self._lock:
+            if not entry.settled:
+                entry.waiters.append(waiter)
+            return entry.settled
+
+    def add(self, signature: Signature) -> DedupEntry:
+        """Index a chunk that is about to be embedded, for later chunks to reuse."""
+        with self._lock:
+            entry = DedupEntry(signature)
+            self._insert(entry)
+            return entry
+
+    def resolve(self, entry: DedupEntry, vector_id: str) -> list:
+        """Record that the chunk was written as ``vector_id``; returns the waiters that reuse it."""
+        with self._lock:
+            entry.vector_id = vector_id
+            self._by_vector.setdefault(vector_id, []).append(entry)
+            self._protected.add(vector_id)
+            self._retired.discard(vector_id)
+            waiters, entry.waiters = entry.waiters, []
+            return waiters
+
+    def discard(self, entry: DedupEntry) -> list:
+        """Forget a chunk that failed to be written; returns the waiters that were going to reuse it."""
+        with self._lock:
+            self._remove(entry)
+            entry.failed = True
+            waiters, entry.waiters = entry.waiters, []
+            return waiters
+
+    def retire(self, vector_ids: Sequence[str]) -> List[str]:
+        """Stop offering vectors that are about to be deleted; returns those no duplicate relies on."""
+        with self._lock:
+            for vector_id in vector_ids:
+                for entry in self._by_vector.pop(vector_id, []):
+                    self._remove(entry)
+                if self._stored is not None:
+                    self._retired.add(vector_id)
+            return [vector_id for vector_id in vector_ids if vector_id not in self._protected]
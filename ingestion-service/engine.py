@@ -0,0 +1,107 @@
+"""Long-lived ingestion resources shared by every run.
+
+Loading the sentence-transformer model, connecting to the vector store and
+validating its index take seconds, so the gateway creates one
+``IngestionEngine`` at startup and every run reuses it. Both the model and
+the store are created on first use and then kept. A store that failed to open
+is retried by the next run. A store passed in, such as ``InMemoryVectorStore``
+for benchmarks, is used instead of the configured one and owned by the caller.
+"""
+
+import logging
+import threading
+from typing import List, Optional
+
+from sentence_transformers import SentenceTransformer
+
+from bucketing import PaddingStats, encode_bucketed
+from config import IngestionConfig
+from vector_store import VectorStore, create_vector_store, resolve_store_name
+
+logger = logging.getLogger(__name__)
+
+
+class EngineEmbeddings:
+    """LangChain-style embeddings backed by the engine's model."""
+
+    def __init__(self, engine: "IngestionEngine"):
+        self.engine = engine
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.engine.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.engine.encode([text])[0].tolist()
+
+
+class IngestionEngine:
+    """Owns the embedding model, its embeddings wrapper and the vector store handle. Thread-safe."""
+
+    def __init__(self, config: Optional[IngestionConfig] = None, store: Optional[VectorStore] = None):
+        self.config = config or IngestionConfig.from_env()
+        self.embeddings = EngineEmbeddings(self)
+        self._model: Optional[SentenceTransformer] = None
+        self._store: Optional[VectorStore] = store
+        self._owns_store = store is None
+        self._store_dimension: Optional[int] = None
+        self._model_lock = threading.Lock()
+        self._store_lock = threading.Lock()
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    logger.info(f"Loading sentence transformer model {self.config.model_name}...")
+                    self._model = SentenceTransformer(self.config.model_name)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], stats: Optional[PaddingStats] = None):
+        """Encode texts in token-length buckets so short chunks are not padded to long ones."""
+        model = self.model
+        return encode_bucketed(
+            lambda batch: model.encode(batch, batch_size=len(batch)),
+            texts,
+            tokenizer=model.tokenizer,
+            max_seq_length=model.max_seq_length,
+            max_batch_size=self.config.embed_batch_size,
+            max_tokens_per_batch=self.config.embed_max_tokens_per_batch,
+            stats=stats
+        )
+
+    def store(self, dimension: Optional[int] = None) -> Optional[VectorStore]:
+        """The shared vector store, opened on first use, or None if storage is disabled or unavailable.
+
+        The index is validated against ``dimension`` once per dimension, not on every run.
+        """
+        with self._store_lock:
+            if self._store is None:
+                try:
+                    self._store = create_vector_store(self.config, dimension)
+                except Exception as e:
+                    logger.error(f"Failed to initialize {resolve_store_name(self.config)} vector store: {str(e)}")
+                    return None
+                self._store_dimension = dimension
+            if self._store is not None and dimension is not None and dimension != self._store_dimension:
+                self._store.ensure_dimension(dimension)
+                self._store_dimension = dimension
+            return self._store
+
+    def warmup(self) -> None:
+        """Load the model and open and validate the store ahead of the first run."""
+        self.store(self.dimension)
+
+    def close(self) -> None:
+        with self._store_lock:
+            if self._store is not None and self._owns_store:
+                self._store.close()
+                self._store = None
+                self._store_dimension = None
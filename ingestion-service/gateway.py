@@ -1,30 +1,87 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
+import asyncio
 import os
 from typing import Optional, List
 import logging
+from config import IngestionConfig
+from engine import IngestionEngine
 from ingestion import load_all_pdfs_from_folder, setup_logger
+from jobs import FINISHED, JobConflictError, JobManager, JobStore
+from pipeline import IngestionCancelled
+import metrics
 
 # Setup logger
 logger = setup_logger()
 
+job_manager: Optional[JobManager] = None
+engine: Optional[IngestionEngine] = None
+
+
+def run_ingestion_job(job, on_progress, cancel):
+    """Run one job on a worker thread of the job manager, sharing the gateway's engine."""
+    logger.info(f"Job {job.id}: Starting ingestion from {job.folder_path}")
+    return load_all_pdfs_from_folder(
+        job.folder_path, dry_run=job.dry_run, force=job.force, on_progress=on_progress, cancel=cancel, engine=engine
+    )
+
+
+def _warmup(engine: IngestionEngine) -> None:
+    try:
+        engine.warmup()
+    except Exception as e:
+        # Runs retry on their own; a store that is down now may be back by then
+        logger.warning(f"Ingestion engine warmup failed: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared ingestion engine and job manager, and release them on shutdown.
+    
+    The model is loaded and the vector store opened and validated once here,
+    instead of at the start of every run. Jobs interrupted by the last shutdown
+    are resumed.
+    """
+    global job_manager, engine
+    config = IngestionConfig.from_env()
+    engine = IngestionEngine(config)
+    await asyncio.to_thread(_warmup, engine)
+    job_manager = JobManager(JobStore(config.jobs_path), run_ingestion_job, max_concurrent=config.max_concurrent_jobs)
+    job_manager.resume()
+    
+    yield
+    
+    await asyncio.to_thread(job_manager.shutdown)
+    await asyncio.to_thread(engine.close)
+    job_manager = None
+    engine = None
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Ingestion Service Gateway",
     description="API Gateway for PDF ingestion and vector embedding generation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 class IngestionRequest(BaseModel):
     folder_path: str = "data"
     background: bool = False
+    # Report what would change without embedding or writing anything
+    dry_run: bool = False
+    # Re-ingest every file, ignoring the manifest
+    force: bool = False
 
 class IngestionResponse(BaseModel):
     message: str
     status: str
     documents_processed: Optional[int] = None
     task_id: Optional[str] = None
+    summary: Optional[dict] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -40,8 +97,24 @@ async def health_check():
         version="1.0.0"
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics: pages, chunks, embeddings and upserts totals plus per-stage timings"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def _get_job(task_id: str):
+    job = job_manager.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown task id '{task_id}'")
+    return job
+
 @app.post("/ingest", response_model=IngestionResponse)
-async def ingest_pdfs(request: IngestionRequest, background_tasks: BackgroundTasks):
+async def ingest_pdfs(request: IngestionRequest):
+    """Queue an ingestion job; wait for it unless ``background`` is set.
+    
+    Either way the run executes on the job manager's worker pool, never on the
+    event loop, and counts against the concurrent job limit.
+    """
     try:
         folder_path = request.folder_path
         
@@ -52,34 +125,36 @@ async def ingest_pdfs(request: IngestionRequest, background_tasks: BackgroundTas
                 detail=f"Folder path '{folder_path}' does not exist"
             )
         
+        try:
+            job, future = job_manager.submit(folder_path, dry_run=request.dry_run, force=request.force)
+        except JobConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        metrics.RUNS.labels("background" if request.background else "sync").inc()
+        
         if request.background:
-            # Process in background
-            task_id = f"ingest_{os.getpid()}_{os.getppid()}"
-            background_tasks.add_task(process_ingestion_background, folder_path, task_id)
-            
-            logger.info(f"Started background ingestion task: {task_id}")
+            logger.info(f"Started background ingestion task: {job.id}")
             return IngestionResponse(
-                message="Ingestion started in background",
-                status="started",
-                task_id=task_id
+                message="Ingestion queued in background",
+                status=job.status,
+                task_id=job.id
             )
         else:
-            # Process synchronously
-            logger.info(f"Starting synchronous ingestion from folder: {folder_path}")
-            documents = load_all_pdfs_from_folder(folder_path)
+            logger.info(f"Starting synchronous ingestion from folder: {folder_path} (task {job.id})")
+            summary = await asyncio.wrap_future(future)
             
             # Count PDF files processed, not text chunks
-            pdf_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.pdf')]
-            pdf_count = len(pdf_files)
-            
             return IngestionResponse(
-                message="Ingestion completed successfully",
+                message="Dry run completed, nothing was written" if request.dry_run else "Ingestion completed successfully",
                 status="completed",
-                documents_processed=pdf_count
+                documents_processed=summary.files_processed,
+                task_id=job.id,
+                summary=summary.as_dict()
             )
             
     except HTTPException:
         raise
+    except IngestionCancelled:
+        raise HTTPException(status_code=409, detail="Ingestion was cancelled")
     except Exception as e:
         logger.error(f"Unexpected error during ingestion: {str(e)}")
         raise HTTPException(
@@ -90,41 +165,35 @@ async def ingest_pdfs(request: IngestionRequest, background_tasks: BackgroundTas
 @app.get("/ingest/status/{task_id}")
 async def get_ingestion_status(task_id: str):
     """
-    Get status of a background ingestion task
+    Get status of an ingestion task
     
     Args:
         task_id: The task ID returned from the ingest endpoint
     
     Returns:
-        Status information about the task
+        The job's status (queued, running, completed, failed or cancelled),
+        progress counts, throughput, an ETA while running, and the final
+        summary or error
     """
-    # This is a simplified status endpoint
-    # In a production environment, you'd want to implement proper task tracking
-    return {
-        "task_id": task_id,
-        "status": "processing",  # Simplified - implement proper task state management
-        "message": "Task is being processed"
-    }
+    return _get_job(task_id).as_dict()
+
+@app.get("/ingest/jobs")
+async def list_ingestion_jobs(limit: int = 50, status: Optional[str] = None):
+    """Most recent ingestion jobs first, optionally only those with the given status"""
+    return {"jobs": [job.as_dict() for job in job_manager.list(limit, status)]}
 
-async def process_ingestion_background(folder_path: str, task_id: str):
+@app.post("/ingest/jobs/{task_id}/cancel")
+async def cancel_ingestion_job(task_id: str):
     """
-    Background task for processing ingestion
+    Cancel a queued or running ingestion task
     
-    Args:
-        folder_path: Path to the folder containing PDFs
-        task_id: Unique identifier for the task
+    A queued task never starts. A running one stops after the vectors already
+    in flight are written; files it did not finish are picked up by the next run.
     """
-    try:
-        logger.info(f"Background task {task_id}: Starting ingestion from {folder_path}")
-        documents = load_all_pdfs_from_folder(folder_path)
-        
-        # Count PDF files processed, not text chunks
-        pdf_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.pdf')]
-        pdf_count = len(pdf_files)
-        
-        logger.info(f"Background task {task_id}: Completed successfully. Processed {pdf_count} PDF files")
-    except Exception as e:
-        logger.error(f"Background task {task_id}: Failed with error: {str(e)}")
+    job = _get_job(task_id)
+    if job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Task '{task_id}' already {job.status}")
+    return job_manager.cancel(task_id).as_dict()
 
 @app.get("/")
 async def root():
@@ -134,8 +203,11 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "ingest": "/ingest",
-            "status": "/ingest/status/{task_id}"
+            "status": "/ingest/status/{task_id}",
+            "jobs": "/ingest/jobs",
+            "cancel": "/ingest/jobs/{task_id}/cancel"
         }
     }
 
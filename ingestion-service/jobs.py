@@ -0,0 +1,332 @@
+"""Background ingestion jobs: a persistent job table and a bounded worker pool.
+
+Every run submitted through the gateway becomes a job with a unique id, stored
+in a SQLite table (``JOBS_PATH``) together with its progress, final summary or
+error. Jobs run on a pool of ``MAX_CONCURRENT_JOBS`` threads, off the event
+loop, so a large ingest does not hold up the gateway's other requests; jobs
+beyond the limit wait in the queue.
+
+Jobs survive a restart: any job still queued or running when the gateway
+stopped is queued again when it starts. Re-running is cheap because the
+manifest lets an interrupted run skip every file it already finished.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+from pipeline import IngestionCancelled, IngestionSummary
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+logger = logging.getLogger(__name__)
+
+
+class JobConflictError(RuntimeError):
+    """Raised when a job is submitted for a folder that already has one queued or running."""
+
+
+def folder_key(folder_path: str) -> str:
+    """The folder a job ingests, normalised so different spellings of one path compare equal."""
+    return os.path.normcase(os.path.realpath(folder_path))
+
+
+@dataclass
+class Job:
+    """One ingestion run and how far it got."""
+
+    id: str
+    folder_path: str
+    dry_run: bool = False
+    force: bool = False
+    status: str = QUEUED
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: dict = field(default_factory=dict)
+    summary: Optional[dict] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def as_dict(self) -> dict:
+        """The stored fields plus elapsed time, throughput and an ETA while running."""
+        data = asdict(self)
+        if self.started_at is None:
+            return data
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        files_total = self.progress.get("files_to_process", 0)
+        files_done = self.progress.get("files_processed", 0) + self.progress.get("files_failed", 0)
+        data["elapsed_seconds"] = round(elapsed, 3)
+        if elapsed > 0:
+            data["files_per_second"] = round(files_done / elapsed, 3)
+            data["chunks_per_second"] = round(self.progress.get("embeddings", 0) / elapsed, 3)
+            data["vectors_per_second"] = round(self.progress.get("upserts", 0) / elapsed, 3)
+        if self.status == RUNNING and files_done and files_total > files_done:
+            data["eta_seconds"] = round((files_total - files_done) * elapsed / files_done, 1)
+        return data
+
+
+def progress_from_summary(summary: IngestionSummary) -> dict:
+    """The summary counts a job reports while it runs."""
+    progress = summary.as_dict()
+    progress["files_to_process"] = summary.files_new + summary.files_modified
+    return progress
+
+
+class JobStore:
+    """SQLite table of jobs. Thread-safe."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, folder_path TEXT NOT NULL, dry_run INTEGER NOT NULL, force INTEGER NOT NULL, "
+                "status TEXT NOT NULL, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                "progress TEXT, summary TEXT, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+
+    @staticmethod
+    def _to_job(row) -> Job:
+        return Job(
+            id=row[0], folder_path=row[1], dry_run=bool(row[2]), force=bool(row[3]), status=row[4],
+            created_at=row[5], started_at=row[6], finished_at=row[7],
+            progress=json.loads(row[8]) if row[8] else {},
+            summary=json.loads(row[9]) if row[9] else None,
+            error=row[10], cancel_requested=bool(row[11])
+        )
+
+    def save(self, job: Job) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, folder_path, dry_run, force, status, created_at, started_at, "
+                "finished_at, progress, summary, error, cancel_requested) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.folder_path, int(job.dry_run), int(job.force), job.status, job.created_at, job.started_at,
+                 job.finished_at, json.dumps(job.progress), json.dumps(job.summary) if job.summary is not None else None,
+                 job.error, int(job.cancel_requested))
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Job]:
+        """Most recent jobs first."""
+        query, params = "SELECT * FROM jobs", []
+        if status:
+            query, params = query + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", params + [limit]).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def unfinished(self) -> List[Job]:
+        """Queued and running jobs, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# Runs one job: (job, on_progress, cancel) -> summary
+JobRunner = Callable[[Job, Callable[[IngestionSummary], None], threading.Event], IngestionSummary]
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and records their state in a ``JobStore``.
+
+    Progress is written to the store at most every ``progress_interval``
+    seconds, so a fast pipeline is not slowed down by SQLite writes.
+
+    At most one job per folder is queued or running at a time: two runs over
+    one folder would diff it against the same manifest entries and write the
+    same vectors, so a second one is rejected with ``JobConflictError``.
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, max_concurrent: int = 1, progress_interval: float = 1.0):
+        self.store = store
+        self.runner = runner
+        self.max_concurrent = max(max_concurrent, 1)
+        self.progress_interval = progress_interval
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="ingest-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        # Folder key -> id of the unfinished job ingesting it
+        self._folders: Dict[str, str] = {}
+        self._shutting_down = False
+
+    def resume(self) -> List[Job]:
+        """Queue jobs left unfinished by a previous process again; ones it was asked to cancel are marked cancelled."""
+        jobs = self.store.unfinished()
+        resumed: Dict[str, str] = {}
+        for job in jobs:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+                continue
+            # Left over from before jobs were limited to one per folder; the oldest one runs
+            other = resumed.get(folder_key(job.folder_path))
+            if other is not None:
+                job.error = f"Job {other} is already ingesting {job.folder_path}"
+                self._finish(job, CANCELLED)
+                continue
+            logger.info(f"Resuming ingestion job {job.id} ({job.status} when the service stopped)")
+            job.status = QUEUED
+            job.started_at = None
+            resumed[folder_key(job.folder_path)] = job.id
+            self._enqueue(job)
+        return jobs
+
+    def submit(self, folder_path: str, dry_run: bool = False, force: bool = False) -> Tuple[Job, Future]:
+        """Queue a run. The future resolves to its summary, or raises what stopped it.
+
+        Raises ``JobConflictError`` if another job for the folder is still queued or running.
+        """
+        job = Job(id=uuid.uuid4().hex, folder_path=folder_path, dry_run=dry_run, force=force, created_at=time.time())
+        future = self._enqueue(job)
+        logger.info(f"Queued ingestion job {job.id} for {folder_path}")
+        return job, future
+
+    def _enqueue(self, job: Job) -> Future:
+        folder = folder_key(job.folder_path)
+        with self._lock:
+            other = self._folders.get(folder)
+            if other is not None:
+                raise JobConflictError(f"Job {other} is already ingesting {job.folder_path}")
+            self._folders[folder] = job.id
+        try:
+            self.store.save(job)
+        except Exception:
+            with self._lock:
+                del self._folders[folder]
+            raise
+        metrics.JOBS_QUEUED.inc()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._cancel_events[job.id] = threading.Event()
+            return self._pool.submit(self._run, job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job's current state; in-memory for jobs of this process, from the table otherwise."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self.store.get(job_id)
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Job]:
+        jobs = self.store.list(limit, status)
+        with self._lock:
+            return [self._jobs.get(job.id, job) for job in jobs]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop. Queued jobs never start; running ones stop after their in-flight writes."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            event = self._cancel_events.get(job_id)
+        if job is None:
+            return self.store.get(job_id)
+        if not job.finished:
+            job.cancel_requested = True
+            event.set()
+            self.store.save(job)
+            logger.info(f"Cancellation requested for ingestion job {job_id}")
+        return job
+
+    def _report(self, job: Job) -> Callable[[IngestionSummary], None]:
+        last_saved = [0.0]
+        lock = threading.Lock()
+
+        def on_progress(summary: IngestionSummary) -> None:
+            with lock:
+                job.progress = progress_from_summary(summary)
+                now = time.monotonic()
+                if now - last_saved[0] >= self.progress_interval:
+                    last_saved[0] = now
+                    self.store.save(job)
+
+        return on_progress
+
+    def _run(self, job: Job) -> IngestionSummary:
+        metrics.JOBS_QUEUED.dec()
+        cancel = self._cancel_events[job.id]
+        if cancel.is_set():
+            self._finish(job, CANCELLED)
+            raise IngestionCancelled("Ingestion was cancelled before it started")
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        self.store.save(job)
+        metrics.JOBS_RUNNING.inc()
+        try:
+            summary = self.runner(job, self._report(job), cancel)
+        except IngestionCancelled:
+            if self._shutting_down and not job.cancel_requested:
+                # Left as running in the table, so the next start resumes it
+                logger.info(f"Ingestion job {job.id} interrupted by shutdown")
+            else:
+                self._finish(job, CANCELLED)
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            self._finish(job, FAILED)
+            raise
+        finally:
+            metrics.JOBS_RUNNING.dec()
+
+        job.progress = progress_from_summary(summary)
+        job.summary = summary.as_dict()
+        self._finish(job, COMPLETED)
+        logger.info(f"Ingestion job {job.id} completed: processed {summary.files_processed} PDF files "
+                    f"({summary.chunks} chunks, {summary.upserts} vectors stored)")
+        return summary
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self.store.save(job)
+        metrics.JOBS_FINISHED.labels(status).inc()
+        with self._lock:
+            # Finished jobs are served from the table from now on
+            self._jobs.pop(job.id, None)
+            self._cancel_events.pop(job.id, None)
+            folder = folder_key(job.folder_path)
+            if self._folders.get(folder) == job.id:
+                del self._folders[folder]
+
+    def shutdown(self) -> None:
+        """Stop running jobs and wait for them. They stay unfinished in the table and resume on the next start."""
+        with self._lock:
+            self._shutting_down = True
+            events = list(self._cancel_events.values())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for event in events:
+            event.set()
+        self._pool.shutdown(wait=True)
+        self.store.close()
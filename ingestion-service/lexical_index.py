@@ -0,0 +1,224 @@
+"""Persistent BM25 inverted index over chunk text.
+
+Dense embeddings blur exact identifiers such as error codes, SKUs and product
+names; a lexical index matches them token for token. The index is a single
+SQLite file kept next to the vector index (``lexical.sqlite``) and is updated
+in place, so ingestion only touches the postings of chunks it adds or removes.
+
+Tokens are lowercased runs of letters and digits. Runs joined by ``-``, ``_``,
+``.`` or ``/`` are also kept whole, so ``E-102`` indexes as ``e-102``, ``e`` and
+``102`` and a query for the exact code ranks chunks containing it first.
+
+Tables::
+
+    docs      doc (integer key), id, length in tokens
+    terms     term, document frequency
+    postings  term, doc, term frequency
+    stats     document count and total length, for the BM25 length norm
+
+The ingestion pipeline writes this index and the embedding service searches
+it, opened with ``read_only`` so the reader never writes to a file the
+ingestion writer owns. Each project ships an identical copy of this module
+(``ingestion-service/lexical_index.py`` and ``src/services/lexical_index.py``);
+keep them in sync.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+LEXICAL_INDEX_FILE = "lexical.sqlite"
+
+_TOKEN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+_SEPARATORS = re.compile(r"[-_./]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or "
+    "that the their then there these this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; compound identifiers yield the whole and each part."""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in _SEPARATORS.split(token) if part and part not in STOPWORDS)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each id scores the sum of ``1 / (k + rank)`` over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """BM25 inverted index persisted to SQLite.
+
+    Thread-safe. ``add`` takes ``(id, text)`` pairs and replaces documents whose
+    id already exists; ``delete`` ignores unknown ids.
+
+    ``read_only`` opens an existing index for searching: the file is opened
+    with SQLite's read-only mode, no schema or journal settings are written,
+    and ``add`` and ``delete`` raise ``RuntimeError``. Searches see what the
+    writer has committed.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75, read_only: bool = False):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.read_only = read_only
+        self._lock = threading.Lock()
+
+        if read_only:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            # Fails here rather than on the first search if the file is not an index
+            self._db.execute("SELECT value FROM stats WHERE key = 'docs'").fetchone()
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS docs (doc INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, length INTEGER NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, doc)) WITHOUT ROWID"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._db.execute("INSERT OR IGNORE INTO stats (key, value) VALUES ('docs', 0), ('total_length', 0)")
+
+    # -- writes ------------------------------------------------------------
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(f"Lexical index at {self.path} is open read-only")
+
+    def _remove(self, docs: Sequence[int]) -> None:
+        """Drop documents and their postings. Runs inside an open transaction."""
+        if not docs:
+            return
+        removed_length = 0
+        df_changes: Counter = Counter()
+        for doc in docs:
+            removed_length += self._db.execute("SELECT length FROM docs WHERE doc = ?", (doc,)).fetchone()[0]
+            for (term,) in self._db.execute("SELECT term FROM postings WHERE doc = ?", (doc,)):
+                df_changes[term] += 1
+        self._db.executemany("DELETE FROM postings WHERE doc = ?", [(doc,) for doc in docs])
+        self._db.executemany("DELETE FROM docs WHERE doc = ?", [(doc,) for doc in docs])
+        self._db.executemany("UPDATE terms SET df = df - ? WHERE term = ?", [(n, term) for term, n in df_changes.items()])
+        self._db.execute("DELETE FROM terms WHERE df <= 0")
+        self._db.execute("UPDATE stats SET value = value - ? WHERE key = 'docs'", (len(docs),))
+        self._db.execute("UPDATE stats SET value = value - ? WHERE key = 'total_length'", (removed_length,))
+
+    def _existing_docs(self, ids: Sequence[str]) -> List[int]:
+        docs = []
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            docs.extend(doc for (doc,) in self._db.execute(f"SELECT doc FROM docs WHERE id IN ({placeholders})", part))
+        return docs
+
+    def add(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """Index ``(id, text)`` pairs, replacing any documents with the same ids."""
+        self._check_writable()
+        documents = list({doc_id: text for doc_id, text in documents}.items())
+        if not documents:
+            return
+        with self._lock, self._db:
+            self._remove(self._existing_docs([doc_id for doc_id, _ in documents]))
+
+            total_length = 0
+            df_changes: Counter = Counter()
+            postings = []
+            for doc_id, text in documents:
+                counts = Counter(tokenize(text or ""))
+                length = sum(counts.values())
+                total_length += length
+                doc = self._db.execute("INSERT INTO docs (id, length) VALUES (?, ?)", (doc_id, length)).lastrowid
+                postings.extend((term, doc, tf) for term, tf in counts.items())
+                df_changes.update(counts.keys())
+            self._db.executemany("INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)", postings)
+            self._db.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                list(df_changes.items())
+            )
+            self._db.execute("UPDATE stats SET value = value + ? WHERE key = 'docs'", (len(documents),))
+            self._db.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove documents by id. Returns how many were removed."""
+        self._check_writable()
+        ids = list(ids)
+        with self._lock, self._db:
+            docs = self._existing_docs(ids)
+            self._remove(docs)
+            return len(docs)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # -- reads -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT value FROM stats WHERE key = 'docs'").fetchone()[0]
+
+    def search(self, query: str, top_k: int = 10) -> List[dict]:
+        """Documents ranked by BM25 score for ``query``, best first, as ``{"id", "score"}`` dicts."""
+        terms = set(tokenize(query))
+        if not terms or top_k <= 0:
+            return []
+        with self._lock:
+            stats = dict(self._db.execute("SELECT key, value FROM stats"))
+            n_docs = stats["docs"]
+            if n_docs == 0:
+                return []
+            avg_length = max(stats["total_length"] / n_docs, 1.0)
+
+            docs, scores = [], []
+            for term in terms:
+                row = self._db.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                df = row[0]
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                postings = np.asarray(self._db.execute(
+                    "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.doc = p.doc WHERE p.term = ?", (term,)
+                ).fetchall(), dtype=np.float64).reshape(-1, 3)
+                tf, length = postings[:, 1], postings[:, 2]
+                docs.append(postings[:, 0].astype(np.int64))
+                scores.append(idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length)))
+            if not docs:
+                return []
+
+            unique_docs, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(scores))
+            k = min(top_k, len(unique_docs))
+            best = np.argpartition(-totals, k - 1)[:k]
+            best = best[np.argsort(-totals[best])]
+
+            best_docs = [int(doc) for doc in unique_docs[best]]
+            placeholders = ",".join("?" * len(best_docs))
+            ids = dict(self._db.execute(f"SELECT doc, id FROM docs WHERE doc IN ({placeholders})", best_docs))
+            return [{"id": ids[doc], "score": float(totals[i])} for doc, i in zip(best_docs, best)]
@@ -0,0 +1,873 @@
+"""Local on-disk approximate nearest-neighbour index.
+
+Vectors live in a memory-mapped float32 file, so the index opens instantly and
+the operating system pages in only what queries touch. Ids and metadata live in
+a SQLite file next to it and are loaded into memory on open. Search is cosine
+similarity over unit-normalized vectors.
+
+Small indexes are searched exhaustively. Once an index holds ``train_threshold``
+vectors it trains an inverted-file (IVF) quantizer: spherical k-means
+centroids split the vectors into lists, and a query only scores the lists of
+its ``nprobe`` nearest centroids. The quantizer is retrained whenever the index
+has doubled since it was last trained.
+
+With ``quantization`` set, candidates are scored on compact codes instead of
+the float32 rows: ``float16`` (2 bytes per dimension), ``int8`` with a scale
+per dimension (1 byte per dimension) or ``pq``, product quantization with 256
+centroids per subvector (1 byte per ``PQ_SUBVECTOR_DIMENSIONS`` dimensions).
+The best ``rerank`` times ``top_k`` candidates are then rescored at full
+precision, so only their float32 rows are paged in; the codes are what stays
+in memory. ``int8`` and ``pq`` codes exist once the index is trained;
+``float16`` ones from the start.
+
+Chunk text (the ``chunk_text`` metadata field) is kept out of the metadata
+held in memory. It is appended to a text file, read through mmap, and each
+vector keeps only its offset and length. Search results and ``get`` still
+return it in the metadata.
+
+Files in the index directory::
+
+    index.json       dimension, row count and capacity, training and quantization state
+    vectors.f32      float32 [capacity, dimension], unit-normalized rows
+    assign.i32       int32 [capacity]: IVF list of each row, -1 unassigned, -2 free
+    centroids.npy    float32 [nlist, dimension], once trained
+    codes.<mode>     compact codes [capacity, code size], with quantization
+    quantizer.npz    int8 scales or PQ codebooks, once trained
+    texts-<n>.bin    UTF-8 chunk texts; a new generation is written when over half is dead
+    meta.sqlite      id, row, JSON metadata and text offset of every live vector
+
+The ingestion pipeline writes these indexes and the embedding service searches
+them, opened with ``read_only`` so a reader never writes to files a live
+writer owns. Each project ships an identical copy of this module
+(``ingestion-service/local_index.py`` and ``src/services/local_index.py``);
+keep them in sync.
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+UNASSIGNED = -1
+FREE = -2
+
+TEXT_FIELD = "chunk_text"
+QUANTIZATIONS = ("none", "float16", "int8", "pq")
+PQ_SUBVECTOR_DIMENSIONS = 4
+PQ_CENTROIDS = 256
+
+logger = logging.getLogger(__name__)
+
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter.
+
+    Supports ``{"field": value}``, ``{"field": {"$eq": value}}``,
+    ``{"field": {"$ne": value}}``, ``{"field": {"$in": [...]}}`` and
+    ``{"field": {"$nin": [...]}}``; all conditions must hold.
+    """
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op not in ("$eq", "$ne", "$in", "$nin"):
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        elif value != condition:
+            return False
+    return True
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 8, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids that maximize cosine similarity to their members."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        # In slices, so the score matrix stays small however many lists there are
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1) for start in range(0, len(vectors), 65536)
+        ])
+        sums = np.stack([np.bincount(assignment, weights=vectors[:, d], minlength=k) for d in range(vectors.shape[1])], axis=1)
+        counts = np.bincount(assignment, minlength=k)
+        # Empty clusters restart from a random vector
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Euclidean k-means centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (centroids ** 2).sum(axis=1)[None, :] - 2 * vectors @ centroids.T
+        assignment = np.argmin(distances, axis=1)
+        sums = np.stack([np.bincount(assignment, weights=vectors[:, d], minlength=k) for d in range(vectors.shape[1])], axis=1)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+            counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(np.float32)
+    return centroids
+
+
+class Float16Codes:
+    """Half-precision copies of the rows; needs no training."""
+
+    name = "float16"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.trained = True
+
+    @property
+    def code_shape(self) -> Tuple[int, type]:
+        return self.dimension, np.float16
+
+    def train(self, sample: np.ndarray) -> None:
+        pass
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(np.float16)
+
+    def scorer(self, query: np.ndarray):
+        return lambda codes: codes.astype(np.float32) @ query
+
+    def state(self) -> dict:
+        return {}
+
+    def load(self, state) -> None:
+        pass
+
+
+class Int8Codes:
+    """Rows scaled per dimension into int8; the scale maps each dimension's largest magnitude to 127."""
+
+    name = "int8"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.scales: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.scales is not None
+
+    @property
+    def code_shape(self) -> Tuple[int, type]:
+        return self.dimension, np.int8
+
+    def train(self, sample: np.ndarray) -> None:
+        # A high percentile rather than the maximum keeps outliers from wasting the range
+        self.scales = (np.maximum(np.percentile(np.abs(sample), 99.9, axis=0), 1e-6) / 127.0).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scales), -127, 127).astype(np.int8)
+
+    def scorer(self, query: np.ndarray):
+        scaled = query * self.scales
+        return lambda codes: codes.astype(np.float32) @ scaled
+
+    def state(self) -> dict:
+        return {"scales": self.scales}
+
+    def load(self, state) -> None:
+        self.scales = state["scales"]
+
+
+class ProductCodes:
+    """Product quantization: each ``PQ_SUBVECTOR_DIMENSIONS``-dimension slice is coded as its nearest of 256 centroids.
+
+    Queries are scored against the codes through a per-query table of inner
+    products between the query's slices and every centroid.
+    """
+
+    name = "pq"
+
+    def __init__(self, dimension: int):
+        if dimension % PQ_SUBVECTOR_DIMENSIONS:
+            raise ValueError(f"pq quantization needs a dimension divisible by {PQ_SUBVECTOR_DIMENSIONS}, got {dimension}")
+        self.dimension = dimension
+        self.subvectors = dimension // PQ_SUBVECTOR_DIMENSIONS
+        self.codebooks: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def code_shape(self) -> Tuple[int, type]:
+        return self.subvectors, np.uint8
+
+    def _slices(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subvectors, PQ_SUBVECTOR_DIMENSIONS)
+
+    def train(self, sample: np.ndarray) -> None:
+        # 64 points per centroid train the codebooks about as well as the whole sample
+        if len(sample) > PQ_CENTROIDS * 64:
+            sample = sample[np.random.default_rng(0).choice(len(sample), size=PQ_CENTROIDS * 64, replace=False)]
+        slices = self._slices(sample)
+        codebooks = np.zeros((self.subvectors, PQ_CENTROIDS, PQ_SUBVECTOR_DIMENSIONS), dtype=np.float32)
+        for j in range(self.subvectors):
+            centroids = kmeans(np.ascontiguousarray(slices[:, j]), PQ_CENTROIDS, seed=j)
+            codebooks[j, :len(centroids)] = centroids
+        self.codebooks = codebooks
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        slices = self._slices(vectors)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        norms = (self.codebooks ** 2).sum(axis=2)
+        for j in range(self.subvectors):
+            codes[:, j] = np.argmin(norms[j][None, :] - 2 * slices[:, j] @ self.codebooks[j].T, axis=1)
+        return codes
+
+    def scorer(self, query: np.ndarray):
+        table = np.einsum("jd,jkd->jk", self._slices(query[None, :])[0], self.codebooks)
+        columns = np.arange(self.subvectors)[None, :]
+        return lambda codes: table[columns, codes].sum(axis=1)
+
+    def state(self) -> dict:
+        return {"codebooks": self.codebooks}
+
+    def load(self, state) -> None:
+        self.codebooks = state["codebooks"]
+
+
+_QUANTIZERS = {quantizer.name: quantizer for quantizer in (Float16Codes, Int8Codes, ProductCodes)}
+
+
+class TextStore:
+    """Append-only UTF-8 file of texts addressed by ``(offset, length)`` in bytes, read through mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    def append(self, text: str) -> Tuple[int, int]:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        data = text.encode("utf-8")
+        offset = self.size
+        self._file.write(data)
+        self.size += len(data)
+        return offset, len(data)
+
+    def read(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ""
+        if self._map is None or offset + length > len(self._map):
+            # Texts appended since the file was mapped need a larger mapping
+            self.flush()
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length].decode("utf-8")
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class LocalIndex:
+    """Persistent IVF vector index backed by memory-mapped files.
+
+    Thread-safe; writes are serialized and searches see a consistent state.
+    ``upsert`` takes Pinecone-style records (``id``, ``values``, ``metadata``)
+    and overwrites vectors whose id already exists.
+
+    ``quantization`` (one of ``QUANTIZATIONS``) is stored with the index;
+    None keeps the stored mode, and a different mode re-encodes the index.
+    ``rerank`` is how many candidates per result are rescored at full
+    precision; 0 returns the scores of the codes as they are. ``list_size``
+    sets how many vectors an IVF list holds on average; by default an index of
+    ``n`` vectors gets ``sqrt(n)`` lists, up to ``max_lists``.
+
+    ``read_only`` opens an existing index for searching a snapshot of it:
+    files are mapped read-only, nothing is written on open or ``close``, and
+    writes raise ``RuntimeError``. Reopen it to see later writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: Optional[int] = None,
+        nprobe: int = 16,
+        train_threshold: int = 4096,
+        max_lists: int = 1024,
+        quantization: Optional[str] = None,
+        rerank: int = 8,
+        list_size: Optional[int] = None,
+        read_only: bool = False,
+    ):
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of: {', '.join(QUANTIZATIONS)}")
+        self.path = path
+        self.dimension = dimension
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.max_lists = max_lists
+        self.list_size = list_size
+        self.quantization = "none"
+        self.rerank = rerank
+        self.read_only = read_only
+        self._lock = threading.RLock()
+
+        self.count = 0
+        self.capacity = 0
+        self.trained_size = 0
+        self._vectors: Optional[np.memmap] = None
+        self._assign: Optional[np.memmap] = None
+        self._codes: Optional[np.memmap] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._quantizer = None
+
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[dict]] = []
+        self._texts: List[Optional[Tuple[int, int]]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._lists: Dict[int, np.ndarray] = {}
+        self._list_additions: Dict[int, List[int]] = {}
+        self._text_store: Optional[TextStore] = None
+        self._text_generation = 0
+        self._dead_text_bytes = 0
+
+        if read_only:
+            self._db = sqlite3.connect(f"file:{os.path.join(path, 'meta.sqlite')}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(path, "meta.sqlite"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS items (id TEXT PRIMARY KEY, row INTEGER NOT NULL, metadata TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(items)")}
+            # Indexes written before the text store kept chunk text inline in the metadata
+            for column in ("text_offset", "text_length"):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE items ADD COLUMN {column} INTEGER")
+            self._db.commit()
+        self._load()
+        if quantization is not None and quantization != self.quantization:
+            self.set_quantization(quantization)
+
+    # -- persistence -------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(f"Local index at {self.path} is open read-only")
+
+    def _load(self) -> None:
+        header_path = self._file("index.json")
+        if not os.path.exists(header_path):
+            return
+        with open(header_path) as f:
+            header = json.load(f)
+        if self.dimension is not None and header["dimension"] != self.dimension:
+            raise RuntimeError(
+                f"Index at {self.path} has dimension {header['dimension']}, expected {self.dimension}"
+            )
+        self.dimension = header["dimension"]
+        self.count = header["count"]
+        self.capacity = header["capacity"]
+        self.trained_size = header.get("trained_size", 0)
+        self.quantization = header.get("quantization", "none")
+        self._quantizer = self._make_quantizer(self.quantization)
+        if self._quantizer is not None and os.path.exists(self._file("quantizer.npz")):
+            with np.load(self._file("quantizer.npz")) as state:
+                self._quantizer.load({key: state[key] for key in state.files})
+        self._open_arrays()
+        if os.path.exists(self._file("centroids.npy")):
+            self._centroids = np.load(self._file("centroids.npy"))
+
+        self._ids = [None] * self.count
+        self._metadata = [None] * self.count
+        self._texts = [None] * self.count
+        # A reader may open an index its writer has not migrated yet
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(items)")}
+        text_columns = "text_offset, text_length" if "text_offset" in columns else "NULL, NULL"
+        has_meta = self._db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone()
+        # One read transaction, so the text generation and the offsets into it agree
+        with self._db:
+            self._db.execute("BEGIN")
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'text_generation'").fetchone() if has_meta else None
+            self._text_generation = row[0] if row else 0
+            items = self._db.execute(f"SELECT id, row, metadata, {text_columns} FROM items").fetchall()
+        for vector_id, row, metadata, text_offset, text_length in items:
+            if self.read_only and row >= self.count:
+                # Appended by the writer after the header this reader loaded
+                continue
+            self._ids[row] = vector_id
+            self._metadata[row] = json.loads(metadata) if metadata else {}
+            if text_offset is not None:
+                self._texts[row] = (text_offset, text_length)
+            self._rows[vector_id] = row
+        self._dead_text_bytes = header.get("dead_text_bytes", 0)
+        self._free = [row for row in range(self.count) if self._ids[row] is None]
+        # Rows written but never committed to SQLite (e.g. a crash mid-upsert, or an
+        # upsert still under way in a writer this reader shares the files with) are free
+        for row in self._free:
+            self._assign[row] = FREE
+        self._rebuild_lists()
+        logger.info(f"Opened local index at {self.path}: {len(self._rows)} vectors, dimension {self.dimension}")
+
+    def _make_quantizer(self, quantization: str):
+        return _QUANTIZERS[quantization](self.dimension) if quantization != "none" else None
+
+    def _codes_file(self) -> str:
+        return self._file(f"codes.{self.quantization}")
+
+    def _open_arrays(self) -> None:
+        mode = "r" if self.read_only else "r+"
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode=mode, shape=(self.capacity, self.dimension))
+        # A reader's assignments are a private copy-on-write mapping, so rows it marks free stay its own
+        self._assign = np.memmap(
+            self._file("assign.i32"), dtype=np.int32, mode="c" if self.read_only else "r+", shape=(self.capacity,)
+        )
+        self._codes = None
+        if self._quantizer is not None:
+            size, dtype = self._quantizer.code_shape
+            code_bytes = self.capacity * size * np.dtype(dtype).itemsize
+            if not self.read_only:
+                with open(self._codes_file(), "ab") as f:
+                    f.truncate(code_bytes)
+            elif not os.path.exists(self._codes_file()) or os.path.getsize(self._codes_file()) < code_bytes:
+                # Searched at full precision until the writer has encoded the index
+                return
+            self._codes = np.memmap(self._codes_file(), dtype=dtype, mode=mode, shape=(self.capacity, size))
+
+    def _text_file(self, generation: int) -> str:
+        return self._file(f"texts-{generation}.bin")
+
+    def _open_texts(self) -> TextStore:
+        if self._text_store is None:
+            self._text_store = TextStore(self._text_file(self._text_generation))
+        return self._text_store
+
+    def _text(self, row: int) -> Optional[str]:
+        span = self._texts[row]
+        return self._open_texts().read(*span) if span is not None else None
+
+    def _full_metadata(self, row: int) -> dict:
+        """A row's metadata with its chunk text put back."""
+        text = self._text(row)
+        if text is None:
+            return self._metadata[row]
+        return {**self._metadata[row], TEXT_FIELD: text}
+
+    def _write_header(self) -> None:
+        header = {
+            "dimension": self.dimension,
+            "count": self.count,
+            "capacity": self.capacity,
+            "trained_size": self.trained_size,
+            "nlist": 0 if self._centroids is None else len(self._centroids),
+            "quantization": self.quantization,
+            "dead_text_bytes": self._dead_text_bytes,
+        }
+        tmp = self._file("index.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(header, f)
+        os.replace(tmp, self._file("index.json"))
+
+    def _grow(self, needed: int) -> None:
+        """Extend the memory-mapped files to hold at least ``needed`` rows."""
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2, 1024)
+        previous = self.capacity
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._assign.flush()
+            if self._codes is not None:
+                self._codes.flush()
+            self._vectors = self._assign = self._codes = None
+        for name, row_bytes in (("vectors.f32", 4 * self.dimension), ("assign.i32", 4)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self.capacity = capacity
+        self._open_arrays()
+        self._assign[previous:] = FREE
+        self._write_header()
+
+    def flush(self) -> None:
+        """Write memory-mapped pages and the header to disk."""
+        with self._lock:
+            if self.read_only:
+                return
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._assign.flush()
+            if self._codes is not None:
+                self._codes.flush()
+            if self._text_store is not None:
+                self._text_store.flush()
+            # An index that never received a vector has no dimension to record yet
+            if self.dimension is not None:
+                self._write_header()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._text_store is not None:
+                self._text_store.close()
+                self._text_store = None
+            self._db.close()
+
+    # -- chunk text --------------------------------------------------------
+
+    def _maybe_compact_texts(self) -> None:
+        """Rewrite the live texts to a new generation once more than half the text file is dead."""
+        store = self._open_texts()
+        if store.size < 1 << 20 or self._dead_text_bytes * 2 < store.size:
+            return
+        generation = self._text_generation + 1
+        compacted = TextStore(self._text_file(generation))
+        spans = {}
+        for row, span in enumerate(self._texts):
+            if span is not None and self._ids[row] is not None:
+                spans[row] = compacted.append(store.read(*span))
+        compacted.flush()
+        with self._db:
+            self._db.executemany(
+                "UPDATE items SET text_offset = ?, text_length = ? WHERE row = ?",
+                [(offset, length, row) for row, (offset, length) in spans.items()]
+            )
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('text_generation', ?)", (generation,))
+        for row, span in spans.items():
+            self._texts[row] = span
+        store.close()
+        # The previous generation stays for readers that opened the index before this
+        stale = self._text_file(self._text_generation - 1)
+        if os.path.exists(stale):
+            os.remove(stale)
+        self._text_store, self._text_generation, self._dead_text_bytes = compacted, generation, 0
+        logger.info(f"Compacted chunk text of local index at {self.path} to {compacted.size} bytes")
+
+    # -- quantization ------------------------------------------------------
+
+    def _encode_rows(self, rows: np.ndarray) -> None:
+        for start in range(0, len(rows), 65536):
+            part = rows[start:start + 65536]
+            self._codes[part] = self._quantizer.encode(np.asarray(self._vectors[part]))
+
+    def _train_quantizer(self, live: np.ndarray, rng) -> None:
+        if self._quantizer is None:
+            return
+        sample = live if len(live) <= 65536 else rng.choice(live, size=65536, replace=False)
+        self._quantizer.train(np.asarray(self._vectors[np.sort(sample)]))
+        state = self._quantizer.state()
+        if state:
+            np.savez(self._file("quantizer.npz"), **state)
+        self._encode_rows(live)
+
+    def set_quantization(self, quantization: str) -> None:
+        """Switch the compact codes used for search; an index already trained is re-encoded now."""
+        with self._lock:
+            if quantization not in QUANTIZATIONS:
+                raise ValueError(f"Unknown quantization '{quantization}', expected one of: {', '.join(QUANTIZATIONS)}")
+            self._check_writable()
+            logger.info(f"Switching local index at {self.path} from {self.quantization} to {quantization} codes")
+            if self._codes is not None:
+                self._codes.flush()
+                self._codes = None
+                os.remove(self._codes_file())
+            self.quantization = quantization
+            self._quantizer = self._make_quantizer(quantization) if self.dimension is not None else None
+            if os.path.exists(self._file("quantizer.npz")):
+                os.remove(self._file("quantizer.npz"))
+            if self._vectors is not None:
+                self._open_arrays()
+                live = np.flatnonzero(np.asarray(self._assign[:self.count]) != FREE)
+                if self._quantizer is not None and (self._quantizer.trained or self._centroids is not None):
+                    self._train_quantizer(live, np.random.default_rng(0))
+                self.flush()
+
+    @property
+    def _quantized(self) -> bool:
+        return self._codes is not None and self._quantizer.trained
+
+    def memory_report(self) -> dict:
+        """Bytes per vector of each representation, and what a search keeps resident."""
+        full = 4 * (self.dimension or 0)
+        code = 0
+        if self._quantizer is not None:
+            size, dtype = self._quantizer.code_shape
+            code = size * np.dtype(dtype).itemsize
+        live = len(self._rows)
+        return {
+            "quantization": self.quantization,
+            "vectors": live,
+            "float32_bytes_per_vector": full,
+            "code_bytes_per_vector": code,
+            "resident_vector_bytes": live * (code if self._quantized else full),
+            "text_bytes": self._open_texts().size,
+        }
+
+    # -- IVF lists ---------------------------------------------------------
+
+    def _rebuild_lists(self) -> None:
+        self._lists, self._list_additions = {}, {}
+        if self.count == 0:
+            return
+        assign = np.asarray(self._assign[:self.count])
+        order = np.argsort(assign, kind="stable")
+        values, starts = np.unique(assign[order], return_index=True)
+        bounds = list(starts) + [len(order)]
+        for i, list_id in enumerate(values):
+            if list_id != FREE:
+                self._lists[int(list_id)] = order[bounds[i]:bounds[i + 1]].astype(np.int64)
+
+    def _add_to_list(self, list_id: int, row: int) -> None:
+        self._list_additions.setdefault(list_id, []).append(row)
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        """Live rows of one list, folding in recent additions and dropping moved or freed rows."""
+        rows = self._lists.get(list_id, np.empty(0, dtype=np.int64))
+        additions = self._list_additions.pop(list_id, None)
+        if additions:
+            rows = np.unique(np.concatenate([rows, np.asarray(additions, dtype=np.int64)]))
+        live = rows[np.asarray(self._assign[rows]) == list_id]
+        self._lists[list_id] = live
+        return live
+
+    def _nearest_lists(self, vectors: np.ndarray, n: int = 1) -> np.ndarray:
+        scores = vectors @ self._centroids.T
+        if n == 1:
+            return np.argmax(scores, axis=1)[:, None]
+        n = min(n, scores.shape[1])
+        return np.argpartition(-scores, n - 1, axis=1)[:, :n]
+
+    def train(self, nlist: Optional[int] = None) -> None:
+        """Train IVF centroids on the current vectors and reassign every row."""
+        with self._lock:
+            self._check_writable()
+            live = np.flatnonzero(np.asarray(self._assign[:self.count]) != FREE)
+            if len(live) == 0:
+                return
+            if nlist is None:
+                nlist = len(live) // self.list_size if self.list_size else int(math.sqrt(len(live)))
+                nlist = min(self.max_lists, max(nlist, 1))
+            rng = np.random.default_rng(0)
+            sample = live if len(live) <= nlist * 256 else rng.choice(live, size=nlist * 256, replace=False)
+            self._centroids = spherical_kmeans(np.asarray(self._vectors[np.sort(sample)]), nlist)
+            np.save(self._file("centroids.npy"), self._centroids)
+
+            for start in range(0, len(live), 65536):
+                rows = live[start:start + 65536]
+                self._assign[rows] = self._nearest_lists(np.asarray(self._vectors[rows]))[:, 0]
+            self._train_quantizer(live, rng)
+            self.trained_size = len(live)
+            self._rebuild_lists()
+            self.flush()
+            logger.info(f"Trained local index at {self.path}: {nlist} lists over {len(live)} vectors")
+
+    def _maybe_train(self) -> None:
+        size = len(self._rows)
+        if size >= self.train_threshold and size >= 2 * self.trained_size:
+            self.train()
+
+    # -- writes ------------------------------------------------------------
+
+    def upsert(self, records: Sequence[dict]) -> None:
+        """Insert or overwrite vectors by id."""
+        if not records:
+            return
+        with self._lock:
+            self._check_writable()
+            vectors = np.asarray([record["values"] for record in records], dtype=np.float32)
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}")
+            vectors = _normalize(vectors)
+            if self._quantizer is None and self.quantization != "none":
+                self._quantizer = self._make_quantizer(self.quantization)
+
+            rows = []
+            for record in records:
+                row = self._rows.get(record["id"])
+                if row is None:
+                    row = self._free.pop() if self._free else None
+                    if row is None:
+                        row = self.count
+                        self.count += 1
+                        self._ids.append(None)
+                        self._metadata.append(None)
+                        self._texts.append(None)
+                rows.append(row)
+            self._grow(self.count)
+
+            if self._centroids is not None:
+                lists = self._nearest_lists(vectors)[:, 0]
+            else:
+                lists = np.full(len(rows), UNASSIGNED)
+
+            texts = self._open_texts()
+            for record, row, list_id in zip(records, rows, lists):
+                metadata = dict(record.get("metadata") or {})
+                text = metadata.pop(TEXT_FIELD, None)
+                if self._texts[row] is not None:
+                    self._dead_text_bytes += self._texts[row][1]
+                self._texts[row] = texts.append(text) if isinstance(text, str) else None
+                self._ids[row] = record["id"]
+                self._metadata[row] = metadata
+                self._rows[record["id"]] = row
+                if int(self._assign[row]) != list_id:
+                    self._assign[row] = list_id
+                    self._add_to_list(int(list_id), row)
+            self._vectors[rows] = vectors
+            if self._quantized:
+                self._codes[rows] = self._quantizer.encode(vectors)
+            texts.flush()
+
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO items (id, row, metadata, text_offset, text_length) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (record["id"], row, json.dumps(self._metadata[row]), *(self._texts[row] or (None, None)))
+                        for record, row in zip(records, rows)
+                    ]
+                )
+            self._maybe_compact_texts()
+            self._write_header()
+            self._maybe_train()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove vectors by id; their rows are reused by later inserts. Returns how many were removed."""
+        with self._lock:
+            self._check_writable()
+            removed = []
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                self._ids[row] = None
+                self._metadata[row] = None
+                if self._texts[row] is not None:
+                    self._dead_text_bytes += self._texts[row][1]
+                    self._texts[row] = None
+                self._assign[row] = FREE
+                self._free.append(row)
+                removed.append(vector_id)
+            if removed:
+                with self._db:
+                    self._db.executemany("DELETE FROM items WHERE id = ?", [(vector_id,) for vector_id in removed])
+                self._maybe_compact_texts()
+            return len(removed)
+
+    # -- reads -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._rows
+
+    def items(self) -> List[tuple]:
+        """``(id, metadata)`` of every stored vector."""
+        with self._lock:
+            return [(vector_id, self._full_metadata(row)) for vector_id, row in self._rows.items()]
+
+    def get(self, vector_id: str) -> Optional[dict]:
+        """The stored (normalized) vector and metadata for an id, or None."""
+        with self._lock:
+            row = self._rows.get(vector_id)
+            if row is None:
+                return None
+            return {"id": vector_id, "values": np.array(self._vectors[row]), "metadata": self._full_metadata(row)}
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: int, candidate_ids: Optional[Iterable[str]]) -> np.ndarray:
+        if candidate_ids is not None:
+            rows = [self._rows[vector_id] for vector_id in candidate_ids if vector_id in self._rows]
+            return np.asarray(rows, dtype=np.int64)
+        if self._centroids is None:
+            return np.flatnonzero(np.asarray(self._assign[:self.count]) != FREE)
+        probe = self._nearest_lists(query[None, :], nprobe)[0]
+        parts = [self._list_rows(int(list_id)) for list_id in probe]
+        # Rows written before training caught up with them
+        parts.append(self._list_rows(UNASSIGNED))
+        return np.concatenate(parts)
+
+    def search(
+        self,
+        vector,
+        top_k: int = 10,
+        filter: Optional[dict] = None,
+        candidate_ids: Optional[Iterable[str]] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[dict]:
+        """Nearest vectors to ``vector`` by cosine similarity, best first.
+
+        ``filter`` is a metadata filter (see ``matches_filter``); chunk text
+        cannot be filtered on. ``candidate_ids`` restricts the search to those
+        ids and scores them exhaustively, e.g. ids already preselected by a
+        lexical index.
+        """
+        with self._lock:
+            if not self._rows or top_k <= 0:
+                return []
+            query = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+            if len(query) != self.dimension:
+                raise ValueError(f"Expected a query vector of dimension {self.dimension}, got {len(query)}")
+            rows = self._candidate_rows(query, nprobe or self.nprobe, candidate_ids)
+            if filter:
+                rows = np.asarray([row for row in rows if matches_filter(self._metadata[row], filter)], dtype=np.int64)
+            if len(rows) == 0:
+                return []
+
+            depth = top_k * self.rerank
+            if self._quantized and (self.rerank <= 0 or len(rows) > depth):
+                # Shortlist on the compact codes; rerank the shortlist at full precision
+                scores = self._quantizer.scorer(query)(np.asarray(self._codes[rows]))
+                if self.rerank > 0:
+                    shortlist = np.sort(rows[np.argpartition(-scores, depth - 1)[:depth]])
+                    rows, scores = shortlist, np.asarray(self._vectors[shortlist]) @ query
+            else:
+                scores = np.asarray(self._vectors[rows]) @ query
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [
+                {"id": self._ids[rows[i]], "score": float(scores[i]), "metadata": self._full_metadata(rows[i])}
+                for i in best
+            ]
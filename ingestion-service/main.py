@@ -42,8 +42,11 @@ def main():
     logger.info(f"Starting Ingestion Service on {host}:{port}")
     logger.info("Available endpoints:")
     logger.info("  - GET  /health - Health check")
+    logger.info("  - GET  /metrics - Prometheus metrics")
     logger.info("  - POST /ingest - Start PDF ingestion")
     logger.info("  - GET  /ingest/status/{task_id} - Check task status")
+    logger.info("  - GET  /ingest/jobs - List ingestion jobs")
+    logger.info("  - POST /ingest/jobs/{task_id}/cancel - Cancel a task")
     logger.info("  - GET  / - Service information")
     
     # Run the FastAPI application
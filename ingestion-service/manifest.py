@@ -0,0 +1,293 @@
+"""Local record of what has already been ingested, for incremental re-runs.
+
+The manifest is a SQLite file holding, per source PDF, its content hash, mtime
+and size, plus the hash and vector id of every chunk it produced. A re-run
+compares the folder against it to find new, modified, unchanged and removed
+files, and compares a modified file's chunks against the stored ones so only
+changed chunks are embedded and only vanished chunks are deleted.
+
+Chunks that duplicate another chunk share its vector id, so a vector is only
+deleted once no file's chunks refer to it any more.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+NEW = "new"
+MODIFIED = "modified"
+UNCHANGED = "unchanged"
+REMOVED = "removed"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FileChange:
+    """What a run has to do with one source file."""
+
+    source: str
+    status: str
+    content_hash: Optional[str] = None
+    mtime: float = 0.0
+    size: int = 0
+    # Content matched the manifest but mtime or size did not
+    stat_changed: bool = False
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_digest(chunk) -> str:
+    """Hash of a chunk's text and page; a chunk that moved to another page counts as changed."""
+    page = getattr(chunk, "metadata", {}).get("page", "")
+    digest = hashlib.sha256()
+    digest.update(str(page).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(chunk.page_content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _to_signed(value: Optional[int]) -> Optional[int]:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value is not None and value >= 1 << 63 else value
+
+
+def _from_signed(value: Optional[int]) -> Optional[int]:
+    return value & ((1 << 64) - 1) if value is not None else None
+
+
+def _band(shift: int, mask: int) -> str:
+    """SQL for one band of the simhash column; the arithmetic shift of a signed value keeps the bits under the mask."""
+    return f"((simhash >> {shift}) & {mask})"
+
+
+def diff_chunks(old: Sequence[Tuple[str, str]], new_hashes: Sequence[str]) -> Tuple[Dict[int, str], List[int], List[str]]:
+    """Match a file's new chunk hashes against its stored ``(chunk_hash, vector_id)`` pairs.
+
+    Returns the vector ids to keep by new position, the positions that need
+    embedding, and the stored vector ids no longer matched by any chunk.
+    Repeated chunks are matched one for one.
+    """
+    available = defaultdict(list)
+    for chunk_hash, vector_id in old:
+        available[chunk_hash].append(vector_id)
+
+    kept: Dict[int, str] = {}
+    to_embed: List[int] = []
+    for position, chunk_hash in enumerate(new_hashes):
+        if available.get(chunk_hash):
+            kept[position] = available[chunk_hash].pop()
+        else:
+            to_embed.append(position)
+
+    stale = [vector_id for ids in available.values() for vector_id in ids]
+    return kept, to_embed, stale
+
+
+class Manifest:
+    """SQLite-backed manifest of ingested files and chunks.
+
+    ``namespace`` identifies the index and model the vectors were written to;
+    opening a manifest under a different namespace starts it afresh, since its
+    records say nothing about the new target.
+    """
+
+    def __init__(self, path: str, namespace: str = ""):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS files (
+                source TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                source TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                text_hash TEXT,
+                simhash INTEGER,
+                PRIMARY KEY (source, position)
+            );
+            """
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks)")}
+        with self._db:
+            # Manifests written before near-duplicate detection lack the signature columns
+            for column, kind in (("text_hash", "TEXT"), ("simhash", "INTEGER")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE chunks ADD COLUMN {column} {kind}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS chunks_vector ON chunks (vector_id)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS chunks_text_hash ON chunks (text_hash)")
+        self._check_namespace(namespace)
+
+    def _check_namespace(self, namespace: str) -> None:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'namespace'").fetchone()
+            if row is not None and row[0] != namespace:
+                logger.warning(f"Manifest {self.path} was written for '{row[0]}', not '{namespace}'; starting afresh")
+                self._db.execute("DELETE FROM files")
+                self._db.execute("DELETE FROM chunks")
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('namespace', ?)", (namespace,))
+
+    def get_file(self, source: str) -> Optional[Tuple[str, float, int]]:
+        """Stored ``(content_hash, mtime, size)`` of a file, or None if it was never ingested."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT content_hash, mtime, size FROM files WHERE source = ?", (source,)
+            ).fetchone()
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT source FROM files")]
+
+    def chunks(self, source: str) -> List[Tuple[str, str]]:
+        """Stored ``(chunk_hash, vector_id)`` pairs of a file, in chunk order."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT chunk_hash, vector_id FROM chunks WHERE source = ? ORDER BY position", (source,)
+            ).fetchall()
+
+    def index_bands(self, bands: Sequence[Tuple[int, int]]) -> None:
+        """Index the simhash bands ``find_near`` is going to be asked about, as ``(shift, mask)`` pairs."""
+        with self._lock, self._db:
+            for shift, mask in bands:
+                self._db.execute(
+                    f"CREATE INDEX IF NOT EXISTS chunks_band_{shift}_{mask.bit_length()} ON chunks ({_band(shift, mask)})"
+                )
+
+    def find_text_hash(self, text_hash: str) -> Optional[str]:
+        """Vector id of a recorded chunk with this duplicate-detection text hash, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT vector_id FROM chunks WHERE text_hash = ? LIMIT 1", (text_hash,)).fetchone()
+        return row[0] if row is not None else None
+
+    def find_near(self, bands: Sequence[Tuple[int, int]], keys: Sequence[int]) -> List[Tuple[int, str]]:
+        """``(simhash, vector_id)`` of recorded chunks whose simhash has ``keys`` in at least one of ``bands``."""
+        # Bands are compared as the same expressions index_bands indexed, so each one is an index lookup
+        query = " UNION ".join(f"SELECT simhash, vector_id FROM chunks WHERE {_band(shift, mask)} = ?" for shift, mask in bands)
+        with self._lock:
+            rows = self._db.execute(query, list(keys)).fetchall()
+        return [(_from_signed(simhash), vector_id) for simhash, vector_id in rows]
+
+    def referenced(self, vector_ids: Sequence[str], excluding: str) -> set:
+        """Those of ``vector_ids`` that chunks of files other than ``excluding`` still use."""
+        found = set()
+        with self._lock:
+            for i in range(0, len(vector_ids), 500):
+                part = list(vector_ids[i:i + 500])
+                placeholders = ",".join("?" * len(part))
+                found.update(row[0] for row in self._db.execute(
+                    f"SELECT DISTINCT vector_id FROM chunks WHERE vector_id IN ({placeholders}) AND source != ?",
+                    part + [excluding]
+                ))
+        return found
+
+    def commit_file(
+        self,
+        change: FileChange,
+        chunks: Sequence[Tuple[str, str]],
+        signatures: Optional[Sequence[Tuple[str, Optional[int]]]] = None,
+    ) -> None:
+        """Record a file as fully ingested with its ``(chunk_hash, vector_id)`` pairs.
+
+        ``signatures`` are the chunks' ``(text_hash, simhash)`` for duplicate detection, in the same order.
+        """
+        signatures = signatures or [(None, None)] * len(chunks)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks WHERE source = ?", (change.source,))
+            self._db.executemany(
+                "INSERT INTO chunks (source, position, chunk_hash, vector_id, text_hash, simhash) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (change.source, position, chunk_hash, vector_id, text_hash, _to_signed(simhash))
+                    for position, ((chunk_hash, vector_id), (text_hash, simhash)) in enumerate(zip(chunks, signatures))
+                ]
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (source, content_hash, mtime, size, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (change.source, change.content_hash, change.mtime, change.size, time.time())
+            )
+
+    def touch(self, change: FileChange) -> None:
+        """Update mtime and size of a file whose content turned out to be unchanged."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE files SET mtime = ?, size = ? WHERE source = ?", (change.mtime, change.size, change.source)
+            )
+
+    def remove_file(self, source: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._db.execute("DELETE FROM files WHERE source = ?", (source,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def plan_changes(
+    manifest: Optional[Manifest],
+    pdf_files: Sequence[str],
+    folder_path: str,
+    force: bool = False,
+) -> List[FileChange]:
+    """Classify every PDF in the folder, plus manifest entries for files that are gone.
+
+    A file whose mtime and size match the manifest is unchanged without being
+    read; otherwise its content hash decides. Without a manifest every file is new.
+    ``force`` treats every present file as modified.
+    """
+    changes = []
+    for source in pdf_files:
+        stat = os.stat(source)
+        change = FileChange(source=source, status=NEW, mtime=stat.st_mtime, size=stat.st_size)
+        changes.append(change)
+        if manifest is None:
+            continue
+
+        stored = manifest.get_file(source)
+        if stored is not None:
+            stored_hash, stored_mtime, stored_size = stored
+            if not force and stored_mtime == change.mtime and stored_size == change.size:
+                change.status = UNCHANGED
+                change.content_hash = stored_hash
+                continue
+            change.content_hash = file_digest(source)
+            if not force and change.content_hash == stored_hash:
+                change.status = UNCHANGED
+                change.stat_changed = True
+            else:
+                change.status = MODIFIED
+        else:
+            change.content_hash = file_digest(source)
+
+    if manifest is not None:
+        present = set(pdf_files)
+        folder = os.path.normpath(folder_path)
+        for source in manifest.sources():
+            if source not in present and os.path.dirname(os.path.normpath(source)) == folder:
+                changes.append(FileChange(source=source, status=REMOVED))
+    return changes
@@ -0,0 +1,33 @@
+"""Prometheus metrics for the ingestion pipeline.
+
+Counters are totals; Prometheus derives pages, chunks, embeddings and upserts
+per second from them with ``rate()``. The gateway exposes everything at ``/metrics``.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+PAGES = Counter("ingestion_pages_total", "PDF pages loaded")
+CHUNKS = Counter("ingestion_chunks_total", "Text chunks produced by the splitter")
+EMBEDDINGS = Counter("ingestion_embeddings_total", "Chunks embedded")
+DEDUPLICATED = Counter("ingestion_chunks_deduplicated_total", "Chunks that reused a duplicate's vector, by match", ["kind"])
+UPSERTS = Counter("ingestion_upserts_total", "Vectors upserted to the vector store")
+UPSERT_RETRIES = Counter("ingestion_upsert_retries_total", "Upsert batches retried after a failure")
+UPSERTS_IN_FLIGHT = Gauge("ingestion_upserts_in_flight", "Upsert batches currently being written")
+FILES = Counter("ingestion_files_total", "PDF files processed, by outcome", ["status"])
+RUNS = Counter("ingestion_runs_total", "Ingestion runs started through the gateway, by mode", ["mode"])
+JOBS_FINISHED = Counter("ingestion_jobs_finished_total", "Ingestion jobs finished, by final status", ["status"])
+JOBS_RUNNING = Gauge("ingestion_jobs_running", "Ingestion jobs currently running")
+JOBS_QUEUED = Gauge("ingestion_jobs_queued", "Ingestion jobs waiting for a free worker")
+
+# Per-file time spent in each pipeline stage: load, split, embed, upsert
+STAGE_LATENCY = Histogram(
+    "ingestion_stage_duration_seconds",
+    "Time spent in each ingestion stage per file",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+
+LOAD_LATENCY = STAGE_LATENCY.labels("load")
+SPLIT_LATENCY = STAGE_LATENCY.labels("split")
+EMBED_LATENCY = STAGE_LATENCY.labels("embed")
+UPSERT_LATENCY = STAGE_LATENCY.labels("upsert")
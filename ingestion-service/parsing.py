@@ -0,0 +1,93 @@
+"""PDF extraction and chunking, fanned out over a process pool.
+
+Parsing is CPU-bound pure Python, so it scales with processes rather than
+threads. This module deliberately imports only the loader and the chunkers:
+with the ``spawn`` start method each worker imports it fresh, and keeping torch
+and the vector store clients out of it keeps worker startup cheap. Each worker
+builds its chunker (and loads the tokenizer) once and reuses it for every file.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from chunking import ChunkerSpec
+
+
+@dataclass
+class ParsedPdf:
+    """Chunks of one PDF, or the error that stopped it, plus stage timings."""
+
+    source: str
+    pages: int = 0
+    chunks: List = field(default_factory=list)
+    load_seconds: float = 0.0
+    split_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def parse_pdf(pdf_file: str, chunker: ChunkerSpec = ChunkerSpec()) -> ParsedPdf:
+    """Load a PDF and split it into chunks. Runs in a worker process."""
+    result = ParsedPdf(source=pdf_file)
+    try:
+        started = time.perf_counter()
+        documents = PyPDFLoader(pdf_file).load()
+        loaded = time.perf_counter()
+
+        result.chunks = chunker.build().split_documents(documents)
+        result.pages = len(documents)
+        result.load_seconds = loaded - started
+        result.split_seconds = time.perf_counter() - loaded
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def iter_parsed_pdfs(
+    pdf_files: Sequence[str],
+    workers: int,
+    chunker: ChunkerSpec = ChunkerSpec(),
+    start_method: str = "spawn",
+    max_in_flight: Optional[int] = None,
+) -> Iterator[ParsedPdf]:
+    """Parse PDFs across ``workers`` processes, yielding each one as soon as it is done.
+
+    Results come back in completion order, not input order. At most
+    ``max_in_flight`` files (default: twice the worker count) are submitted
+    at once, so parsed chunks never pile up faster than the caller consumes them.
+    """
+    if workers <= 1 or len(pdf_files) <= 1:
+        for pdf_file in pdf_files:
+            yield parse_pdf(pdf_file, chunker)
+        return
+
+    max_in_flight = max(max_in_flight or workers * 2, 1)
+    context = multiprocessing.get_context(start_method)
+    with ProcessPoolExecutor(max_workers=min(workers, len(pdf_files)), mp_context=context) as pool:
+        remaining = iter(pdf_files)
+        in_flight: Dict[Future, str] = {}
+
+        def submit_next() -> bool:
+            pdf_file = next(remaining, None)
+            if pdf_file is None:
+                return False
+            in_flight[pool.submit(parse_pdf, pdf_file, chunker)] = pdf_file
+            return True
+
+        while len(in_flight) < max_in_flight and submit_next():
+            pass
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_file = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. killed by the OOM killer)
+                    yield ParsedPdf(source=pdf_file, error=str(e))
+                submit_next()
@@ -0,0 +1,609 @@
+"""Streaming ingestion pipeline: parse -> embed -> upsert over bounded queues.
+
+Parsing runs on a feeder thread (which itself fans out to worker processes),
+embedding runs on the calling thread and upserts run on a writer thread. Each
+hand-off is a bounded queue, so only a few files' worth of chunks and vectors
+are held in memory at any time, however large the corpus is. A slow stage
+blocks the one before it instead of letting work pile up.
+
+The writer keeps several upsert batches in flight at once so network round
+trips overlap, sizes batches by their estimated payload bytes, and retries
+failed batches with exponential backoff.
+
+With a manifest, only new and modified files are parsed, only their changed
+chunks are embedded, and vectors of vanished chunks and files are deleted. A
+file is recorded in the manifest once all its vectors are written, so a file
+that failed part-way is picked up again by the next run.
+
+Between parsing and embedding, chunks that repeat one already stored or on its
+way to the store, exactly or nearly (``dedup.py``), reuse that chunk's vector id
+and are neither encoded nor upserted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import metrics
+from config import IngestionConfig
+from dedup import ChunkDeduplicator, DedupEntry, Signature, chunk_signature
+from manifest import MODIFIED, NEW, REMOVED, UNCHANGED, FileChange, Manifest, chunk_digest, diff_chunks
+from parsing import iter_parsed_pdfs
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class IngestionCancelled(RuntimeError):
+    """Raised by ``IngestionPipeline.run`` when its ``cancel`` event is set."""
+
+
+@dataclass
+class IngestionSummary:
+    """Counts reported back to the caller instead of the documents themselves.
+
+    ``chunks`` counts chunks that needed embedding and ``chunks_unchanged`` those
+    whose stored vectors were kept. ``chunks_deduplicated`` of the ``chunks``
+    reused the vector of a chunk they duplicate instead. In a dry run, ``chunks`` and ``vectors_deleted``
+    are what a real run would embed and delete; nothing is embedded, written or deleted.
+    """
+
+    files_found: int = 0
+    files_new: int = 0
+    files_modified: int = 0
+    files_unchanged: int = 0
+    files_removed: int = 0
+    files_processed: int = 0
+    files_failed: int = 0
+    pages: int = 0
+    chunks: int = 0
+    chunks_unchanged: int = 0
+    chunks_deduplicated: int = 0
+    embeddings: int = 0
+    upserts: int = 0
+    upsert_failures: int = 0
+    vectors_deleted: int = 0
+    seconds: float = 0.0
+    dry_run: bool = False
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class FileProgress:
+    """Tracks one file's chunks through embed and upsert until it can be committed."""
+
+    change: FileChange
+    chunk_hashes: List[str]
+    vector_ids: Dict[int, str]
+    stale_ids: List[str]
+    signatures: Optional[List[Signature]] = None
+    pending: int = 0
+    failed: bool = False
+
+
+@dataclass
+class PendingChunk:
+    """A chunk on its way through the pipeline, with where it came from."""
+
+    source: str
+    position: int
+    chunk: Any
+    progress: Optional[FileProgress] = field(default=None, repr=False)
+    # Set when later duplicates may reuse this chunk's vector
+    dedup_entry: Optional[DedupEntry] = field(default=None, repr=False)
+
+
+@dataclass
+class WaitingDuplicates:
+    """A file's duplicates of chunks that were still on their way to the store when it was parsed."""
+
+    items: List[Tuple[PendingChunk, DedupEntry]]
+
+
+def make_vector_id(source: str, page, offset, text: str) -> str:
+    """Stable id for a chunk: digest of its source path, page, character offset and content digest.
+
+    The same chunk of the same file always gets the same id, in any process,
+    so re-upserting it overwrites the existing vector instead of adding one.
+    """
+    source_digest = hashlib.sha256(os.path.normpath(source).encode("utf-8")).hexdigest()[:16]
+    content_digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{source_digest}:{page}:{offset}:{content_digest}"
+
+
+def to_vector_record(item: PendingChunk, vector) -> dict:
+    """Vector store record for one embedded chunk."""
+    text = item.chunk
+    metadata = getattr(text, 'metadata', {})
+    page = metadata.get('page', 0)
+    # Splitters without start_index fall back to the chunk's position in the file
+    offset = metadata.get('start_index', item.position)
+    return {
+        "id": make_vector_id(item.source, page, offset, text.page_content),
+        "values": vector.tolist(),  # Convert numpy array to list
+        "metadata": {
+            "source": item.source,
+            "page": page,
+            "offset": offset,
+            "chunk_text": text.page_content
+        }
+    }
+
+
+def record_size(record: dict) -> int:
+    """Rough serialized size of a vector record in bytes; floats are counted at their longest JSON form."""
+    metadata = json.dumps(record.get("metadata") or {}, ensure_ascii=False)
+    return len(record["id"]) + 20 * len(record["values"]) + len(metadata.encode("utf-8")) + 64
+
+
+def plan_batches(records: Sequence[dict], max_records: int, max_bytes: int) -> List[Tuple[int, int]]:
+    """Split records into ``(start, end)`` batches of at most ``max_records`` and about ``max_bytes``.
+
+    Long chunks make for heavy metadata, so a batch of long chunks holds fewer
+    records. A single record over the byte budget still gets a batch of its own.
+    """
+    batches = []
+    start, size = 0, 0
+    for i, record in enumerate(records):
+        record_bytes = record_size(record)
+        if i > start and (i - start >= max_records or size + record_bytes > max_bytes):
+            batches.append((start, i))
+            start, size = i, 0
+        size += record_bytes
+    if start < len(records):
+        batches.append((start, len(records)))
+    return batches
+
+
+class IngestionPipeline:
+    """Run PDFs through parse, embed and upsert stages with bounded memory.
+
+    ``encode`` turns a list of texts into one vector per text. ``upsert``
+    receives lists of at most ``config.upsert_batch_size`` vector records
+    (fewer when they exceed ``config.upsert_max_bytes``), from up to
+    ``config.upsert_concurrency`` threads at once, and ``delete`` lists of vector ids; when ``upsert`` is None, vectors are
+    computed but not stored and the manifest is left untouched. ``force``
+    re-embeds every chunk of the files it parses.
+
+    ``on_progress`` is called with the running summary after every parsed file
+    and every upsert batch, from the calling and the writer thread. Setting
+    ``cancel`` stops the run: batches already queued are still written, files
+    not fully written are left out of the manifest, and ``run`` raises
+    ``IngestionCancelled``.
+    """
+
+    def __init__(
+        self,
+        config: IngestionConfig,
+        encode: Optional[Callable[[List[str]], Sequence]],
+        upsert: Optional[Callable[[List[dict]], None]] = None,
+        delete: Optional[Callable[[List[str]], None]] = None,
+        manifest: Optional[Manifest] = None,
+        dry_run: bool = False,
+        force: bool = False,
+        on_progress: Optional[Callable[[IngestionSummary], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ):
+        self.config = config
+        self.encode = encode
+        self.upsert = upsert
+        self.delete = delete
+        self.manifest = manifest
+        self.dry_run = dry_run
+        self.force = force
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.dedup: Optional[ChunkDeduplicator] = None
+        self._stop = threading.Event()
+
+    @property
+    def _records_writes(self) -> bool:
+        return self.manifest is not None and self.upsert is not None and not self.dry_run
+
+    def _cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Block until there is room in the queue; give up if the pipeline is stopping or cancelled."""
+        while not self._stop.is_set() and not self._cancelled():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _check(self, writer_errors: list) -> None:
+        """Raise the writer's error, or ``IngestionCancelled``, once the run cannot go on."""
+        if writer_errors:
+            raise writer_errors[0]
+        if self._cancelled():
+            raise IngestionCancelled("Ingestion was cancelled")
+
+    def _report(self, summary: IngestionSummary) -> None:
+        if self.on_progress is not None:
+            try:
+                self.on_progress(summary)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {str(e)}")
+
+    def _next_parsed(self, parsed_queue: queue.Queue):
+        """Wait for the next parsed file, checking for cancellation while waiting."""
+        while True:
+            if self._cancelled():
+                raise IngestionCancelled("Ingestion was cancelled")
+            try:
+                return parsed_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _delete(self, vector_ids: List[str], summary: IngestionSummary) -> bool:
+        if not vector_ids:
+            return True
+        if self.dry_run:
+            summary.vectors_deleted += len(vector_ids)
+            return True
+        if self.delete is None:
+            return False
+        try:
+            self.delete(vector_ids)
+            summary.vectors_deleted += len(vector_ids)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to delete {len(vector_ids)} stale vectors: {str(e)}")
+            return False
+
+    def _unshared(self, vector_ids: List[str], source: str) -> List[str]:
+        """Of a file's vectors about to go, those no other chunk reuses as a duplicate."""
+        if self.dedup is not None:
+            vector_ids = self.dedup.retire(vector_ids)
+        if self.manifest is None or not vector_ids:
+            return vector_ids
+        shared = self.manifest.referenced(vector_ids, excluding=source)
+        return [vector_id for vector_id in vector_ids if vector_id not in shared]
+
+    def _apply_unchanged_and_removed(self, changes: Sequence[FileChange], summary: IngestionSummary) -> None:
+        for change in changes:
+            if change.status == UNCHANGED:
+                summary.files_unchanged += 1
+                if change.stat_changed and self._records_writes:
+                    self.manifest.touch(change)
+            elif change.status == REMOVED and self.manifest is not None:
+                summary.files_removed += 1
+                vector_ids = self._unshared(
+                    list(dict.fromkeys(vector_id for _, vector_id in self.manifest.chunks(change.source))), change.source
+                )
+                logger.info(f"{change.source} was removed; deleting its {len(vector_ids)} vectors")
+                if self.dry_run:
+                    self._delete(vector_ids, summary)
+                elif self._records_writes and self._delete(vector_ids, summary):
+                    self.manifest.remove_file(change.source)
+
+    def _finalize(self, progress: FileProgress, summary: IngestionSummary) -> None:
+        """Delete a file's stale vectors and record it in the manifest once all its chunks are stored."""
+        if progress.failed:
+            logger.warning(f"Not recording {progress.change.source} in the manifest; it will be retried next run")
+            return
+        # A stale id that was just rewritten by a new chunk must not be deleted
+        written = set(progress.vector_ids.values())
+        stale = self._unshared([vector_id for vector_id in progress.stale_ids if vector_id not in written], progress.change.source)
+        if not self._delete(stale, summary):
+            return
+        self.manifest.commit_file(
+            progress.change,
+            [(chunk_hash, progress.vector_ids[position]) for position, chunk_hash in enumerate(progress.chunk_hashes)],
+            progress.signatures
+        )
+
+    def _parse_stage(self, pdf_files: Sequence[str], parsed_queue: queue.Queue, errors: list) -> None:
+        parsed_files = iter_parsed_pdfs(
+            pdf_files,
+            workers=self.config.parse_workers,
+            chunker=self.config.chunker_spec,
+            start_method=self.config.parse_start_method
+        )
+        try:
+            for parsed in parsed_files:
+                if not self._put(parsed_queue, parsed):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Shuts the worker pool down if we stopped early
+            parsed_files.close()
+            parsed_queue.put(_DONE)
+
+    def _upsert_batch(self, records: List[dict]) -> bool:
+        """Write one batch, retrying with exponential backoff. Runs on an upsert thread."""
+        delay = self.config.upsert_retry_backoff
+        attempts = max(self.config.upsert_retries, 0) + 1
+        metrics.UPSERTS_IN_FLIGHT.inc()
+        try:
+            for attempt in range(1, attempts + 1):
+                started = time.perf_counter()
+                try:
+                    self.upsert(records)
+                    metrics.UPSERT_LATENCY.observe(time.perf_counter() - started)
+                    return True
+                except Exception as e:
+                    if attempt == attempts or self._stop.is_set():
+                        logger.warning(f"Failed to upsert {len(records)} vectors after {attempt} attempts: {str(e)}")
+                        return False
+                    logger.warning(
+                        f"Upsert of {len(records)} vectors failed (attempt {attempt}/{attempts}), "
+                        f"retrying in {delay:.2f}s: {str(e)}"
+                    )
+                    metrics.UPSERT_RETRIES.inc()
+                    # Jitter keeps concurrent batches from retrying in lockstep
+                    if self._stop.wait(delay * random.uniform(0.5, 1.5)):
+                        return False
+                    delay *= 2
+        finally:
+            metrics.UPSERTS_IN_FLIGHT.dec()
+
+    def _collect(self, in_flight: Dict[Future, Tuple[List[PendingChunk], List[dict]]], summary: IngestionSummary) -> None:
+        """Wait for at least one in-flight batch and account for every finished one."""
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            items, records = in_flight.pop(future)
+            failed = not future.result()
+            if failed:
+                summary.upsert_failures += len(items)
+            else:
+                summary.upserts += len(items)
+                metrics.UPSERTS.inc(len(items))
+
+            for item, record in zip(items, records):
+                self._chunk_written(item, record["id"], failed, summary)
+                if item.dedup_entry is None:
+                    continue
+                # Duplicates waiting on this chunk share its outcome
+                if failed:
+                    duplicates = self.dedup.discard(item.dedup_entry)
+                else:
+                    duplicates = self.dedup.resolve(item.dedup_entry, record["id"])
+                for duplicate in duplicates:
+                    self._chunk_written(duplicate, record["id"], failed, summary)
+        self._report(summary)
+
+    def _chunk_written(self, item: PendingChunk, vector_id: Optional[str], failed: bool, summary: IngestionSummary) -> None:
+        """Account for one chunk's outcome; runs on the writer thread."""
+        progress = item.progress
+        if progress is None:
+            return
+        progress.vector_ids[item.position] = vector_id
+        progress.failed = progress.failed or failed
+        progress.pending -= 1
+        if progress.pending == 0:
+            self._finalize(progress, summary)
+
+    def _upsert_stage(self, upsert_queue: queue.Queue, summary: IngestionSummary, errors: list) -> None:
+        """Run the writer; an error stops the pipeline and is raised again by ``run``."""
+        try:
+            self._write(upsert_queue, summary)
+        except BaseException as e:
+            logger.error(f"Upsert stage failed: {str(e)}")
+            errors.append(e)
+            self._stop.set()
+
+    def _write(self, upsert_queue: queue.Queue, summary: IngestionSummary) -> None:
+        """Keep up to twice ``upsert_concurrency`` batches in flight; bookkeeping stays on this thread."""
+        concurrency = max(self.config.upsert_concurrency, 1)
+        in_flight: Dict[Future, Tuple[List[PendingChunk], List[dict]]] = {}
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest-upsert") as pool:
+            while True:
+                batch = upsert_queue.get()
+                if batch is _DONE:
+                    break
+                if isinstance(batch, FileProgress):
+                    # A file with nothing to embed
+                    self._finalize(batch, summary)
+                    continue
+                if isinstance(batch, WaitingDuplicates):
+                    for item, entry in batch.items:
+                        if self.dedup.wait(entry, item):
+                            self._chunk_written(item, entry.vector_id, entry.failed, summary)
+                    continue
+                while len(in_flight) >= 2 * concurrency:
+                    self._collect(in_flight, summary)
+                items, records = batch
+                in_flight[pool.submit(self._upsert_batch, records)] = (items, records)
+            while in_flight:
+                self._collect(in_flight, summary)
+
+    def _embed(self, buffer: List[PendingChunk], upsert_queue: queue.Queue, summary: IngestionSummary) -> None:
+        """Encode a buffer of chunks drawn from any number of files and queue them for upsert."""
+        logger.debug(f"Generating embeddings for {len(buffer)} chunks")
+        with metrics.EMBED_LATENCY.time():
+            vectors = self.encode([item.chunk.page_content for item in buffer])
+        summary.embeddings += len(vectors)
+        metrics.EMBEDDINGS.inc(len(vectors))
+
+        if self.upsert is None:
+            return
+        records = [to_vector_record(item, vector) for item, vector in zip(buffer, vectors)]
+        for start, end in plan_batches(records, self.config.upsert_batch_size, self.config.upsert_max_bytes):
+            if not self._put(upsert_queue, (buffer[start:end], records[start:end])):
+                return
+
+    def _plan_file(
+        self, change: FileChange, chunks: List, signatures: Optional[List[Signature]]
+    ) -> Tuple[List[int], Optional[FileProgress]]:
+        """Positions of a parsed file's chunks that need embedding, and its manifest progress."""
+        if self.manifest is None:
+            return list(range(len(chunks))), None
+
+        chunk_hashes = [chunk_digest(chunk) for chunk in chunks]
+        stored = self.manifest.chunks(change.source) if change.status == MODIFIED else []
+        if self.force:
+            # Re-embed everything; stable ids mean matching chunks are simply overwritten
+            kept, to_embed, stale = {}, list(range(len(chunks))), [vector_id for _, vector_id in stored]
+        else:
+            kept, to_embed, stale = diff_chunks(stored, chunk_hashes)
+        progress = FileProgress(change, chunk_hashes, dict(kept), stale, signatures, pending=len(to_embed))
+        return to_embed, progress
+
+    def _open_dedup(self) -> Optional[ChunkDeduplicator]:
+        """Duplicate index for this run, which also looks up the chunks the manifest says are stored."""
+        if not self.config.dedup:
+            return None
+        # After force the index may have been wiped, so only this run's own vectors can be reused
+        stored = self.manifest if self.manifest is not None and not self.force else None
+        return ChunkDeduplicator(self.config.dedup_threshold, stored=stored)
+
+    def _deduplicate(
+        self,
+        source: str,
+        chunks: List,
+        to_embed: List[int],
+        progress: Optional[FileProgress],
+        signatures: Optional[List[Signature]],
+        summary: IngestionSummary,
+    ) -> Tuple[List[PendingChunk], List[Tuple[PendingChunk, DedupEntry]]]:
+        """The chunks that need encoding, and duplicates of chunks still being written.
+
+        Duplicates of stored chunks take their vector id right away. Runs before
+        any of the file's chunks reach the writer, so ``progress`` is not shared yet.
+        """
+        if self.dedup is None:
+            return [PendingChunk(source, position, chunks[position], progress) for position in to_embed], []
+
+        pending, waiting = [], []
+        for position in to_embed:
+            item = PendingChunk(source, position, chunks[position], progress)
+            found = self.dedup.find(signatures[position])
+            if found is None:
+                item.dedup_entry = self.dedup.add(signatures[position])
+                pending.append(item)
+                continue
+            kind, entry = found
+            summary.chunks_deduplicated += 1
+            metrics.DEDUPLICATED.labels(kind).inc()
+            if progress is None:
+                continue
+            if entry.vector_id is not None:
+                progress.vector_ids[position] = entry.vector_id
+                progress.pending -= 1
+            else:
+                waiting.append((item, entry))
+        return pending, waiting
+
+    def run(self, changes: Sequence[FileChange]) -> IngestionSummary:
+        summary = IngestionSummary(files_found=sum(change.status != REMOVED for change in changes), dry_run=self.dry_run)
+        started = time.perf_counter()
+        self._stop.clear()
+        self.dedup = None
+
+        self._apply_unchanged_and_removed(changes, summary)
+        to_parse = {change.source: change for change in changes if change.status in (NEW, MODIFIED)}
+        summary.files_new = sum(change.status == NEW for change in to_parse.values())
+        summary.files_modified = len(to_parse) - summary.files_new
+        self._report(summary)
+        if not to_parse:
+            summary.seconds = round(time.perf_counter() - started, 3)
+            return summary
+
+        self.dedup = self._open_dedup()
+        parsed_queue: queue.Queue = queue.Queue(maxsize=max(self.config.parse_queue_size, 1))
+        upsert_queue: queue.Queue = queue.Queue(maxsize=max(self.config.upsert_queue_size, 1))
+        parse_errors: list = []
+        writer_errors: list = []
+
+        parser = threading.Thread(
+            target=self._parse_stage, args=(list(to_parse), parsed_queue, parse_errors), name="ingest-parse", daemon=True
+        )
+        writer = threading.Thread(
+            target=self._upsert_stage, args=(upsert_queue, summary, writer_errors), name="ingest-upsert", daemon=True
+        )
+        parser.start()
+        writer.start()
+
+        buffer: List[PendingChunk] = []
+        try:
+            while True:
+                parsed = self._next_parsed(parsed_queue)
+                if parsed is _DONE:
+                    break
+                if parsed.error is not None:
+                    summary.files_failed += 1
+                    metrics.FILES.labels("failed").inc()
+                    logger.error(f"Error loading {parsed.source}: {parsed.error}")
+                    self._report(summary)
+                    continue
+
+                summary.files_processed += 1
+                summary.pages += parsed.pages
+                metrics.LOAD_LATENCY.observe(parsed.load_seconds)
+                metrics.SPLIT_LATENCY.observe(parsed.split_seconds)
+                metrics.PAGES.inc(parsed.pages)
+                metrics.CHUNKS.inc(len(parsed.chunks))
+                metrics.FILES.labels("success").inc()
+
+                signatures = None
+                if self.dedup is not None:
+                    signatures = [chunk_signature(chunk.page_content) for chunk in parsed.chunks]
+                to_embed, progress = self._plan_file(to_parse[parsed.source], parsed.chunks, signatures)
+                if self.dry_run and progress is not None:
+                    self._delete(progress.stale_ids, summary)
+                if not self._records_writes:
+                    progress = None
+                pending, waiting = self._deduplicate(parsed.source, parsed.chunks, to_embed, progress, signatures, summary)
+                summary.chunks += len(to_embed)
+                summary.chunks_unchanged += len(parsed.chunks) - len(to_embed)
+                logger.info(
+                    f"Loaded {parsed.pages} pages ({len(parsed.chunks)} chunks, {len(pending)} to embed, "
+                    f"{len(to_embed) - len(pending)} duplicates) from {parsed.source}"
+                )
+                self._report(summary)
+                if self.dry_run:
+                    continue
+
+                if waiting:
+                    self._put(upsert_queue, WaitingDuplicates(waiting))
+                elif progress is not None and progress.pending == 0:
+                    self._put(upsert_queue, progress)
+                buffer.extend(pending)
+                if len(buffer) >= self.config.embed_buffer_chunks:
+                    self._embed(buffer, upsert_queue, summary)
+                    buffer = []
+                self._check(writer_errors)
+
+            if buffer:
+                self._embed(buffer, upsert_queue, summary)
+                self._check(writer_errors)
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            # Drain so the parser can always deliver its end marker
+            while parser.is_alive():
+                try:
+                    parsed_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            # A writer that died no longer drains the queue
+            while writer.is_alive():
+                try:
+                    upsert_queue.put(_DONE, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            writer.join()
+
+        if writer_errors:
+            raise writer_errors[0]
+        if parse_errors:
+            raise parse_errors[0]
+        summary.seconds = round(time.perf_counter() - started, 3)
+        return summary
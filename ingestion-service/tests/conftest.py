@@ -0,0 +1,46 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pytest
+
+
+@dataclass
+class Chunk:
+    """The parts of a langchain Document the pipeline reads."""
+
+    page_content: str
+    metadata: dict = field(default_factory=dict)
+
+
+def chunks(*texts: str, page: int = 0) -> list:
+    offsets, position = [], 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text) + 1
+    return [Chunk(text, {"page": page, "start_index": offset}) for text, offset in zip(texts, offsets)]
+
+
+def encode(texts):
+    """Deterministic unit vectors, so tests need no model."""
+    vectors = []
+    for text in texts:
+        rng = np.random.default_rng(abs(hash(text)) % 2 ** 32)
+        vector = rng.standard_normal(8).astype(np.float32)
+        vectors.append(vector / np.linalg.norm(vector))
+    return vectors
+
+
+@pytest.fixture
+def parsed_pdfs(monkeypatch):
+    """Serve parsed PDFs from a ``{path: chunks}`` dict instead of parsing files."""
+    import pipeline
+    from parsing import ParsedPdf
+
+    documents = {}
+
+    def iter_parsed_pdfs(pdf_files, workers, chunker=None, start_method=None):
+        for pdf_file in pdf_files:
+            yield ParsedPdf(source=pdf_file, pages=1, chunks=list(documents[pdf_file]))
+
+    monkeypatch.setattr(pipeline, "iter_parsed_pdfs", iter_parsed_pdfs)
+    return documents
@@ -0,0 +1,61 @@
+import pickle
+
+import pytest
+
+from chunking import SPECIAL_TOKENS, ChunkerSpec, TokenChunker, _approximate_token_spans
+
+TEXT = (
+    "INTRODUCTION\n"
+    "The cat sat. The dog ran far away. Birds fly high.\n\n"
+    "Section 2 Details\n"
+    "A very long sentence with many many many words that goes on and on and on beyond the budget of tokens."
+)
+
+
+def split(text=TEXT, max_tokens=12, overlap_tokens=4, page=3):
+    return TokenChunker(_approximate_token_spans, max_tokens=max_tokens, overlap_tokens=overlap_tokens).split_text(text, page=page)
+
+
+def test_chunks_stay_within_the_token_budget():
+    chunks = split()
+    for chunk in chunks:
+        assert chunk.tokens == len(_approximate_token_spans(chunk.page_content))
+        assert chunk.tokens <= 12 - SPECIAL_TOKENS
+        assert chunk.metadata == {"page": 3, "start_index": chunk.start}
+        assert TEXT[chunk.start:chunk.end] == chunk.page_content
+        assert chunk.page_content == chunk.page_content.strip()
+
+
+def test_headings_start_a_new_chunk():
+    contents = [chunk.page_content for chunk in split()]
+    assert contents[0].startswith("INTRODUCTION")
+    assert "Section 2 Details" in contents
+    assert not any("Birds" in content and "Section" in content for content in contents)
+
+
+def test_consecutive_chunks_share_whole_trailing_sentences():
+    contents = [chunk.page_content for chunk in split()]
+    assert contents[:2] == ["INTRODUCTION\nThe cat sat.", "The cat sat. The dog ran far away."]
+
+
+def test_sentences_over_the_budget_are_cut_at_token_boundaries():
+    long_sentence = [chunk for chunk in split() if chunk.start >= TEXT.index("A very")]
+    assert len(long_sentence) > 1
+    assert " ".join(chunk.page_content for chunk in long_sentence) == TEXT[TEXT.index("A very"):]
+
+
+def test_short_page_is_one_chunk_and_empty_page_none():
+    chunks = split("Just one sentence here.", max_tokens=256)
+    assert [chunk.page_content for chunk in chunks] == ["Just one sentence here."]
+    assert split("   \n\n  ") == []
+
+
+def test_chunks_pickle_with_their_page_text():
+    chunks = split()
+    restored = pickle.loads(pickle.dumps(chunks))
+    assert [chunk.page_content for chunk in restored] == [chunk.page_content for chunk in chunks]
+
+
+def test_unknown_chunker_kind_is_rejected():
+    with pytest.raises(ValueError):
+        ChunkerSpec(kind="words").build()
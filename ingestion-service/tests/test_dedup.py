@@ -0,0 +1,127 @@
+from conftest import chunks, encode
+from test_pipeline import make_config
+
+from dedup import EXACT, NEAR, ChunkDeduplicator, chunk_signature
+from manifest import MODIFIED, NEW, FileChange, Manifest
+from pipeline import IngestionPipeline
+from vector_store import InMemoryVectorStore
+
+TEXT = "After the firmware update the office printer stops with error E-102 until the tray is reseated"
+NEAR_TEXT = TEXT + " firmly"
+
+
+def commit(manifest: Manifest, source: str, texts, vector_ids) -> None:
+    manifest.commit_file(
+        FileChange(source, NEW, content_hash=source),
+        [(f"{source}:{i}", vector_id) for i, vector_id in enumerate(vector_ids)],
+        [chunk_signature(text) for text in texts]
+    )
+
+
+def test_stored_chunks_are_found_in_the_manifest(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    commit(manifest, "a.pdf", [TEXT], ["vec-a"])
+    dedup = ChunkDeduplicator(0.9, stored=manifest)
+
+    kind, entry = dedup.find(chunk_signature(TEXT.upper()))
+    assert (kind, entry.vector_id) == (EXACT, "vec-a")
+    kind, entry = dedup.find(chunk_signature(NEAR_TEXT))
+    assert (kind, entry.vector_id) == (NEAR, "vec-a")
+    assert dedup.find(chunk_signature("Replace the toner cartridge when the warning light blinks twice in a row")) is None
+    assert len(dedup) == 0
+
+
+def test_fingerprints_with_the_top_bit_set_match_through_sqlite(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    dedup = ChunkDeduplicator(0.9, stored=manifest)
+    fingerprint = (1 << 63) | 0x0F0F_1234_5678_9ABC
+    manifest.commit_file(FileChange("a.pdf", NEW, content_hash="a"), [("c", "vec-a")], [("digest", fingerprint)])
+
+    kind, entry = dedup.find(("other digest", fingerprint ^ 0b101))
+    assert (kind, entry.vector_id) == (NEAR, "vec-a")
+
+
+def test_retired_vectors_are_not_offered_unless_a_duplicate_holds_them(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    commit(manifest, "a.pdf", [TEXT], ["vec-a"])
+    commit(manifest, "b.pdf", ["Hold the power button for ten seconds to reset the network settings"], ["vec-b"])
+    dedup = ChunkDeduplicator(0.9, stored=manifest)
+
+    assert dedup.retire(["vec-a"]) == ["vec-a"]
+    assert dedup.find(chunk_signature(TEXT)) is None
+
+    assert dedup.find(chunk_signature("hold the power button for ten seconds to reset the network settings")) is not None
+    assert dedup.retire(["vec-b"]) == []
+
+
+def test_chunks_of_the_run_match_before_they_are_written():
+    dedup = ChunkDeduplicator(0.9)
+    entry = dedup.add(chunk_signature(TEXT))
+
+    kind, found = dedup.find(chunk_signature(NEAR_TEXT))
+    assert (kind, found) == (NEAR, entry)
+    assert not dedup.wait(found, "waiter")
+    assert dedup.resolve(entry, "vec-new") == ["waiter"]
+    assert dedup.retire(["vec-new"]) == []
+
+
+def test_threshold_of_one_only_matches_exact_duplicates():
+    dedup = ChunkDeduplicator(1.0)
+    dedup.add(chunk_signature(TEXT))
+    assert dedup.find(chunk_signature(NEAR_TEXT)) is None
+    assert dedup.find(chunk_signature("  " + TEXT.lower()))[0] == EXACT
+
+
+def test_short_chunks_have_no_fingerprint():
+    assert chunk_signature("Table of contents")[1] is None
+
+
+TONER = "Replace the toner cartridge when the warning light blinks twice in a row"
+RESET = "Hold the power button for ten seconds to reset the network settings"
+
+
+def run_pipeline(manifest, store, changes, dedup=True):
+    config = make_config(dedup=dedup, dedup_threshold=0.9)
+    return IngestionPipeline(config, encode, store.upsert, store.delete, manifest=manifest).run(changes)
+
+
+def test_pipeline_reuses_vectors_of_duplicate_chunks(parsed_pdfs, tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    store = InMemoryVectorStore()
+    parsed_pdfs["a.pdf"] = chunks(TEXT, TONER)
+    parsed_pdfs["b.pdf"] = chunks(NEAR_TEXT, RESET)
+    changes = [FileChange(source, NEW, content_hash=source) for source in parsed_pdfs]
+
+    summary = run_pipeline(manifest, store, changes)
+    assert (summary.chunks, summary.chunks_deduplicated, summary.embeddings, summary.upserts) == (4, 1, 3, 3)
+    assert len(store.records) == 3
+    shared = {vector_id for _, vector_id in manifest.chunks("a.pdf")} & {vector_id for _, vector_id in manifest.chunks("b.pdf")}
+    assert len(shared) == 1
+
+    # A later run finds the duplicate through the manifest and embeds nothing
+    parsed_pdfs["c.pdf"] = chunks(TEXT.upper())
+    summary = run_pipeline(manifest, store, [FileChange("c.pdf", NEW, content_hash="c")])
+    assert (summary.chunks_deduplicated, summary.embeddings, summary.upserts) == (1, 0, 0)
+    assert {vector_id for _, vector_id in manifest.chunks("c.pdf")} == shared
+
+
+def test_shared_vector_outlives_the_file_that_wrote_it(parsed_pdfs, tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    store = InMemoryVectorStore()
+    parsed_pdfs["a.pdf"] = chunks(TEXT, TONER)
+    parsed_pdfs["b.pdf"] = chunks(TEXT)
+    run_pipeline(manifest, store, [FileChange(source, NEW, content_hash=source) for source in parsed_pdfs])
+    shared = {vector_id for _, vector_id in manifest.chunks("b.pdf")}
+
+    parsed_pdfs["a.pdf"] = chunks(TONER)
+    summary = run_pipeline(manifest, store, [FileChange("a.pdf", MODIFIED, content_hash="a2")])
+    assert summary.vectors_deleted == 0
+    assert shared <= set(store.records)
+
+
+def test_pipeline_without_dedup_embeds_every_chunk(parsed_pdfs, tmp_path):
+    store = InMemoryVectorStore()
+    parsed_pdfs["a.pdf"] = chunks(TEXT, TEXT.upper())
+    summary = run_pipeline(Manifest(str(tmp_path / "manifest.db")), store, [FileChange("a.pdf", NEW, content_hash="a")], dedup=False)
+    assert (summary.chunks_deduplicated, summary.upserts) == (0, 2)
+    assert len(store.records) == 2
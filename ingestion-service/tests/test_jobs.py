@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+
+from jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, Job, JobConflictError, JobManager, JobStore
+from pipeline import IngestionCancelled, IngestionSummary
+
+
+def make_runner(block: threading.Event = None):
+    """A runner that reports one processed file, optionally waiting for ``block`` or a cancel first."""
+    started = threading.Event()
+
+    def runner(job, on_progress, cancel):
+        started.set()
+        summary = IngestionSummary(files_found=1, files_new=1)
+        on_progress(summary)
+        while block is not None and not block.is_set():
+            if cancel.wait(0.01):
+                raise IngestionCancelled("Ingestion was cancelled")
+        summary.files_processed = 1
+        return summary
+
+    runner.started = started
+    return runner
+
+
+def test_store_round_trips_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = Job(id="a", folder_path="data", force=True, created_at=1.0, progress={"chunks": 3})
+    store.save(job)
+    store.save(Job(id="b", folder_path="data", status=COMPLETED, created_at=2.0, summary={"chunks": 1}))
+
+    assert store.get("a") == job
+    assert store.get("missing") is None
+    assert [item.id for item in store.list()] == ["b", "a"]
+    assert [item.id for item in store.list(status=COMPLETED)] == ["b"]
+    assert [item.id for item in store.unfinished()] == ["a"]
+
+
+def test_completed_job_records_summary(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), make_runner())
+    job, future = manager.submit("data")
+
+    assert future.result(timeout=5).files_processed == 1
+    stored = manager.get(job.id)
+    assert stored.status == COMPLETED
+    assert stored.summary["files_processed"] == 1
+    assert stored.progress["files_to_process"] == 1
+    manager.shutdown()
+
+
+def test_failed_job_records_error(tmp_path):
+    def runner(job, on_progress, cancel):
+        raise OSError("disk full")
+
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), runner)
+    job, future = manager.submit("data")
+
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    assert manager.get(job.id).status == FAILED
+    assert manager.get(job.id).error == "disk full"
+    manager.shutdown()
+
+
+def test_shutdown_leaves_running_job_to_resume(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    runner = make_runner(block=threading.Event())
+    manager = JobManager(JobStore(path), runner)
+    job, future = manager.submit("data")
+    assert runner.started.wait(5)
+    manager.shutdown()
+
+    with pytest.raises(IngestionCancelled):
+        future.result(timeout=5)
+    store = JobStore(path)
+    assert store.get(job.id).status == RUNNING
+
+    manager = JobManager(store, make_runner())
+    assert [resumed.id for resumed in manager.resume()] == [job.id]
+    manager.shutdown()
+    resumed = JobStore(path).get(job.id)
+    assert resumed.status == COMPLETED
+    assert resumed.summary["files_processed"] == 1
+
+
+def test_resume_marks_jobs_asked_to_cancel_as_cancelled(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    store.save(Job(id="queued", folder_path="a", status=QUEUED, created_at=1.0))
+    store.save(Job(id="cancelled", folder_path="b", status=RUNNING, created_at=2.0, cancel_requested=True))
+
+    runner = make_runner()
+    manager = JobManager(store, runner)
+    manager.resume()
+    manager.shutdown()
+
+    store = JobStore(path)
+    assert store.get("queued").status == COMPLETED
+    assert store.get("cancelled").status == CANCELLED
+    assert store.get("cancelled").finished_at is not None
+
+
+def test_cancel_stops_a_running_job(tmp_path):
+    runner = make_runner(block=threading.Event())
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), runner)
+    job, future = manager.submit("data")
+    assert runner.started.wait(5)
+
+    manager.cancel(job.id)
+    with pytest.raises(IngestionCancelled):
+        future.result(timeout=5)
+    assert manager.get(job.id).status == CANCELLED
+    assert manager.get(job.id).cancel_requested
+    manager.shutdown()
+
+
+def test_second_job_for_a_busy_folder_is_rejected(tmp_path):
+    block = threading.Event()
+    runner = make_runner(block=block)
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), runner, max_concurrent=2)
+    folder = tmp_path / "data"
+    folder.mkdir()
+    job, future = manager.submit(str(folder))
+
+    with pytest.raises(JobConflictError):
+        manager.submit(str(folder) + "/.")
+    other, other_future = manager.submit(str(tmp_path))
+    assert [item.id for item in manager.list()] == [other.id, job.id]
+
+    block.set()
+    future.result(timeout=5)
+    other_future.result(timeout=5)
+    _, again = manager.submit(str(folder))
+    assert again.result(timeout=5).files_processed == 1
+    manager.shutdown()
+
+
+def test_resume_runs_one_job_per_folder(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    store.save(Job(id="first", folder_path="data", status=RUNNING, created_at=1.0))
+    store.save(Job(id="second", folder_path="data", status=QUEUED, created_at=2.0))
+
+    manager = JobManager(store, make_runner())
+    manager.resume()
+    manager.shutdown()
+
+    store = JobStore(path)
+    assert store.get("first").status == COMPLETED
+    assert store.get("second").status == CANCELLED
+    assert "first" in store.get("second").error
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+
+import pytest
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_compound_identifiers_whole_and_split():
+    assert tokenize("The printer shows E-102 on fw_v2.1") == [
+        "printer", "shows", "e-102", "e", "102", "fw_v2.1", "fw", "v2", "1"
+    ]
+
+
+def test_exact_identifiers_rank_first(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite"))
+    index.add([
+        ("a", "Error E-102 means the paper tray is not seated"),
+        ("b", "Error E-201 means the toner is low"),
+        ("c", "The paper tray holds 250 sheets of paper"),
+    ])
+
+    results = index.search("what is e-102", top_k=3)
+    assert results[0]["id"] == "a"
+    assert {result["id"] for result in results} == {"a", "b"}
+    assert index.search("stapler") == []
+
+
+def test_replacing_and_deleting_documents_updates_statistics(tmp_path):
+    path = str(tmp_path / "lexical.sqlite")
+    index = LexicalIndex(path)
+    index.add([("a", "reset the router"), ("b", "reset the modem")])
+    index.add([("a", "replace the battery")])
+
+    assert len(index) == 2
+    assert [result["id"] for result in index.search("reset")] == ["b"]
+    assert [result["id"] for result in index.search("battery")] == ["a"]
+
+    assert index.delete(["b", "missing"]) == 1
+    index.close()
+    reopened = LexicalIndex(path)
+    assert len(reopened) == 1
+    assert reopened.search("reset") == []
+    assert reopened._db.execute("SELECT COUNT(*) FROM terms WHERE term = 'modem'").fetchone()[0] == 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [item_id for item_id, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_read_only_reader_sees_commits_without_writing(tmp_path):
+    path = str(tmp_path / "lexical.sqlite")
+    writer = LexicalIndex(path)
+    writer.add([("a", "reset the router")])
+    files = sorted(os.listdir(tmp_path))
+
+    reader = LexicalIndex(path, read_only=True)
+    assert [result["id"] for result in reader.search("router")] == ["a"]
+    writer.add([("b", "router firmware update")])
+    assert len(reader) == 2
+    with pytest.raises(RuntimeError):
+        reader.add([("c", "modem")])
+    with pytest.raises(RuntimeError):
+        reader.delete(["a"])
+    reader.close()
+
+    assert sorted(os.listdir(tmp_path)) == files
+    writer.close()
+
+
+def test_read_only_open_needs_an_existing_index(tmp_path):
+    with pytest.raises(sqlite3.Error):
+        LexicalIndex(str(tmp_path / "missing.sqlite"), read_only=True)
+    assert not (tmp_path / "missing.sqlite").exists()
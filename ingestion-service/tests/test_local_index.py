@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from local_index import LocalIndex, matches_filter
+
+
+def clustered(count: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(count // 100, 4), dimension))
+    vectors = topics[rng.integers(0, len(topics), count)] + 0.5 * rng.standard_normal((count, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def records(vectors: np.ndarray, prefix: str = "v") -> list:
+    return [
+        {"id": f"{prefix}{i}", "values": vector, "metadata": {"n": i, "chunk_text": f"text {i}"}}
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def recall(index: LocalIndex, vectors: np.ndarray, queries: np.ndarray, top_k: int = 10) -> float:
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :top_k]
+    hits = 0
+    for query, expected in zip(queries, truth):
+        found = {int(match["id"][1:]) for match in index.search(query, top_k=top_k)}
+        hits += len(found & set(expected.tolist()))
+    return hits / (len(queries) * top_k)
+
+
+def test_upsert_get_overwrite_and_delete(tmp_path):
+    index = LocalIndex(str(tmp_path))
+    vectors = clustered(20)
+    index.upsert(records(vectors))
+
+    item = index.get("v3")
+    assert np.allclose(item["values"], vectors[3], atol=1e-6)
+    assert item["metadata"] == {"n": 3, "chunk_text": "text 3"}
+    assert index.search(vectors[3], top_k=1)[0]["id"] == "v3"
+
+    index.upsert([{"id": "v3", "values": vectors[4], "metadata": {"chunk_text": "replaced"}}])
+    assert len(index) == 20
+    assert index.get("v3")["metadata"] == {"chunk_text": "replaced"}
+
+    assert index.delete(["v3", "missing"]) == 1
+    assert "v3" not in index
+    assert len(index) == 19
+    index.upsert([{"id": "new", "values": vectors[3]}])
+    assert index.count == 20, "the freed row is reused"
+
+
+def test_dimension_is_fixed_by_the_first_vectors(tmp_path):
+    index = LocalIndex(str(tmp_path))
+    index.upsert([{"id": "a", "values": np.ones(8)}])
+    with pytest.raises(ValueError):
+        index.upsert([{"id": "b", "values": np.ones(4)}])
+    with pytest.raises(ValueError):
+        index.search(np.ones(4))
+
+
+def test_reopened_index_has_the_same_contents(tmp_path):
+    vectors = clustered(50)
+    index = LocalIndex(str(tmp_path))
+    index.upsert(records(vectors))
+    index.delete(["v7"])
+    index.close()
+
+    reopened = LocalIndex(str(tmp_path))
+    assert len(reopened) == 49
+    assert "v7" not in reopened
+    assert reopened.get("v8")["metadata"]["chunk_text"] == "text 8"
+    assert reopened.search(vectors[8], top_k=1)[0]["id"] == "v8"
+    with pytest.raises(RuntimeError):
+        LocalIndex(str(tmp_path), dimension=16)
+
+
+def test_ivf_search_keeps_recall_after_training(tmp_path):
+    vectors, queries = clustered(3000), clustered(50, seed=1)
+    index = LocalIndex(str(tmp_path), nprobe=8, train_threshold=1000)
+    for start in range(0, len(vectors), 500):
+        index.upsert([{"id": f"v{i}", "values": vectors[i]} for i in range(start, start + 500)])
+
+    assert index._centroids is not None
+    assert index.trained_size >= 2000
+    assert recall(index, vectors, queries) >= 0.9
+
+
+def test_filters_and_candidate_ids(tmp_path):
+    vectors = clustered(40)
+    index = LocalIndex(str(tmp_path))
+    index.upsert(records(vectors))
+
+    results = index.search(vectors[0], top_k=40, filter={"n": {"$in": [0, 1, 2, 3, 4]}})
+    assert sorted(match["id"] for match in results) == [f"v{i}" for i in range(5)]
+    results = index.search(vectors[0], top_k=10, candidate_ids=["v1", "v2", "gone"])
+    assert {match["id"] for match in results} == {"v1", "v2"}
+
+
+def test_matches_filter_operators():
+    metadata = {"source": "a.pdf", "page": 3}
+    assert matches_filter(metadata, None)
+    assert matches_filter(metadata, {"source": "a.pdf"})
+    assert matches_filter(metadata, {"page": {"$eq": 3}, "source": {"$in": ["a.pdf", "b.pdf"]}})
+    assert matches_filter(metadata, {"page": {"$nin": [1, 2]}})
+    assert not matches_filter(metadata, {"source": {"$ne": "a.pdf"}})
+    assert not matches_filter(metadata, {"missing": 1})
+    with pytest.raises(ValueError):
+        matches_filter(metadata, {"page": {"$gt": 1}})
+
+
+def test_read_only_reader_leaves_a_live_writer_intact(tmp_path):
+    vectors = clustered(3000)
+    writer = LocalIndex(str(tmp_path))
+    writer.upsert(records(vectors[:10]))
+    reader = LocalIndex(str(tmp_path), read_only=True)
+
+    writer.upsert([{"id": f"v{i}", "values": vectors[i]} for i in range(10, 3000)])
+    reader.close()
+    assert len(reader) == 10
+    with pytest.raises(RuntimeError):
+        reader.upsert(records(vectors[:1]))
+
+    reopened = LocalIndex(str(tmp_path), read_only=True)
+    assert len(reopened) == 3000
+    assert reopened.search(vectors[2500], top_k=1)[0]["id"] == "v2500"
+    writer.close()
+    assert len(LocalIndex(str(tmp_path))) == 3000
+
+
+def test_read_only_snapshot_skips_rows_the_writer_has_not_published(tmp_path):
+    vectors = clustered(30)
+    writer = LocalIndex(str(tmp_path))
+    writer.upsert(records(vectors[:20]))
+    # Rows 10-19 written but not yet committed to SQLite, as mid-upsert
+    with writer._db:
+        writer._db.execute("DELETE FROM items WHERE row >= 10")
+    written = np.array(writer._assign[:20])
+    # Rows committed after the header a reader loads
+    writer._write_header = lambda: None
+    writer.upsert(records(vectors[20:], prefix="late"))
+
+    reader = LocalIndex(str(tmp_path), read_only=True)
+    assert len(reader) == 10
+    assert {match["id"] for match in reader.search(vectors[15], top_k=30)} == {f"v{i}" for i in range(10)}
+    assert np.array_equal(np.asarray(writer._assign[:20]), written)
@@ -0,0 +1,66 @@
+import os
+
+from manifest import MODIFIED, NEW, REMOVED, UNCHANGED, FileChange, Manifest, diff_chunks, plan_changes
+
+
+def test_diff_chunks_keeps_matches_and_reports_the_rest():
+    stored = [("a", "id-a"), ("b", "id-b"), ("b", "id-b2"), ("c", "id-c")]
+    kept, to_embed, stale = diff_chunks(stored, ["b", "x", "a", "b", "b"])
+
+    assert kept == {0: "id-b2", 2: "id-a", 3: "id-b"}
+    assert to_embed == [1, 4]
+    assert stale == ["id-c"]
+
+
+def write(path, content: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+def test_plan_changes_classifies_files(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    kept = write(tmp_path / "kept.pdf", b"kept")
+    touched = write(tmp_path / "touched.pdf", b"touched")
+    edited = write(tmp_path / "edited.pdf", b"edited")
+    for source in (kept, touched, edited):
+        change = plan_changes(None, [source], str(tmp_path))[0]
+        change.content_hash = plan_changes(manifest, [source], str(tmp_path))[0].content_hash
+        manifest.commit_file(change, [("chunk", f"{source}:0")])
+    manifest.commit_file(FileChange(str(tmp_path / "gone.pdf"), NEW, "gone"), [("chunk", "gone:0")])
+    manifest.commit_file(FileChange("/elsewhere/other.pdf", NEW, "other"), [("chunk", "other:0")])
+
+    stat = os.stat(touched)
+    os.utime(touched, (stat.st_atime, stat.st_mtime + 10))
+    write(tmp_path / "edited.pdf", b"edited again")
+    fresh = write(tmp_path / "fresh.pdf", b"fresh")
+
+    changes = {change.source: change for change in plan_changes(manifest, [kept, touched, edited, fresh], str(tmp_path))}
+    assert changes[kept].status == UNCHANGED and not changes[kept].stat_changed
+    assert changes[touched].status == UNCHANGED and changes[touched].stat_changed
+    assert changes[edited].status == MODIFIED
+    assert changes[fresh].status == NEW
+    assert changes[str(tmp_path / "gone.pdf")].status == REMOVED
+    assert "/elsewhere/other.pdf" not in changes
+
+    forced = plan_changes(manifest, [kept], str(tmp_path), force=True)
+    assert forced[0].status == MODIFIED
+
+
+def test_referenced_ignores_the_excluded_file(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    manifest.commit_file(FileChange("a.pdf", NEW, "a"), [("x", "shared"), ("y", "only-a")])
+    manifest.commit_file(FileChange("b.pdf", NEW, "b"), [("x", "shared")])
+
+    assert manifest.referenced(["shared", "only-a"], excluding="a.pdf") == {"shared"}
+    assert manifest.referenced(["shared", "only-a"], excluding="b.pdf") == {"shared", "only-a"}
+
+
+def test_a_new_namespace_starts_afresh(tmp_path):
+    path = str(tmp_path / "manifest.db")
+    manifest = Manifest(path, namespace="local:/index")
+    manifest.commit_file(FileChange("a.pdf", NEW, "a"), [("x", "id")])
+    manifest.close()
+
+    assert Manifest(path, namespace="local:/index").sources() == ["a.pdf"]
+    assert Manifest(path, namespace="pinecone:docs").sources() == []
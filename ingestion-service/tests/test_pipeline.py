@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from conftest import chunks, encode
+
+from config import IngestionConfig
+from manifest import MODIFIED, NEW, FileChange, Manifest
+from pipeline import IngestionCancelled, IngestionPipeline
+from vector_store import InMemoryVectorStore
+
+
+def make_config(**overrides) -> IngestionConfig:
+    settings = dict(parse_workers=1, dedup=False, upsert_retry_backoff=0.01, embed_buffer_chunks=4)
+    settings.update(overrides)
+    return IngestionConfig(**settings)
+
+
+def run_in_thread(pipeline: IngestionPipeline, changes, timeout: float = 10):
+    """Run the pipeline, failing the test instead of hanging if it never returns."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["summary"] = pipeline.run(changes)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline run did not finish"
+    return outcome
+
+
+class FailingManifest(Manifest):
+    def commit_file(self, change, chunks, signatures=None):
+        raise OSError("disk full")
+
+
+def many_files(parsed_pdfs, count: int, per_file: int = 4) -> list:
+    for i in range(count):
+        parsed_pdfs[f"file{i}.pdf"] = chunks(*(f"file {i} chunk {j}" for j in range(per_file)))
+    return [FileChange(source, NEW, content_hash=source) for source in parsed_pdfs]
+
+
+@pytest.mark.parametrize("files", [2, 60])
+def test_writer_errors_are_raised_from_run(parsed_pdfs, tmp_path, files):
+    changes = many_files(parsed_pdfs, files)
+    store = InMemoryVectorStore()
+    pipeline = IngestionPipeline(
+        make_config(upsert_batch_size=2, upsert_queue_size=1, parse_queue_size=1),
+        encode, store.upsert, store.delete, manifest=FailingManifest(str(tmp_path / "manifest.db"))
+    )
+
+    outcome = run_in_thread(pipeline, changes)
+    assert isinstance(outcome.get("error"), OSError)
+
+
+def test_cancel_unblocks_a_run_waiting_on_the_writer(parsed_pdfs, tmp_path):
+    changes = many_files(parsed_pdfs, 20)
+    cancel = threading.Event()
+    store = InMemoryVectorStore(latency=0.05)
+
+    def upsert(records):
+        cancel.set()
+        store.upsert(records)
+
+    pipeline = IngestionPipeline(
+        make_config(upsert_batch_size=1, upsert_concurrency=1, upsert_queue_size=1),
+        encode, upsert, store.delete, manifest=Manifest(str(tmp_path / "manifest.db")), cancel=cancel
+    )
+
+    outcome = run_in_thread(pipeline, changes)
+    assert isinstance(outcome.get("error"), IngestionCancelled)
+
+
+def test_rerun_only_embeds_changed_chunks(parsed_pdfs, tmp_path):
+    parsed_pdfs["a.pdf"] = chunks("intro", "setup", "reset")
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    store = InMemoryVectorStore()
+
+    def run(status, content_hash):
+        pipeline = IngestionPipeline(make_config(), encode, store.upsert, store.delete, manifest=manifest)
+        return pipeline.run([FileChange("a.pdf", status, content_hash=content_hash)])
+
+    first = run(NEW, "v1")
+    assert (first.chunks, first.upserts) == (3, 3)
+    original_ids = set(store.records)
+
+    parsed_pdfs["a.pdf"] = chunks("intro", "setup", "reboot")
+    second = run(MODIFIED, "v2")
+    assert (second.chunks, second.chunks_unchanged, second.vectors_deleted) == (1, 2, 1)
+    assert len(set(store.records) & original_ids) == 2
+    assert {vector_id for _, vector_id in manifest.chunks("a.pdf")} == set(store.records)
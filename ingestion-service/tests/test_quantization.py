@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+from test_local_index import clustered, recall
+
+from local_index import LocalIndex
+
+
+def build(path, quantization, count=3000, **kwargs):
+    vectors = clustered(count)
+    index = LocalIndex(str(path), nprobe=8, train_threshold=1000, quantization=quantization, **kwargs)
+    for start in range(0, count, 500):
+        index.upsert([{"id": f"v{i}", "values": vectors[i]} for i in range(start, start + 500)])
+    return index, vectors
+
+
+@pytest.mark.parametrize("quantization, code_bytes", [("float16", 64), ("int8", 32), ("pq", 8)])
+def test_quantized_search_keeps_recall_with_rerank(tmp_path, quantization, code_bytes):
+    index, vectors = build(tmp_path, quantization)
+
+    assert recall(index, vectors, clustered(50, seed=1)) >= 0.9
+    report = index.memory_report()
+    assert report["quantization"] == quantization
+    assert report["float32_bytes_per_vector"] == 128
+    assert report["code_bytes_per_vector"] == code_bytes
+    assert report["resident_vector_bytes"] == 3000 * code_bytes
+    assert os.path.exists(tmp_path / f"codes.{quantization}")
+
+
+def test_scores_of_reranked_results_are_exact(tmp_path):
+    index, vectors = build(tmp_path, "pq", count=1500, rerank=8)
+    match = index.search(vectors[5], top_k=1)[0]
+    assert match["id"] == "v5"
+    assert match["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_switching_quantization_re_encodes_and_persists(tmp_path):
+    index, vectors = build(tmp_path, None)
+    assert index.memory_report()["resident_vector_bytes"] == 3000 * 128
+
+    index.set_quantization("int8")
+    assert index.memory_report()["resident_vector_bytes"] == 3000 * 32
+    assert recall(index, vectors, clustered(50, seed=1)) >= 0.9
+    index.set_quantization("float16")
+    assert not os.path.exists(tmp_path / "codes.int8")
+    index.close()
+
+    reopened = LocalIndex(str(tmp_path))
+    assert reopened.quantization == "float16"
+    assert reopened.search(vectors[9], top_k=1)[0]["id"] == "v9"
+    with pytest.raises(ValueError):
+        reopened.set_quantization("int4")
+
+
+def test_pq_needs_a_divisible_dimension(tmp_path):
+    index = LocalIndex(str(tmp_path), quantization="pq")
+    with pytest.raises(ValueError):
+        index.upsert([{"id": "a", "values": np.ones(6)}])
+
+
+def test_chunk_text_is_compacted_once_mostly_dead(tmp_path):
+    vectors = clustered(200)
+    index = LocalIndex(str(tmp_path))
+    long_text = "x" * 8000
+    index.upsert([{"id": f"v{i}", "values": vector, "metadata": {"chunk_text": long_text}} for i, vector in enumerate(vectors)])
+    assert index.memory_report()["text_bytes"] == 200 * 8000
+
+    index.upsert([{"id": f"v{i}", "values": vector, "metadata": {"chunk_text": f"short {i}"}} for i, vector in enumerate(vectors)])
+    assert index.memory_report()["text_bytes"] < 200 * 8000
+    assert index.get("v7")["metadata"]["chunk_text"] == "short 7"
+    index.close()
+
+    reopened = LocalIndex(str(tmp_path))
+    assert reopened.get("v199")["metadata"]["chunk_text"] == "short 199"
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("texts-")]) <= 2
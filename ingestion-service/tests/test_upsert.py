@@ -0,0 +1,82 @@
+import threading
+
+from conftest import chunks, encode
+from test_pipeline import make_config, run_in_thread
+
+from manifest import NEW, FileChange
+from pipeline import IngestionPipeline, make_vector_id, plan_batches, record_size
+from vector_store import InMemoryVectorStore
+
+
+def records(*sizes: int) -> list:
+    return [{"id": str(i), "values": [0.0], "metadata": {"text": "x" * size}} for i, size in enumerate(sizes)]
+
+
+def test_plan_batches_caps_records_and_bytes():
+    assert plan_batches(records(1, 1, 1, 1, 1), max_records=2, max_bytes=10 ** 6) == [(0, 2), (2, 4), (4, 5)]
+
+    batch = records(100, 100, 100, 100)
+    budget = record_size(batch[0]) * 2
+    assert plan_batches(batch, max_records=100, max_bytes=budget) == [(0, 2), (2, 4)]
+
+
+def test_plan_batches_gives_an_oversized_record_its_own_batch():
+    batch = records(10, 5000, 10)
+    budget = record_size(batch[0]) * 3
+    assert plan_batches(batch, max_records=100, max_bytes=budget) == [(0, 1), (1, 2), (2, 3)]
+    assert plan_batches([], max_records=10, max_bytes=100) == []
+
+
+def run_pipeline(parsed_pdfs, store, upsert=None, **overrides):
+    parsed_pdfs["a.pdf"] = chunks(*(f"first document chunk {i}" for i in range(10)))
+    parsed_pdfs["b.pdf"] = chunks(*(f"second document chunk {i}" for i in range(7)), page=2)
+    changes = [FileChange(source, NEW, content_hash=source) for source in parsed_pdfs]
+    pipeline = IngestionPipeline(make_config(**overrides), encode, upsert or store.upsert, store.delete)
+    outcome = run_in_thread(pipeline, changes)
+    assert "error" not in outcome, outcome.get("error")
+    return outcome["summary"]
+
+
+def expected_ids(parsed_pdfs) -> set:
+    return {
+        make_vector_id(source, chunk.metadata["page"], chunk.metadata["start_index"], chunk.page_content)
+        for source, items in parsed_pdfs.items() for chunk in items
+    }
+
+
+def test_transient_failures_are_retried(parsed_pdfs):
+    store = InMemoryVectorStore(transient_failures=3)
+    summary = run_pipeline(parsed_pdfs, store, upsert_batch_size=5, upsert_retries=3)
+
+    assert summary.upsert_failures == 0
+    assert summary.upserts == 17
+    # Three failed attempts on top of at least one call per batch of five
+    assert store.upsert_calls >= 3 + 4
+    assert set(store.records) == expected_ids(parsed_pdfs)
+
+
+def test_batches_never_exceed_the_configured_size(parsed_pdfs):
+    store = InMemoryVectorStore(latency=0.01)
+    sizes = []
+    lock = threading.Lock()
+
+    def upsert(batch):
+        with lock:
+            sizes.append(len(batch))
+        store.upsert(batch)
+
+    summary = run_pipeline(parsed_pdfs, store, upsert=upsert, upsert_batch_size=3, upsert_concurrency=2)
+
+    assert max(sizes) <= 3
+    assert sum(sizes) == summary.upserts == 17
+    assert 1 <= store.max_concurrent_upserts <= 2
+    assert set(store.records) == expected_ids(parsed_pdfs)
+
+
+def test_exhausted_retries_are_counted_as_failures(parsed_pdfs):
+    store = InMemoryVectorStore(transient_failures=100)
+    summary = run_pipeline(parsed_pdfs, store, upsert_batch_size=20, upsert_retries=1)
+
+    assert summary.upserts == 0
+    assert summary.upsert_failures == 17
+    assert store.records == {}
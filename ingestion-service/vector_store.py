@@ -0,0 +1,321 @@
+"""Vector store backends the ingestion pipeline writes to.
+
+Every backend takes Pinecone-style records (``id``, ``values``, ``metadata``),
+deletes by id and answers nearest-neighbour queries with the same result shape,
+so the pipeline never needs to know which one it is talking to.
+"""
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+from config import IngestionConfig
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStore(ABC):
+    """Where embedded chunks are stored and searched."""
+
+    name = "base"
+
+    @property
+    @abstractmethod
+    def namespace(self) -> str:
+        """Identifies the target collection, e.g. to tie a manifest to it."""
+
+    @abstractmethod
+    def upsert(self, records: Sequence[dict]) -> None:
+        """Insert or overwrite records by id."""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove records by id; unknown ids are ignored."""
+
+    @abstractmethod
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None) -> List[dict]:
+        """Nearest records as ``{"id", "score", "metadata"}`` dicts, best first."""
+
+    def ensure_dimension(self, dimension: int) -> None:
+        """Make sure the index can hold vectors of ``dimension``, creating or recreating it if needed."""
+
+    def close(self) -> None:
+        pass
+
+
+class PineconeStore(VectorStore):
+    """Pinecone serverless index, created on first use."""
+
+    name = "pinecone"
+
+    # Pinecone limits ids per delete call
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(self, api_key: str, index_name: str, dimension: Optional[int] = None,
+                 cloud: str = "aws", region: str = "us-east-1"):
+        from pinecone import Pinecone
+
+        self.index_name = index_name
+        self.cloud = cloud
+        self.region = region
+        logger.info("Initializing Pinecone...")
+        self.pc = Pinecone(api_key=api_key)
+        if dimension is not None:
+            self._ensure_index(dimension)
+        self.index = self.pc.Index(index_name)
+
+    @property
+    def namespace(self) -> str:
+        return f"pinecone:{self.index_name}"
+
+    def _create_index(self, dimension: int) -> None:
+        from pinecone import ServerlessSpec
+
+        logger.info(f"Creating Pinecone index: {self.index_name}")
+        self.pc.create_index(
+            name=self.index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud=self.cloud,
+                region=self.region
+            )
+        )
+        logger.info(f"Successfully created index: {self.index_name}")
+
+    def _ensure_index(self, dimension: int) -> None:
+        """Create the index if missing; recreate it if its dimension does not match the model."""
+        if not self.pc.has_index(self.index_name):
+            self._create_index(dimension)
+            return
+
+        logger.info(f"Using existing Pinecone index: {self.index_name}")
+        try:
+            current_dimension = self.pc.Index(self.index_name).describe_index_stats().dimension
+            if current_dimension != dimension:
+                logger.info(f"Index dimension mismatch. Current: {current_dimension}, Expected: {dimension}")
+                logger.info("Deleting existing index and recreating...")
+                self.pc.delete_index(self.index_name)
+                self._create_index(dimension)
+        except Exception as e:
+            logger.warning(f"Could not check index stats: {str(e)}")
+
+    def ensure_dimension(self, dimension: int) -> None:
+        self._ensure_index(dimension)
+        self.index = self.pc.Index(self.index_name)
+
+    def upsert(self, records: Sequence[dict]) -> None:
+        self.index.upsert(vectors=list(records))
+
+    def delete(self, ids: Sequence[str]) -> None:
+        ids = list(ids)
+        for i in range(0, len(ids), self.DELETE_BATCH_SIZE):
+            self.index.delete(ids=ids[i:i + self.DELETE_BATCH_SIZE])
+
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None) -> List[dict]:
+        values = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+        response = self.index.query(vector=values, top_k=top_k, filter=filter, include_metadata=True)
+        return [
+            {"id": match.id, "score": match.score, "metadata": match.metadata or {}}
+            for match in response.matches
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    """Self-hosted IVF index persisted to memory-mapped files (see ``local_index``)."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        path: str,
+        dimension: Optional[int] = None,
+        nprobe: int = 16,
+        quantization: Optional[str] = None,
+        rerank: int = 8,
+    ):
+        from local_index import LocalIndex
+
+        self.path = path
+        self.index = LocalIndex(path, dimension=dimension, nprobe=nprobe, quantization=quantization, rerank=rerank)
+
+    @property
+    def namespace(self) -> str:
+        return f"local:{os.path.abspath(self.path)}"
+
+    def upsert(self, records: Sequence[dict]) -> None:
+        self.index.upsert(records)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        self.index.delete(ids)
+
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None) -> List[dict]:
+        return self.index.search(vector, top_k=top_k, filter=filter)
+
+    def close(self) -> None:
+        self.index.close()
+
+
+class InMemoryVectorStore(VectorStore):
+    """Dict-backed store for tests and benchmarks; nothing is persisted.
+
+    ``latency`` adds a delay to every upsert, like a network round trip, and
+    the first ``transient_failures`` upserts raise ``ConnectionError``, so
+    concurrency and retries can be exercised without a real backend.
+    """
+
+    name = "memory"
+
+    def __init__(self, latency: float = 0.0, transient_failures: int = 0):
+        self.latency = latency
+        self.transient_failures = transient_failures
+        self.records = {}
+        self.upsert_calls = 0
+        self.max_concurrent_upserts = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def namespace(self) -> str:
+        return f"memory:{id(self)}"
+
+    def upsert(self, records: Sequence[dict]) -> None:
+        with self._lock:
+            self.upsert_calls += 1
+            self._active += 1
+            self.max_concurrent_upserts = max(self.max_concurrent_upserts, self._active)
+            fail = self.transient_failures > 0
+            if fail:
+                self.transient_failures -= 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise ConnectionError("Simulated transient upsert failure")
+            with self._lock:
+                for record in records:
+                    self.records[record["id"]] = record
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            for vector_id in ids:
+                self.records.pop(vector_id, None)
+
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None) -> List[dict]:
+        import numpy as np
+        from local_index import matches_filter
+
+        with self._lock:
+            records = [record for record in self.records.values() if matches_filter(record.get("metadata") or {}, filter)]
+        if not records:
+            return []
+        matrix = np.asarray([record["values"] for record in records], dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        best = np.argsort(-scores)[:top_k]
+        return [{"id": records[i]["id"], "score": float(scores[i]), "metadata": records[i].get("metadata") or {}} for i in best]
+
+
+class LexicallyIndexedStore(VectorStore):
+    """Wraps another store and keeps a BM25 index of chunk text in step with it (see ``lexical_index``).
+
+    Queries go to the wrapped store; the lexical index is searched by the
+    embedding service's hybrid mode.
+    """
+
+    def __init__(self, store: VectorStore, lexical_path: str):
+        from lexical_index import LexicalIndex
+
+        self.store = store
+        self.name = store.name
+        self.lexical = LexicalIndex(lexical_path)
+
+    @property
+    def namespace(self) -> str:
+        return self.store.namespace
+
+    def upsert(self, records: Sequence[dict]) -> None:
+        self.store.upsert(records)
+        self.lexical.add((record["id"], (record.get("metadata") or {}).get("chunk_text", "")) for record in records)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        ids = list(ids)
+        self.store.delete(ids)
+        self.lexical.delete(ids)
+
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None) -> List[dict]:
+        return self.store.query(vector, top_k=top_k, filter=filter)
+
+    def ensure_dimension(self, dimension: int) -> None:
+        self.store.ensure_dimension(dimension)
+
+    def backfill(self) -> None:
+        """Index chunks stored before the lexical index existed; only the local store can list them."""
+        if len(self.lexical) > 0 or not isinstance(self.store, LocalVectorStore) or len(self.store.index) == 0:
+            return
+        items = self.store.index.items()
+        logger.info(f"Building lexical index from {len(items)} stored chunks")
+        for i in range(0, len(items), 1000):
+            self.lexical.add((vector_id, metadata.get("chunk_text", "")) for vector_id, metadata in items[i:i + 1000])
+
+    def close(self) -> None:
+        self.store.close()
+        self.lexical.close()
+
+
+VECTOR_STORES = ("auto", PineconeStore.name, LocalVectorStore.name, "none")
+
+
+def resolve_store_name(config: IngestionConfig) -> str:
+    """The backend ``config.vector_store`` selects; ``auto`` means Pinecone if configured, else local."""
+    if config.vector_store not in VECTOR_STORES:
+        raise ValueError(f"Unknown vector store '{config.vector_store}', expected one of: {', '.join(VECTOR_STORES)}")
+    if config.vector_store == "auto":
+        return PineconeStore.name if config.pinecone_enabled else LocalVectorStore.name
+    return config.vector_store
+
+
+def store_namespace(config: IngestionConfig) -> str:
+    """Namespace of the configured store, known without connecting to it."""
+    name = resolve_store_name(config)
+    if name == PineconeStore.name:
+        return f"pinecone:{config.index_name}"
+    if name == LocalVectorStore.name:
+        return f"local:{os.path.abspath(config.local_index_path)}"
+    return name
+
+
+def create_vector_store(config: IngestionConfig, dimension: Optional[int] = None) -> Optional[VectorStore]:
+    """Open the configured vector store, or None when storage is disabled.
+
+    ``dimension`` is used to create the index when it does not exist yet.
+    """
+    name = resolve_store_name(config)
+    if name == "none":
+        logger.warning("Vector storage is disabled (VECTOR_STORE=none); embeddings will not be stored")
+        return None
+
+    if name == PineconeStore.name:
+        if not config.pinecone_enabled:
+            raise RuntimeError("VECTOR_STORE=pinecone needs PINECONE_API_KEY, PINECONE_ENVIRONMENT and INDEX_NAME")
+        store = PineconeStore(config.pinecone_api_key, config.index_name, dimension)
+    else:
+        logger.info(f"Using local vector index at {config.local_index_path}")
+        store = LocalVectorStore(
+            config.local_index_path,
+            dimension,
+            nprobe=config.local_index_nprobe,
+            quantization=config.local_index_quantization or None,
+            rerank=config.local_index_rerank,
+        )
+
+    if config.lexical_index:
+        store = LexicallyIndexedStore(store, config.lexical_index_path)
+        store.backfill()
+    return store
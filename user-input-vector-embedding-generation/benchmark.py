@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Throughput and latency benchmark of the embedding paths.
+
+Suites:
+
+- ``encode``: ``EmbeddingService`` directly. ``embed`` from concurrent
+  callers, which the micro-batcher groups into batches, and
+  ``generate_embeddings`` with whole batches.
+- ``http``: ``POST /embed/`` under concurrent load, through an in-process
+  ASGI client. The app's lifespan runs, so this covers routing, validation,
+  middleware and serialization as well as encoding.
+- ``tickets``: the ticket similarity index. A rebuild from ``--tickets``
+  synthetic ticket vectors, then similar-ticket lookups (with recall@k
+  against exact search) and single-ticket upserts. No model is needed.
+
+Every text is unique, so the embedding cache never answers and the model is
+always timed. Models are warmed up before timing starts.
+
+    python benchmark.py --output results.json
+    python benchmark.py --suites http --concurrency 1,16,64 --baseline results.json
+    python benchmark.py --suites tickets --tickets 1000000
+
+Writes JSON with texts per second and p50/p95/p99 latency per scenario. With
+``--baseline``, every ``*_per_second`` that dropped or ``*_ms`` that grew by
+more than ``--tolerance`` counts as a regression and the exit status is 1.
+The ingestion service's ``bench_ingestion.py`` writes and compares the same format.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Sequence
+
+import numpy as np
+
+_WORDS = (
+    "printer error code reset password network timeout driver update firmware cable battery screen display "
+    "install configure account login license server client request response queue retry memory disk sensor "
+    "replace check restart power button light warning manual section step contact support warranty model"
+).split()
+
+
+class TextSource:
+    """Endless supply of unique texts of ``min_words`` to ``max_words`` words."""
+
+    def __init__(self, min_words: int, max_words: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.min_words = min_words
+        self.max_words = max_words
+        self.counter = itertools.count()
+
+    def next(self) -> str:
+        words = [self.rng.choice(_WORDS) for _ in range(self.rng.randint(self.min_words, self.max_words))]
+        return f"{' '.join(words)} {next(self.counter)}"
+
+    def take(self, count: int) -> List[str]:
+        return [self.next() for _ in range(count)]
+
+
+def percentiles(samples: Sequence[float], prefix: str = "") -> Dict[str, float]:
+    """p50/p95/p99 of ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return {}
+    values = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {f"{prefix}p{q}_ms": round(float(v), 3) for q, v in zip((50, 95, 99), values)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline``, as readable lines."""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for key, value in current.items():
+            before = previous.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or before <= 0:
+                continue
+            change = (value - before) / before
+            if (key.endswith("_per_second") and change < -tolerance) or (key.endswith("_ms") and change > tolerance):
+                regressions.append(f"{name}.{key}: {before} -> {value} ({change:+.1%})")
+    return regressions
+
+
+async def run_load(call: Callable[[], Awaitable[int]], requests: int, concurrency: int) -> dict:
+    """Issue ``requests`` calls from ``concurrency`` workers. ``call`` returns how many texts it embedded, 0 on error."""
+    latencies: List[float] = []
+    texts = errors = 0
+    remaining = itertools.count()
+
+    async def worker():
+        nonlocal texts, errors
+        while next(remaining) < requests:
+            started = time.perf_counter()
+            try:
+                embedded = await call()
+            except Exception:
+                embedded = 0
+            latencies.append(time.perf_counter() - started)
+            if embedded:
+                texts += embedded
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "texts_per_second": round(texts / elapsed, 2),
+        "requests_per_second": round(requests / elapsed, 2),
+        **percentiles(latencies),
+    }
+
+
+async def bench_encode(args, texts: TextSource) -> dict:
+    from src.services.embedding_service import EmbeddingService
+
+    results = {}
+    service = EmbeddingService(args.model)
+    try:
+        await service.generate_embeddings(texts.take(64))
+
+        for concurrency in args.concurrency:
+            async def single() -> int:
+                await service.embed(texts.next())
+                return 1
+
+            results[f"encode.single.c{concurrency}"] = await run_load(single, args.requests, concurrency)
+
+        for batch_size in args.batch_sizes:
+            async def batch() -> int:
+                return len(await service.generate_embeddings(texts.take(batch_size), wait=True))
+
+            results[f"encode.batch.b{batch_size}"] = await run_load(batch, max(args.requests // batch_size, 10), 1)
+    finally:
+        await service.close()
+    return results
+
+
+async def bench_http(args, texts: TextSource) -> dict:
+    import httpx
+
+    from src.api.app import create_app
+
+    app = create_app(environment="prod")
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60.0) as client:
+            async def embed() -> int:
+                body = {"text": texts.next()}
+                if args.model:
+                    body["model"] = args.model
+                response = await client.post("/embed/", json=body)
+                return 1 if response.status_code == 200 else 0
+
+            for _ in range(8):
+                await embed()
+            for concurrency in args.concurrency:
+                results[f"http.embed.c{concurrency}"] = await run_load(embed, args.requests, concurrency)
+    return results
+
+
+def bench_tickets(args) -> dict:
+    import shutil
+    import tempfile
+
+    from src.config.settings import settings
+    from src.services.ticket_index import TicketIndex
+
+    rng = np.random.default_rng(0)
+    # Tickets cluster around recurring issues, each a noisy copy of its issue's direction
+    issues = rng.standard_normal((max(args.tickets // 1000, 16), args.dimension)).astype(np.float32)
+
+    def ticket_vectors(count: int) -> np.ndarray:
+        vectors = issues[rng.integers(0, len(issues), count)] + 0.6 * rng.standard_normal((count, args.dimension), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    folder = tempfile.mkdtemp(prefix="bench-tickets-")
+    index = TicketIndex(
+        os.path.join(folder, "tickets"),
+        quantization=settings.ticket_index_quantization,
+        nprobe=settings.ticket_index_nprobe,
+        rerank=settings.ticket_index_rerank
+    )
+    results = {}
+    try:
+        vectors = np.empty((args.tickets, args.dimension), dtype=np.float32)
+        started = time.perf_counter()
+        staging = index.start_rebuild()
+        for start in range(0, args.tickets, 10000):
+            part = ticket_vectors(min(10000, args.tickets - start))
+            vectors[start:start + len(part)] = part
+            staging.upsert([{"id": str(start + i), "values": vector} for i, vector in enumerate(part)])
+        index.finish_rebuild(staging)
+        elapsed = time.perf_counter() - started
+        results["tickets.rebuild"] = {
+            "tickets": args.tickets,
+            "tickets_per_second": round(args.tickets / elapsed, 2),
+            "seconds": round(elapsed, 2),
+        }
+
+        top_k = 10
+        latencies, hits = [], 0
+        queries = rng.choice(args.tickets, size=args.requests, replace=False)
+        for ticket in queries:
+            started = time.perf_counter()
+            found = index.similar(str(ticket), top_k)
+            latencies.append(time.perf_counter() - started)
+            scores = vectors @ vectors[ticket]
+            scores[ticket] = -np.inf
+            expected = np.argpartition(-scores, top_k)[:top_k]
+            hits += len({int(match["id"]) for match in found} & set(expected.tolist()))
+        results["tickets.similar"] = {
+            "requests": args.requests,
+            f"recall_at_{top_k}": round(hits / (args.requests * top_k), 4),
+            **percentiles(latencies),
+        }
+
+        latencies = []
+        for i, vector in enumerate(ticket_vectors(args.requests)):
+            started = time.perf_counter()
+            index.upsert([{"id": f"new-{i}", "values": vector}])
+            latencies.append(time.perf_counter() - started)
+        results["tickets.upsert"] = {"requests": args.requests, **percentiles(latencies)}
+    finally:
+        index.close()
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suites", default="encode,http", help="Comma-separated: encode, http, tickets")
+    parser.add_argument("--model", default=None, help="Model to benchmark; defaults to the service default")
+    parser.add_argument("--requests", type=int, default=512, help="Calls per scenario")
+    parser.add_argument("--concurrency", default="1,8,32", help="Concurrent callers per scenario, comma-separated")
+    parser.add_argument("--batch-sizes", default="8,32,128", help="Texts per generate_embeddings call, comma-separated")
+    parser.add_argument("--tickets", type=int, default=100000, help="Tickets in the similarity index for the tickets suite")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimension of the synthetic ticket vectors")
+    parser.add_argument("--min-words", type=int, default=8)
+    parser.add_argument("--max-words", type=int, default=64)
+    parser.add_argument("--output", help="Write the results to this file as well as stdout")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before it counts as a regression")
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+    args.batch_sizes = [int(value) for value in args.batch_sizes.split(",")]
+    suites = {name.strip() for name in args.suites.split(",")}
+
+    from src.config.settings import settings
+
+    logging.basicConfig(level=logging.WARNING)
+    results = {
+        "suite": "embedding-service",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model or settings.default_model,
+            "inference_backend": settings.inference_backend,
+            "inference_workers": settings.inference_workers,
+            "max_batch_size": settings.embedding_max_batch_size,
+            "ticket_index_quantization": settings.ticket_index_quantization,
+        },
+        "results": {},
+    }
+    texts = TextSource(args.min_words, args.max_words)
+    if "encode" in suites:
+        results["results"].update(asyncio.run(bench_encode(args, texts)))
+    if "http" in suites:
+        results["results"].update(asyncio.run(bench_http(args, texts)))
+    if "tickets" in suites:
+        results["results"].update(bench_tickets(args))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import json
+import logging
+
+from src.config.settings import settings
+from src.services.backends import BACKENDS, OnnxBackend, TorchBackend, create_backend, parity_check, write_parity_report
+from src.services.embedding_service import resolve_model_name
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Export a model for an ONNX backend once and record its parity against PyTorch."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    export_backends = [name for name in BACKENDS if name != TorchBackend.name]
+    parser.add_argument("--model", default=settings.default_model, help="Model to export (default: DEFAULT_MODEL)")
+    parser.add_argument(
+        "--backend",
+        # argparse does not check defaults against choices, and torch has nothing to export
+        default=settings.inference_backend if settings.inference_backend in export_backends else OnnxBackend.name,
+        choices=export_backends,
+        help="Backend to export for (default: INFERENCE_BACKEND, or onnx when that is torch)"
+    )
+    parser.add_argument("--force", action="store_true", help="Re-export even if a cached export exists")
+    args = parser.parse_args()
+
+    model_name = resolve_model_name(args.model)
+    backend = create_backend(args.backend, settings)
+
+    if args.force or not backend.is_exported(model_name):
+        backend.export(model_name)
+    else:
+        logger.info(f"Using cached export at {backend.export_dir(model_name)}")
+
+    # Compare against the reference PyTorch model on a fixed set of support-style texts
+    report = parity_check(TorchBackend().load(model_name), backend.load(model_name))
+    report.update({"model_name": model_name, "backend": backend.name})
+    write_parity_report(backend.export_dir(model_name), backend.name, report)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
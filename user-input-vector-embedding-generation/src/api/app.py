@@ -1,10 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import logging
 
 from ..config.settings import settings
-from .routes.embedding import router as embedding_router
+from .middleware import MetricsMiddleware
+from .routes.embedding import router as embedding_router, model_registry
+from .routes.health import router as health_router
+from .routes.metrics import router as metrics_router
+from .routes.search import router as search_router, search_service
+from .routes.tickets import router as tickets_router, ticket_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up models on startup and release their batching loops and inference threads on shutdown.
+    
+    Warmup runs in the background so the liveness probe answers immediately;
+    /ready reports 503 until it completes.
+    """
+    warmup_task = None
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(model_registry.warmup(settings.warmup_models))
+    else:
+        model_registry.mark_ready()
+    
+    yield
+    
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await model_registry.close()
+    search_service.close()
+    ticket_index.close()
 
 
 def create_app(environment: str = "dev") -> FastAPI:
@@ -35,7 +64,8 @@ def create_app(environment: str = "dev") -> FastAPI:
             version="0.1.0",
             docs_url="/docs",
             redoc_url="/redoc",
-            debug=True
+            debug=True,
+            lifespan=lifespan
         )
     else:
         app = FastAPI(
@@ -44,7 +74,8 @@ def create_app(environment: str = "dev") -> FastAPI:
             version="0.1.0",
             docs_url="/docs",
             redoc_url="/redoc",
-            debug=False
+            debug=False,
+            lifespan=lifespan
         )
     
     # Configure CORS based on environment
@@ -81,8 +112,15 @@ def create_app(environment: str = "dev") -> FastAPI:
             allowed_hosts=settings.trusted_hosts
         )
     
+    # Outermost, so request latency covers the other middleware too
+    app.add_middleware(MetricsMiddleware)
+    
     # Include routers
     app.include_router(embedding_router)
+    app.include_router(health_router)
+    app.include_router(metrics_router)
+    app.include_router(search_router)
+    app.include_router(tickets_router)
     
     # Root endpoint with environment information
     @app.get("/", tags=["root"])
@@ -95,7 +133,15 @@ def create_app(environment: str = "dev") -> FastAPI:
             "environment": environment,
             "endpoints": {
                 "docs": "/docs",
-                "embed": "/embed/"
+                "health": "/health",
+                "ready": "/ready",
+                "metrics": "/metrics",
+                "embed": "/embed/",
+                "embed_batch": "/embed/batch",
+                "embed_stream": "/embed/batch/stream",
+                "models": "/embed/models",
+                "search": "/search",
+                "similar_tickets": "/tickets/{id}/similar"
             }
         }
     
@@ -0,0 +1,41 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services import metrics
+
+
+class MetricsMiddleware:
+    """Count requests and time them end to end, labelled by route template.
+
+    Written as plain ASGI rather than ``BaseHTTPMiddleware`` so streaming
+    responses are not buffered. Also stamps ``request.state.received_at`` so
+    handlers can measure how long body parsing and validation took.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = started
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Route templates (not raw paths) keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            metrics.REQUESTS.labels(scope["method"], path, str(status_code)).inc()
+            metrics.REQUEST_LATENCY.labels(scope["method"], path).observe(time.perf_counter() - started)
@@ -1,33 +1,136 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from typing import Literal, Optional
+import json
 import logging
+import time
 
-from ...models.embedding import EmbeddingRequest, EmbeddingResponse
+from ...models.embedding import (
+    BatchEmbeddingItem,
+    BatchEmbeddingRequest,
+    BatchEmbeddingResponse,
+    BatchEmbeddingResult,
+    EmbeddingRequest,
+    EmbeddingResponse,
+)
+from ...config.settings import settings
 from ...services.embedding_service import EmbeddingService
+from ...services import metrics
+from ...services.inference_pool import ServiceOverloadedError
+from ...services.model_registry import ModelNotAvailableError, ModelRegistry
+from .. import serialization
 
 # Initialize router
 #Prefix is the path that will be used to access the endpoint
 #Tags is the name of the endpoint and is used for documentation purposes in Swagger UI
 router = APIRouter(prefix="/embed", tags=["embeddings"])
 
-# Initialize service
-embedding_service = EmbeddingService()
+# Initialize model registry; each served model gets its own EmbeddingService
+model_registry = ModelRegistry()
+metrics.QUEUE_DEPTH.set_function(lambda: model_registry.queue_depth)
+metrics.INFERENCE_PENDING.set_function(lambda: model_registry.inference_pending)
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 
-@router.post("/", response_model=EmbeddingResponse, status_code=status.HTTP_200_OK)
-async def create_embedding(request: EmbeddingRequest) -> EmbeddingResponse:
+def _observe_validation(http_request: Request) -> None:
+    """Record time from request arrival (stamped by the metrics middleware) to the handler starting."""
+    received_at = getattr(http_request.state, "received_at", None)
+    if received_at is not None:
+        metrics.VALIDATION_LATENCY.observe(time.perf_counter() - received_at)
+
+
+def _overloaded(e: ServiceOverloadedError) -> HTTPException:
+    logger.warning(f"Rejected embedding request: {str(e)}")
+    metrics.REJECTED.inc()
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Embedding service is overloaded, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
+def _get_service(model: Optional[str]) -> EmbeddingService:
+    """Look up the service for a requested model, mapping unknown models to 404."""
     try:
-        logger.info(f"Received embedding request for text of length {len(request.text)}")
+        return model_registry.get(model)
+    except ModelNotAvailableError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.post(
+    "/",
+    response_model=EmbeddingResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "content": {
+                serialization.BINARY_MEDIA_TYPE: {},
+                serialization.MSGPACK_MEDIA_TYPES[0]: {}
+            },
+            "description": "JSON by default; raw little-endian vector bytes or msgpack when requested via Accept"
+        },
+        406: {"description": "msgpack was requested but is not available on the server"}
+    }
+)
+async def create_embedding(
+    request: EmbeddingRequest,
+    http_request: Request,
+    dtype: Literal["float32", "float16", "int8"] = Query(
+        default="float32",
+        description="Element type of binary responses; ignored for JSON"
+    )
+):
+    _observe_validation(http_request)
+    media_type = serialization.negotiate_media_type(http_request.headers.get("accept"))
+    if media_type in serialization.MSGPACK_MEDIA_TYPES and serialization.msgpack is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="msgpack responses are not available; request application/octet-stream or application/json"
+        )
+    
+    embedding_service = _get_service(request.model)
+    
+    try:
+        logger.debug("Received embedding request for text of length %d", len(request.text))
         
         # Generate embedding using the service
-        response = embedding_service.generate_embedding(request.text)
+        vector = await embedding_service.embed(request.text)
         
-        logger.info(f"Successfully generated embedding with {len(response.embedding)} dimensions")
-        return response
+        started = time.perf_counter()
+        if media_type == serialization.JSON_MEDIA_TYPE:
+            # Rendered directly by pydantic rather than through FastAPI's generic jsonable_encoder
+            response = EmbeddingResponse(
+                embedding=vector.tolist(),
+                model_name=embedding_service.model_name,
+                text_length=len(request.text)
+            )
+            body = Response(content=response.model_dump_json(), media_type=media_type)
+        else:
+            # Binary formats skip .tolist(), pydantic validation and float formatting entirely
+            payload, scale = serialization.encode_vector(vector, dtype)
+            if media_type == serialization.BINARY_MEDIA_TYPE:
+                body = Response(
+                    content=payload,
+                    media_type=media_type,
+                    headers=serialization.embedding_headers(
+                        embedding_service.model_name, len(vector), dtype, len(request.text), scale
+                    )
+                )
+            else:
+                body = Response(
+                    content=serialization.pack_msgpack(
+                        payload, embedding_service.model_name, len(vector), dtype, len(request.text), scale
+                    ),
+                    media_type=media_type
+                )
+        metrics.SERIALIZATION_LATENCY.observe(time.perf_counter() - started)
+        return body
         
+    except ServiceOverloadedError as e:
+        raise _overloaded(e)
     except RuntimeError as e:
         logger.error(f"Service error during embedding generation: {str(e)}")
         raise HTTPException(
@@ -42,4 +145,149 @@ async def create_embedding(request: EmbeddingRequest) -> EmbeddingResponse:
         )
 
 
+@router.get("/stats", status_code=status.HTTP_200_OK)
+async def get_embedding_stats() -> dict:
+    """Model status, memory use, embedding cache counters and current queue depths."""
+    return model_registry.get_stats()
+
+
+@router.get("/models", status_code=status.HTTP_200_OK)
+async def list_models() -> dict:
+    """Models this deployment can serve and whether each is currently loaded."""
+    return {"default": model_registry.default_model, "models": model_registry.list_models()}
+
+
+@router.post("/batch", response_model=BatchEmbeddingResponse, status_code=status.HTTP_200_OK)
+async def create_embeddings_batch(request: BatchEmbeddingRequest, http_request: Request) -> BatchEmbeddingResponse:
+    _observe_validation(http_request)
+    if len(request.texts) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch contains {len(request.texts)} texts; the limit is {settings.batch_max_items}. Use /embed/batch/stream for larger inputs"
+        )
+    
+    embedding_service = _get_service(request.model)
+    
+    try:
+        logger.debug("Received batch embedding request for %d texts", len(request.texts))
+        
+        vectors = await embedding_service.generate_embeddings(request.texts)
+        ids = request.ids or [None] * len(request.texts)
+        
+        started = time.perf_counter()
+        response = BatchEmbeddingResponse(
+            embeddings=[
+                BatchEmbeddingResult(index=i, id=item_id, embedding=vector.tolist(), text_length=len(text))
+                for i, (item_id, text, vector) in enumerate(zip(ids, request.texts, vectors))
+            ],
+            model_name=embedding_service.model_name,
+            count=len(vectors)
+        )
+        body = Response(content=response.model_dump_json(), media_type="application/json")
+        metrics.SERIALIZATION_LATENCY.observe(time.perf_counter() - started)
+        return body
+        
+    except ServiceOverloadedError as e:
+        raise _overloaded(e)
+    except RuntimeError as e:
+        logger.error(f"Service error during batch embedding generation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate embeddings: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error during batch embedding generation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while generating the embeddings"
+        )
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose body generator is allowed to keep reading the request.
+    
+    Starlette's StreamingResponse may consume ``receive`` itself to watch for client
+    disconnects, which would steal chunks of a request body that is still being read.
+    Here the generator reads the request stream and sees the disconnect on its own.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+async def _iter_ndjson_lines(request: Request):
+    """Yield non-empty lines of the request body as they arrive."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _ndjson(payload: dict) -> bytes:
+    return (json.dumps(payload) + "\n").encode("utf-8")
+
+
+async def _stream_embeddings(request: Request, embedding_service: EmbeddingService):
+    """Read NDJSON items, encode them chunk by chunk and write one NDJSON result per item."""
+    # (index, item, error) in input order; invalid lines keep their place in the output
+    pending = []
+    valid_count = 0
+    index = 0
+    
+    async def flush():
+        items = [item for _, item, _ in pending if item is not None]
+        vectors = iter(await embedding_service.generate_embeddings([item.text for item in items], wait=True) if items else [])
+        lines = []
+        for i, item, error in pending:
+            if item is None:
+                lines.append(_ndjson({"index": i, "error": error}))
+            else:
+                lines.append(_ndjson({"index": i, "id": item.id, "embedding": next(vectors).tolist(), "text_length": len(item.text)}))
+        return b"".join(lines)
+    
+    try:
+        async for line in _iter_ndjson_lines(request):
+            try:
+                pending.append((index, BatchEmbeddingItem.model_validate_json(line), None))
+                valid_count += 1
+            except ValidationError as e:
+                pending.append((index, None, f"Invalid item: {e.errors(include_url=False)[0]['msg']}"))
+            index += 1
+            
+            # Only one model-sized chunk is held in memory at a time. Errors with no
+            # valid item ahead of them are written straight away, and a run of
+            # invalid lines cannot grow the buffer past batch_max_items.
+            if (valid_count >= embedding_service.chunk_size or valid_count == 0
+                    or len(pending) >= settings.batch_max_items):
+                yield await flush()
+                pending = []
+                valid_count = 0
+        
+        if pending:
+            yield await flush()
+        
+        logger.info(f"Finished streaming embeddings for {index} items")
+        
+    except RuntimeError as e:
+        logger.error(f"Service error during streaming embedding generation: {str(e)}")
+        yield _ndjson({"error": f"Failed to generate embeddings: {str(e)}"})
+
 
+@router.post("/batch/stream", status_code=status.HTTP_200_OK)
+async def create_embeddings_stream(
+    request: Request,
+    model: Optional[str] = Query(default=None, description="Model to use; defaults to the service default")
+) -> StreamingResponse:
+    """Embed an NDJSON stream of ``{"id": ..., "text": ...}`` objects.
+    
+    Results are written back as NDJSON, one line per input line and in input order,
+    while the request body is still being uploaded. Lines that fail validation get an
+    ``error`` entry instead of an embedding.
+    """
+    embedding_service = _get_service(model)
+    return DuplexStreamingResponse(_stream_embeddings(request, embedding_service), media_type="application/x-ndjson")
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from .embedding import model_registry
+
+# Liveness and readiness probes for the orchestrator
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health", status_code=status.HTTP_200_OK)
+async def health() -> dict:
+    """Liveness probe: the process is up and the event loop is responsive."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness probe: 200 only once startup warmup has finished successfully."""
+    body = {
+        "status": model_registry.warmup_state,
+        "startup_phases": model_registry.startup_phases
+    }
+    if model_registry.warmup_error:
+        body["error"] = model_registry.warmup_error
+
+    code = status.HTTP_200_OK if model_registry.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=body)
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+import logging
+import time
+
+from ...config.settings import settings
+from ...models.search import SearchRequest, SearchResponse, SearchResult
+from ...services import metrics
+from ...services.inference_pool import ServiceOverloadedError
+from ...services.search_service import SearchIndexUnavailableError, SearchService
+from .embedding import _get_service, _observe_validation, _overloaded
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+search_service = SearchService()
+
+logger = logging.getLogger(__name__)
+
+
+def _to_result(match: dict) -> SearchResult:
+    """Lift the chunk text, source and page out of a match's stored metadata."""
+    metadata = dict(match.get("metadata") or {})
+    page = metadata.pop("page", None)
+    return SearchResult(
+        id=match["id"],
+        score=match["score"],
+        text=metadata.pop("chunk_text", None),
+        source=metadata.pop("source", None),
+        # Pinecone hands numeric metadata back as floats
+        page=int(page) if page is not None else None,
+        metadata=metadata,
+        vector_score=match.get("vector_score"),
+        lexical_score=match.get("lexical_score")
+    )
+
+
+@router.post(
+    "",
+    response_model=SearchResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"description": "The query model's dimension differs from the index's"},
+        503: {"description": "No search index is available yet, or the service is overloaded"}
+    }
+)
+async def search(request: SearchRequest, http_request: Request):
+    """Return the stored chunks closest to the query by embedding, BM25 or both, optionally filtered by metadata."""
+    _observe_validation(http_request)
+    if request.top_k > settings.search_max_top_k:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"top_k is {request.top_k}; the limit is {settings.search_max_top_k}"
+        )
+
+    embedding_service = _get_service(request.model)
+
+    try:
+        logger.debug("Received search request for query of length %d", len(request.query))
+
+        metadata_filter = request.filter.to_metadata_filter() if request.filter else None
+        if request.mode == "lexical":
+            matches = await search_service.lexical_search(request.query, top_k=request.top_k, filter=metadata_filter)
+        else:
+            vector = await embedding_service.embed(request.query)
+            if request.mode == "hybrid":
+                matches = await search_service.hybrid_search(
+                    request.query, vector, top_k=request.top_k, filter=metadata_filter, prefilter=request.prefilter
+                )
+            else:
+                matches = await search_service.search(vector, top_k=request.top_k, filter=metadata_filter)
+
+        started = time.perf_counter()
+        results = [_to_result(match) for match in matches]
+        response = SearchResponse(results=results, model_name=embedding_service.model_name, count=len(results))
+        body = Response(content=response.model_dump_json(), media_type="application/json")
+        metrics.SERIALIZATION_LATENCY.observe(time.perf_counter() - started)
+        return body
+
+    except ServiceOverloadedError as e:
+        raise _overloaded(e)
+    except SearchIndexUnavailableError as e:
+        logger.warning(f"Search index unavailable: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except ValueError as e:
+        # A query embedded with a model of another dimension than the index's
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Query does not match the search index; use the model the index was built with: {str(e)}"
+        )
+    except RuntimeError as e:
+        logger.error(f"Service error during search: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search: {str(e)}"
+        )
@@ -0,0 +1,211 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from pydantic import ValidationError
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from ...config.settings import settings
+from ...models.tickets import (
+    SimilarTicket,
+    SimilarTicketsResponse,
+    TicketDumpItem,
+    TicketIndexResponse,
+    TicketRebuildResponse,
+    TicketUpsertRequest,
+    ticket_text,
+)
+from ...services import metrics
+from ...services.inference_pool import ServiceOverloadedError
+from ...services.ticket_index import RebuildInProgressError, TicketIndex, TicketNotIndexedError
+from .embedding import _get_service, _iter_ndjson_lines, _observe_validation, _overloaded
+
+router = APIRouter(prefix="/tickets", tags=["tickets"])
+
+ticket_index = TicketIndex(
+    settings.ticket_index_path,
+    quantization=settings.ticket_index_quantization,
+    nprobe=settings.ticket_index_nprobe,
+    rerank=settings.ticket_index_rerank
+)
+
+logger = logging.getLogger(__name__)
+
+# Export lines indexed per upsert during a rebuild
+REBUILD_CHUNK_SIZE = 1000
+# Line errors reported back from a rebuild
+MAX_REBUILD_ERRORS = 20
+
+
+def _not_indexed(e: TicketNotIndexedError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.put(
+    "/{ticket_id}",
+    response_model=TicketIndexResponse,
+    status_code=status.HTTP_200_OK,
+    responses={503: {"description": "The service is overloaded"}}
+)
+async def upsert_ticket(ticket_id: str, request: TicketUpsertRequest, http_request: Request):
+    """Add a ticket to the similarity index or replace its vector and metadata.
+
+    The ticket's stored embedding is used as is; without one, its title and
+    description are embedded the way the ticketing system does it.
+    """
+    _observe_validation(http_request)
+    try:
+        vector = request.embedding
+        if not vector:
+            vector = (await _get_service(request.model).embed(ticket_text(request.title, request.description))).tolist()
+        await asyncio.to_thread(ticket_index.upsert, [{"id": ticket_id, "values": vector, "metadata": request.metadata}])
+        return TicketIndexResponse(id=ticket_id, embedded=not request.embedding, count=await asyncio.to_thread(len, ticket_index))
+
+    except ServiceOverloadedError as e:
+        raise _overloaded(e)
+    except ValueError as e:
+        # A vector of another dimension than the index's
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        logger.error(f"Service error while indexing ticket {ticket_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to index ticket: {str(e)}"
+        )
+
+
+@router.delete("/{ticket_id}", status_code=status.HTTP_200_OK)
+async def delete_ticket(ticket_id: str):
+    """Remove a ticket from the similarity index."""
+    if not await asyncio.to_thread(ticket_index.delete, [ticket_id]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket {ticket_id} is not indexed")
+    return {"id": ticket_id, "deleted": True, "count": await asyncio.to_thread(len, ticket_index)}
+
+
+@router.get("/{ticket_id}/similar", response_model=SimilarTicketsResponse, status_code=status.HTTP_200_OK)
+async def similar_tickets(
+    ticket_id: str,
+    top_k: int = Query(default=10, ge=1, description="Number of similar tickets to return")
+):
+    """Return the indexed tickets closest to this one, best first."""
+    if top_k > settings.search_max_top_k:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"top_k is {top_k}; the limit is {settings.search_max_top_k}"
+        )
+    started = time.perf_counter()
+    try:
+        matches = await asyncio.to_thread(ticket_index.similar, ticket_id, top_k)
+    except TicketNotIndexedError as e:
+        raise _not_indexed(e)
+    metrics.TICKET_SIMILAR_LATENCY.observe(time.perf_counter() - started)
+    results = [SimilarTicket(id=match["id"], score=match["score"], metadata=match["metadata"]) for match in matches]
+    return SimilarTicketsResponse(ticket_id=ticket_id, results=results, count=len(results))
+
+
+@router.post(
+    "/rebuild",
+    response_model=TicketRebuildResponse,
+    status_code=status.HTTP_200_OK,
+    responses={409: {"description": "Another rebuild is running"}}
+)
+async def rebuild_tickets(
+    request: Request,
+    model: Optional[str] = Query(default=None, description="Model to embed tickets without a stored vector with")
+):
+    """Replace the whole ticket index with an NDJSON export of ``{"id", "embedding", ...}`` lines.
+
+    The new index is built next to the live one, which keeps answering and
+    accepting writes until it is swapped in. Lines without an embedding are
+    embedded from their title and description; invalid lines are skipped.
+    """
+    embedding_service = _get_service(model)
+    started = time.perf_counter()
+    try:
+        staging = await asyncio.to_thread(ticket_index.start_rebuild)
+    except RebuildInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    embedded = skipped = 0
+    errors = []
+    # The index takes the dimension of the first vector; a mismatched one would fail its whole chunk
+    dimension = None
+    # Ticket id -> (line number, vector or None, item); a ticket repeated in the export keeps its last line
+    pending = {}
+
+    def skip(line_number: int, reason: str) -> None:
+        nonlocal skipped
+        skipped += 1
+        if len(errors) < MAX_REBUILD_ERRORS:
+            errors.append(f"line {line_number}: {reason}")
+
+    def matches_dimension(line_number: int, vector) -> bool:
+        nonlocal dimension
+        dimension = dimension or len(vector)
+        if len(vector) != dimension:
+            skip(line_number, f"embedding has {len(vector)} dimensions, expected {dimension}")
+            return False
+        return True
+
+    async def flush():
+        nonlocal embedded
+        to_embed = [item for _, vector, item in pending.values() if vector is None]
+        if to_embed:
+            vectors = iter(await embedding_service.generate_embeddings(
+                [ticket_text(item.title, item.description) for item in to_embed], wait=True
+            ))
+            embedded += len(to_embed)
+        else:
+            vectors = iter(())
+        records = []
+        for ticket_id, (line_number, vector, item) in pending.items():
+            if vector is None:
+                # The model's vectors are checked too, in case it differs from the one the export was embedded with
+                vector = next(vectors).tolist()
+                if not matches_dimension(line_number, vector):
+                    continue
+            records.append({"id": ticket_id, "values": vector, "metadata": item.metadata})
+        await asyncio.to_thread(staging.upsert, records)
+        pending.clear()
+
+    try:
+        line_number = 0
+        async for line in _iter_ndjson_lines(request):
+            line_number += 1
+            try:
+                item = TicketDumpItem.model_validate_json(line)
+            except ValidationError as e:
+                skip(line_number, f"invalid item: {e.errors(include_url=False)[0]['msg']}")
+                continue
+            if item.embedding and not matches_dimension(line_number, item.embedding):
+                continue
+            pending[str(item.id)] = (line_number, item.embedding or None, item)
+            if len(pending) >= REBUILD_CHUNK_SIZE:
+                await flush()
+        if pending:
+            await flush()
+        indexed = await asyncio.to_thread(ticket_index.finish_rebuild, staging)
+
+    except ServiceOverloadedError as e:
+        await asyncio.to_thread(ticket_index.abort_rebuild, staging)
+        raise _overloaded(e)
+    except ValueError as e:
+        # Vectors the index cannot take; the dimension checks above skip these line by line
+        await asyncio.to_thread(ticket_index.abort_rebuild, staging)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        await asyncio.to_thread(ticket_index.abort_rebuild, staging)
+        logger.error(f"Service error during ticket index rebuild: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rebuild the ticket index: {str(e)}"
+        )
+    except BaseException:
+        await asyncio.shield(asyncio.to_thread(ticket_index.abort_rebuild, staging))
+        raise
+
+    logger.info(f"Rebuilt ticket index from {line_number} lines: {indexed} indexed, {skipped} skipped")
+    return TicketRebuildResponse(
+        indexed=indexed, embedded=embedded, skipped=skipped, errors=errors,
+        seconds=round(time.perf_counter() - started, 3)
+    )
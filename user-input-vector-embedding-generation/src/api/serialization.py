@@ -0,0 +1,95 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are optional
+    msgpack = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Pick the response media type from an Accept header.
+
+    Returns one of ``JSON_MEDIA_TYPE``, ``BINARY_MEDIA_TYPE`` or the first entry of
+    ``MSGPACK_MEDIA_TYPES``. JSON wins unless the client explicitly prefers a binary type.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type == BINARY_MEDIA_TYPE:
+            return BINARY_MEDIA_TYPE
+        if media_type in MSGPACK_MEDIA_TYPES:
+            return MSGPACK_MEDIA_TYPES[0]
+        if media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            return JSON_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def encode_vector(vector: np.ndarray, dtype: str = "float32") -> Tuple[bytes, Optional[float]]:
+    """Pack a vector as little-endian bytes of the requested dtype.
+
+    ``int8`` uses symmetric per-vector quantization; the returned scale recovers
+    the original values as ``int8_value * scale``. Other dtypes return no scale.
+    """
+    if dtype == "float32":
+        return np.asarray(vector, dtype="<f4").tobytes(), None
+    if dtype == "float16":
+        return np.asarray(vector, dtype="<f2").tobytes(), None
+    if dtype == "int8":
+        vector = np.asarray(vector, dtype=np.float32)
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype("i1")
+        return quantized.tobytes(), scale
+    raise ValueError(f"Unsupported dtype '{dtype}', expected one of {', '.join(SUPPORTED_DTYPES)}")
+
+
+def embedding_headers(model_name: str, dimension: int, dtype: str, text_length: int, scale: Optional[float]) -> dict:
+    """Metadata headers that accompany a binary embedding body."""
+    headers = {
+        "X-Embedding-Model": model_name,
+        "X-Embedding-Dimension": str(dimension),
+        "X-Embedding-Dtype": dtype,
+        "X-Text-Length": str(text_length),
+    }
+    if scale is not None:
+        headers["X-Embedding-Scale"] = repr(scale)
+    return headers
+
+
+def pack_msgpack(payload: bytes, model_name: str, dimension: int, dtype: str, text_length: int, scale: Optional[float]) -> bytes:
+    """Wrap a packed vector and its metadata in a msgpack map."""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    body = {
+        "embedding": payload,
+        "model_name": model_name,
+        "dimension": dimension,
+        "dtype": dtype,
+        "text_length": text_length,
+    }
+    if scale is not None:
+        body["scale"] = scale
+    return msgpack.packb(body, use_bin_type=True)
@@ -1,5 +1,5 @@
 import os
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
@@ -17,6 +17,58 @@ class Settings(BaseSettings):
     
     # Model configuration
     default_model: str = Field(default="all-MiniLM-L6-v2", env="DEFAULT_MODEL")
+    available_models: List[str] = Field(default=[], env="AVAILABLE_MODELS")
+    model_memory_budget_mb: int = Field(default=2048, env="MODEL_MEMORY_BUDGET_MB")
+    model_max_concurrency: int = Field(default=2, env="MODEL_MAX_CONCURRENCY")
+    
+    # Batching configuration
+    embedding_max_batch_size: int = Field(default=32, env="EMBEDDING_MAX_BATCH_SIZE")
+    embedding_max_wait_ms: float = Field(default=5.0, env="EMBEDDING_MAX_WAIT_MS")
+    embedding_queue_size: int = Field(default=512, env="EMBEDDING_QUEUE_SIZE")
+    embedding_chunk_size: int = Field(default=64, env="EMBEDDING_CHUNK_SIZE")
+    embedding_max_tokens_per_batch: int = Field(default=4096, env="EMBEDDING_MAX_TOKENS_PER_BATCH")
+    batch_max_items: int = Field(default=1024, env="BATCH_MAX_ITEMS")
+    
+    # Inference backend configuration (torch, onnx or onnx-int8); 0 threads keeps the runtime default
+    inference_backend: str = Field(default="torch", env="INFERENCE_BACKEND")
+    torch_intra_op_threads: int = Field(default=0, env="TORCH_INTRA_OP_THREADS")
+    torch_inter_op_threads: int = Field(default=0, env="TORCH_INTER_OP_THREADS")
+    onnx_intra_op_threads: int = Field(default=0, env="ONNX_INTRA_OP_THREADS")
+    onnx_inter_op_threads: int = Field(default=0, env="ONNX_INTER_OP_THREADS")
+    onnx_cache_dir: str = Field(default=".model_cache", env="ONNX_CACHE_DIR")
+    onnx_quantization_config: str = Field(default="avx2", env="ONNX_QUANTIZATION_CONFIG")
+    
+    # Warmup configuration
+    warmup_enabled: bool = Field(default=False, env="WARMUP_ENABLED")
+    warmup_models: List[str] = Field(default=[], env="WARMUP_MODELS")
+    warmup_text_lengths: List[int] = Field(default=[8, 64, 256], env="WARMUP_TEXT_LENGTHS")
+    
+    # Embedding cache configuration
+    embedding_cache_max_bytes: int = Field(default=64 * 1024 * 1024, env="EMBEDDING_CACHE_MAX_BYTES")
+    embedding_cache_path: Optional[str] = Field(default=None, env="EMBEDDING_CACHE_PATH")
+    
+    # Inference pool configuration
+    inference_workers: int = Field(default=2, env="INFERENCE_WORKERS")
+    inference_max_pending_batches: int = Field(default=8, env="INFERENCE_MAX_PENDING_BATCHES")
+    
+    # Semantic search configuration
+    search_backend: str = Field(default="local", env="SEARCH_BACKEND")
+    search_index_path: str = Field(default="vector_index", env="SEARCH_INDEX_PATH")
+    search_nprobe: int = Field(default=16, env="SEARCH_NPROBE")
+    search_rerank: int = Field(default=8, env="SEARCH_RERANK")
+    search_max_top_k: int = Field(default=100, env="SEARCH_MAX_TOP_K")
+    search_refresh_seconds: float = Field(default=30.0, env="SEARCH_REFRESH_SECONDS")
+    search_lexical_candidates: int = Field(default=1000, env="SEARCH_LEXICAL_CANDIDATES")
+    search_fusion_depth: int = Field(default=100, env="SEARCH_FUSION_DEPTH")
+    search_rrf_k: int = Field(default=60, env="SEARCH_RRF_K")
+    pinecone_api_key: Optional[str] = Field(default=None, env="PINECONE_API_KEY")
+    pinecone_index_name: Optional[str] = Field(default=None, env="INDEX_NAME")
+    
+    # Ticket similarity index
+    ticket_index_path: str = Field(default="ticket_index", env="TICKET_INDEX_PATH")
+    ticket_index_quantization: str = Field(default="int8", env="TICKET_INDEX_QUANTIZATION")
+    ticket_index_nprobe: int = Field(default=16, env="TICKET_INDEX_NPROBE")
+    ticket_index_rerank: int = Field(default=8, env="TICKET_INDEX_RERANK")
     
     # Security configuration
     trusted_hosts: List[str] = Field(default=["*"], env="TRUSTED_HOSTS")
@@ -25,10 +77,10 @@ class Settings(BaseSettings):
     # Logging configuration
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     
-    @field_validator('trusted_hosts', 'cors_origins', mode='before')
+    @field_validator('trusted_hosts', 'cors_origins', 'available_models', 'warmup_models', 'warmup_text_lengths', mode='before')
     @classmethod
     def parse_list_fields(cls, v):
-        """Convert string values to lists for trusted_hosts and cors_origins."""
+        """Convert comma-separated or JSON string values to lists for the list fields."""
         if isinstance(v, str):
             if v == "*":
                 return ["*"]
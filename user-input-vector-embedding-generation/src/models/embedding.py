@@ -1,8 +1,13 @@
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional
+from pydantic import BaseModel, Field, model_validator
+
+# Same per-text limits as the single-text endpoint
+EmbeddingText = Annotated[str, Field(min_length=1, max_length=10000)]
 
 
 class EmbeddingRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=10000, description="Text to be embedded")
+    model: Optional[str] = Field(default=None, description="Model to use; defaults to the service default")
     
     class Config:
         json_schema_extra = {
@@ -25,3 +30,43 @@ class EmbeddingResponse(BaseModel):
                 "text_length": 67
             }
         }
+
+
+class BatchEmbeddingRequest(BaseModel):
+    texts: list[EmbeddingText] = Field(..., min_length=1, description="Texts to be embedded, in order")
+    ids: Optional[list[str]] = Field(default=None, description="Optional caller-supplied ids, one per text, echoed back in the response")
+    model: Optional[str] = Field(default=None, description="Model to use; defaults to the service default")
+    
+    @model_validator(mode="after")
+    def check_ids_match_texts(self):
+        """Caller-supplied ids must line up one-to-one with the texts."""
+        if self.ids is not None and len(self.ids) != len(self.texts):
+            raise ValueError("ids must have the same length as texts")
+        return self
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "texts": ["Printer shows error E-102", "Cannot reset my password"],
+                "ids": ["ticket-17", "ticket-42"]
+            }
+        }
+
+
+class BatchEmbeddingItem(BaseModel):
+    """One line of an NDJSON streaming request."""
+    id: Optional[str] = Field(default=None, description="Optional caller-supplied id echoed back in the result")
+    text: EmbeddingText = Field(..., description="Text to be embedded")
+
+
+class BatchEmbeddingResult(BaseModel):
+    index: int = Field(..., description="Position of the text in the request")
+    id: Optional[str] = Field(default=None, description="Caller-supplied id, if one was given")
+    embedding: list[float] = Field(..., description="Vector embedding of the text")
+    text_length: int = Field(..., description="Length of the input text")
+
+
+class BatchEmbeddingResponse(BaseModel):
+    embeddings: list[BatchEmbeddingResult] = Field(..., description="One result per input text, in input order")
+    model_name: str = Field(..., description="Name of the embedding model used")
+    count: int = Field(..., description="Number of embeddings generated")
@@ -0,0 +1,60 @@
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, Field
+
+# A filter field matches a single value or any value in a list
+FilterValue = Union[str, int, List[Union[str, int]]]
+
+
+class SearchFilter(BaseModel):
+    source: Optional[FilterValue] = Field(default=None, description="Source document path(s) to restrict results to")
+    page: Optional[Union[int, List[int]]] = Field(default=None, description="Page number(s) to restrict results to")
+    
+    class Config:
+        # Only fields the ingestion service stores can be filtered on; anything else is rejected rather than ignored
+        extra = "forbid"
+    
+    def to_metadata_filter(self) -> dict:
+        """Translate to a Pinecone-style metadata filter over the stored vectors."""
+        conditions = {}
+        for field, value in self.model_dump(exclude_none=True).items():
+            conditions[field] = {"$in": value} if isinstance(value, list) else value
+        return conditions
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=10000, description="Text to search for")
+    top_k: int = Field(default=5, ge=1, description="Number of results to return")
+    filter: Optional[SearchFilter] = Field(default=None, description="Metadata filters; all given fields must match")
+    model: Optional[str] = Field(default=None, description="Model to embed the query with; must match the one the index was built with")
+    mode: Literal["vector", "lexical", "hybrid"] = Field(
+        default="vector",
+        description="vector (embedding similarity), lexical (BM25 over chunk text) or hybrid (both, fused by reciprocal rank)"
+    )
+    prefilter: bool = Field(default=False, description="Hybrid only: score vectors of lexical candidates only, instead of searching the whole index")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "query": "printer shows error E-102 after firmware update",
+                "top_k": 5,
+                "mode": "hybrid",
+                "filter": {"source": "data/printer-manual.pdf"}
+            }
+        }
+
+
+class SearchResult(BaseModel):
+    id: str = Field(..., description="Id of the matching vector")
+    score: float = Field(..., description="Cosine similarity, BM25 score or fused reciprocal-rank score, depending on the mode")
+    vector_score: Optional[float] = Field(default=None, description="Hybrid only: cosine similarity, if the chunk was in the vector ranking")
+    lexical_score: Optional[float] = Field(default=None, description="Hybrid only: BM25 score, if the chunk was in the lexical ranking")
+    text: Optional[str] = Field(default=None, description="Text of the matching chunk")
+    source: Optional[str] = Field(default=None, description="Source document of the chunk")
+    page: Optional[int] = Field(default=None, description="Page of the chunk in its source document")
+    metadata: dict = Field(default_factory=dict, description="Remaining stored metadata")
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult] = Field(..., description="Matches, best first")
+    model_name: str = Field(..., description="Name of the embedding model used for the query")
+    count: int = Field(..., description="Number of results returned")
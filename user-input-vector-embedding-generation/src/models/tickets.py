@@ -0,0 +1,72 @@
+import json
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+def ticket_text(title: Optional[str], description: Optional[str]) -> str:
+    """Text the ticketing system embeds for a ticket: title and description separated by a blank line."""
+    return f"{title or ''}\n\n{description or ''}".strip()
+
+
+class TicketVectorFields(BaseModel):
+    """A ticket's stored embedding, or the title and description to embed instead."""
+    embedding: Optional[List[float]] = Field(default=None, description="Embedding stored with the ticket; embedded from title and description when omitted")
+    title: Optional[str] = Field(default=None, max_length=10000, description="Ticket title")
+    description: Optional[str] = Field(default=None, max_length=10000, description="Ticket description")
+    metadata: dict = Field(default_factory=dict, description="Small fields returned with similar tickets, e.g. status or category")
+
+    @field_validator("embedding", mode="before")
+    @classmethod
+    def parse_json_embedding(cls, value):
+        """The ticketing database keeps embeddings in a JSON column, which exports may leave as a string."""
+        return json.loads(value) if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def check_has_vector_or_text(self):
+        if not self.embedding and not ticket_text(self.title, self.description):
+            raise ValueError("either embedding or title/description is required")
+        return self
+
+
+class TicketUpsertRequest(TicketVectorFields):
+    model: Optional[str] = Field(default=None, description="Model to embed title and description with; must match the one the index was built with")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "title": "Printer shows error E-102",
+                "description": "After the firmware update the office printer stops with E-102.",
+                "metadata": {"status": "open", "category": "hardware"}
+            }
+        }
+
+
+class TicketDumpItem(TicketVectorFields):
+    """One line of an NDJSON ticket export."""
+    id: Union[str, int] = Field(..., description="Ticket id")
+
+
+class TicketIndexResponse(BaseModel):
+    id: str = Field(..., description="Ticket id")
+    embedded: bool = Field(..., description="Whether the vector was computed from title and description")
+    count: int = Field(..., description="Tickets in the index")
+
+
+class SimilarTicket(BaseModel):
+    id: str = Field(..., description="Ticket id")
+    score: float = Field(..., description="Cosine similarity to the requested ticket")
+    metadata: dict = Field(default_factory=dict, description="Metadata stored with the ticket")
+
+
+class SimilarTicketsResponse(BaseModel):
+    ticket_id: str = Field(..., description="Ticket the results are similar to")
+    results: List[SimilarTicket] = Field(..., description="Similar tickets, best first")
+    count: int = Field(..., description="Number of results returned")
+
+
+class TicketRebuildResponse(BaseModel):
+    indexed: int = Field(..., description="Tickets in the rebuilt index")
+    embedded: int = Field(..., description="Tickets embedded from title and description because the export had no vector")
+    skipped: int = Field(..., description="Lines that could not be indexed")
+    errors: List[str] = Field(default_factory=list, description="The first errors, by line number")
+    seconds: float = Field(..., description="Time taken by the rebuild")
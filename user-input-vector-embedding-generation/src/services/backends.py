@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, Optional, Sequence, Type
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+
+class InferenceBackend:
+    """How a sentence-transformer model is loaded and executed.
+
+    Every backend returns a ``SentenceTransformer`` whose ``encode`` is used as
+    usual; backends differ in the runtime underneath and in how its threads are
+    configured.
+    """
+
+    name = "base"
+
+    def __init__(self, intra_op_threads: int = 0, inter_op_threads: int = 0, cache_dir: str = None):
+        # 0 leaves the runtime's own default in place
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.cache_dir = cache_dir
+        self.logger = logging.getLogger(__name__)
+
+    def load(self, model_name: str) -> SentenceTransformer:
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    """Reference backend: plain PyTorch, as shipped by sentence-transformers."""
+
+    name = "torch"
+
+    def load(self, model_name: str) -> SentenceTransformer:
+        import torch
+
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError:
+                # Can only be set once, before any inter-op parallel work has started
+                self.logger.warning("Torch inter-op thread count was already fixed; keeping the existing value")
+        return SentenceTransformer(model_name, device="cpu")
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime on CPU, from a model exported once and cached on disk."""
+
+    name = "onnx"
+
+    def export_dir(self, model_name: str) -> str:
+        return os.path.join(self.cache_dir or ".model_cache", re.sub(r"[^A-Za-z0-9_.-]", "__", model_name))
+
+    def onnx_file_name(self) -> str:
+        return "onnx/model.onnx"
+
+    def is_exported(self, model_name: str) -> bool:
+        return os.path.exists(os.path.join(self.export_dir(model_name), self.onnx_file_name()))
+
+    def export(self, model_name: str) -> str:
+        """Export the model to ONNX under the cache directory and return that directory."""
+        path = self.export_dir(model_name)
+        self.logger.info(f"Exporting {model_name} to ONNX at {path}")
+        # sentence-transformers converts the checkpoint on the fly when no ONNX file exists yet
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save(path)
+        return path
+
+    def _session_options(self):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("The onnx backends need onnxruntime; install sentence-transformers[onnx]")
+
+        options = onnxruntime.SessionOptions()
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            options.inter_op_num_threads = self.inter_op_threads
+        return options
+
+    def load(self, model_name: str) -> SentenceTransformer:
+        session_options = self._session_options()
+        if not self.is_exported(model_name):
+            self.export(model_name)
+
+        path = self.export_dir(model_name)
+        report = read_parity_report(path, self.name)
+        if report:
+            self.logger.info(f"{self.name} parity for {model_name}: {report}")
+        return SentenceTransformer(
+            path,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={
+                "file_name": self.onnx_file_name(),
+                "provider": "CPUExecutionProvider",
+                "session_options": session_options,
+            },
+        )
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """ONNX Runtime with int8 dynamically quantized weights."""
+
+    name = "onnx-int8"
+
+    def __init__(self, *args, quantization_config: str = "avx2", **kwargs):
+        super().__init__(*args, **kwargs)
+        # One of sentence-transformers' presets: arm64, avx2, avx512, avx512_vnni
+        self.quantization_config = quantization_config
+
+    def onnx_file_name(self) -> str:
+        return f"onnx/model_qint8_{self.quantization_config}.onnx"
+
+    def export(self, model_name: str) -> str:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        path = self.export_dir(model_name)
+        if not OnnxBackend.is_exported(self, model_name):
+            OnnxBackend.export(self, model_name)
+
+        self.logger.info(f"Quantizing {model_name} to int8 ({self.quantization_config}) at {path}")
+        model = SentenceTransformer(
+            path, device="cpu", backend="onnx", model_kwargs={"file_name": OnnxBackend.onnx_file_name(self)}
+        )
+        export_dynamic_quantized_onnx_model(model, self.quantization_config, path)
+        return path
+
+
+BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    backend.name: backend for backend in (TorchBackend, OnnxBackend, QuantizedOnnxBackend)
+}
+
+
+def create_backend(name: str, settings) -> InferenceBackend:
+    """Build the configured backend with its thread and cache settings."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of: {', '.join(BACKENDS)}")
+
+    if name == TorchBackend.name:
+        return TorchBackend(settings.torch_intra_op_threads, settings.torch_inter_op_threads)
+
+    kwargs = dict(
+        intra_op_threads=settings.onnx_intra_op_threads,
+        inter_op_threads=settings.onnx_inter_op_threads,
+        cache_dir=settings.onnx_cache_dir,
+    )
+    if name == QuantizedOnnxBackend.name:
+        return QuantizedOnnxBackend(quantization_config=settings.onnx_quantization_config, **kwargs)
+    return OnnxBackend(**kwargs)
+
+
+PARITY_TEXTS = [
+    "My printer shows error E-102 after the latest firmware update.",
+    "How do I reset my password?",
+    "The invoice for order #48213 was charged twice to my credit card and I need a refund for the duplicate payment.",
+    "App crashes on startup",
+    "After migrating to the new workspace, none of the shared dashboards load and every chart shows a timeout "
+    "error, even though the data source connection test succeeds and other users on the old workspace are fine.",
+]
+
+
+def parity_check(reference: SentenceTransformer, candidate: SentenceTransformer, texts: Sequence[str] = None) -> dict:
+    """Compare a candidate backend's embeddings with the reference model's.
+
+    Reports cosine similarity between the two vectors for each text; drift is
+    ``1 - cosine``. A healthy ONNX export stays within about 1e-5, int8 within 1e-2.
+    """
+    texts = list(texts or PARITY_TEXTS)
+    expected = reference.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    actual = candidate.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    cosines = np.sum(expected * actual, axis=1)
+    return {
+        "texts": len(texts),
+        "mean_cosine": round(float(np.mean(cosines)), 6),
+        "min_cosine": round(float(np.min(cosines)), 6),
+        "max_drift": round(float(1.0 - np.min(cosines)), 6),
+    }
+
+
+def parity_report_path(export_dir: str, backend_name: str) -> str:
+    return os.path.join(export_dir, f"parity_{backend_name}.json")
+
+
+def write_parity_report(export_dir: str, backend_name: str, report: dict) -> None:
+    with open(parity_report_path(export_dir, backend_name), "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def read_parity_report(export_dir: str, backend_name: str) -> Optional[dict]:
+    try:
+        with open(parity_report_path(export_dir, backend_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+from .inference_pool import ServiceOverloadedError
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item requests into batched calls.
+
+    Items submitted from any number of coroutines are queued and handed to
+    ``process_batch`` together once ``max_batch_size`` items are waiting or
+    ``max_wait_ms`` has elapsed since the first item of the batch arrived.
+    Each caller gets back the result at its own position in the batch.
+
+    Up to ``max_concurrency`` batches are processed at once. While all slots
+    are busy, new items keep queuing (up to ``max_queue_size``) so the next
+    batch is larger; beyond that, ``submit`` fails fast with
+    ``ServiceOverloadedError``.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[Sequence[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrency: int = 1,
+        max_queue_size: int = 0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue_size = max(max_queue_size, 0)
+        self.logger = logging.getLogger(__name__)
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Batches being processed, by the task processing them
+        self._inflight: Dict[asyncio.Task, List[Tuple[Any, asyncio.Future, float]]] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of items waiting to be picked up by a batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self) -> None:
+        """Start the flush loop on the running event loop if it is not already running there."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue a single item and wait for its result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise ServiceOverloadedError(f"Embedding queue is full ({self.max_queue_size} requests waiting)")
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for the first item, then gather more until the batch is full or the wait expires."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            # Only start collecting once a slot is free, so requests keep piling
+            # into the queue (and form a bigger batch) while all slots are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = self._loop.create_task(self._flush(batch))
+            self._inflight[task] = batch
+            task.add_done_callback(lambda done: self._inflight.pop(done, None))
+
+    async def _flush(self, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        """Process one batch and resolve the futures of every caller in it."""
+        try:
+            # Callers that gave up (client disconnect, timeout) are dropped before encoding
+            started = time.perf_counter()
+            live = []
+            for item, future, enqueued_at in batch:
+                if not future.done():
+                    live.append((item, future))
+                    metrics.QUEUE_WAIT_LATENCY.observe(started - enqueued_at)
+            batch = live
+            if not batch:
+                return
+
+            try:
+                results = await self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Stop the flush loop and fail every request still queued or being processed."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        # A cancelled flush may never get to run, so its callers are failed here rather than by the task
+        inflight = list(self._inflight.items())
+        for task, batch in inflight:
+            task.cancel()
+            self._fail(batch)
+        if inflight:
+            await asyncio.gather(*(task for task, _ in inflight), return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._fail([self._queue.get_nowait()])
+
+    @staticmethod
+    def _fail(batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher is shutting down"))
@@ -0,0 +1,167 @@
+"""Token-length bucketing for batched sentence-transformer encoding.
+
+A transformer batch is padded to its longest member, so encoding a one-line
+ticket next to a 10,000-character one spends most of the forward pass on
+padding. This module sorts texts by token count, cuts them into batches whose
+padded size stays within a token budget, and puts the results back in the
+original order.
+
+The embedding service and the ingestion pipeline each ship an identical copy
+of this module (``src/services/bucketing.py`` and ``ingestion-service/bucketing.py``)
+because the two projects are deployed independently; keep them in sync.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+
+@dataclass
+class BucketPlan:
+    """Batches of input positions plus the token counts they will cost."""
+
+    batches: List[List[int]] = field(default_factory=list)
+    real_tokens: int = 0
+    padded_tokens: int = 0
+
+    @property
+    def padding_efficiency(self) -> float:
+        """Share of the encoded token slots that hold real tokens (1.0 means no padding)."""
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+
+class PaddingStats:
+    """Running totals of real versus padded tokens across many encode calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def record(self, plan: BucketPlan) -> None:
+        with self._lock:
+            self.batches += len(plan.batches)
+            self.texts += sum(len(batch) for batch in plan.batches)
+            self.real_tokens += plan.real_tokens
+            self.padded_tokens += plan.padded_tokens
+
+    @property
+    def padding_efficiency(self) -> float:
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "texts": self.texts,
+                "real_tokens": self.real_tokens,
+                "padded_tokens": self.padded_tokens,
+                "padding_efficiency": round(self.padding_efficiency, 4),
+            }
+
+
+def count_tokens(tokenizer, texts: Sequence[str], max_length: Optional[int] = None) -> List[int]:
+    """Token count of each text as the model will see it, including special tokens.
+
+    Counts are capped at ``max_length`` since longer inputs are truncated before
+    encoding. Without a tokenizer, whitespace-separated words are used as an estimate.
+    """
+    if not texts:
+        return []
+
+    if tokenizer is None:
+        lengths = [len(text.split()) + 2 for text in texts]
+    else:
+        encoded = tokenizer(
+            list(texts),
+            add_special_tokens=True,
+            truncation=max_length is not None,
+            max_length=max_length,
+        )
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+    if max_length:
+        lengths = [min(length, max_length) for length in lengths]
+    return lengths
+
+
+def plan_buckets(lengths: Sequence[int], max_batch_size: int, max_tokens_per_batch: Optional[int] = None) -> BucketPlan:
+    """Group positions of similar token length into batches.
+
+    Positions are visited from shortest to longest and added to the current batch
+    while it has fewer than ``max_batch_size`` members and its padded size
+    (members x longest member) stays within ``max_tokens_per_batch``.
+    """
+    max_batch_size = max(max_batch_size, 1)
+    plan = BucketPlan()
+    current: List[int] = []
+    current_max = 0
+
+    def close_batch():
+        if current:
+            plan.batches.append(list(current))
+            plan.padded_tokens += current_max * len(current)
+
+    for position in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        length = max(lengths[position], 1)
+        plan.real_tokens += length
+        widest = max(current_max, length)
+        over_budget = max_tokens_per_batch is not None and widest * (len(current) + 1) > max_tokens_per_batch
+        if current and (len(current) >= max_batch_size or over_budget):
+            close_batch()
+            current, current_max = [], 0
+            widest = length
+        current.append(position)
+        current_max = widest
+
+    close_batch()
+    return plan
+
+
+def plan_for_texts(
+    texts: Sequence[str],
+    tokenizer=None,
+    max_seq_length: Optional[int] = None,
+    max_batch_size: int = 32,
+    max_tokens_per_batch: Optional[int] = None,
+) -> BucketPlan:
+    """Tokenize texts and plan their length buckets."""
+    lengths = count_tokens(tokenizer, texts, max_seq_length)
+    return plan_buckets(lengths, max_batch_size, max_tokens_per_batch)
+
+
+def run_plan(encode: Callable[[List[str]], Sequence], texts: Sequence[str], plan: BucketPlan) -> list:
+    """Encode texts one bucket at a time and return the vectors in input order.
+
+    ``encode`` is called once per bucket with that bucket's texts and must return
+    one vector per text, e.g. ``lambda batch: model.encode(batch, batch_size=len(batch))``.
+    """
+    results = [None] * len(texts)
+    for batch in plan.batches:
+        vectors = encode([texts[position] for position in batch])
+        for position, vector in zip(batch, vectors):
+            results[position] = vector
+    return results
+
+
+def encode_bucketed(
+    encode: Callable[[List[str]], Sequence],
+    texts: Sequence[str],
+    tokenizer=None,
+    max_seq_length: Optional[int] = None,
+    max_batch_size: int = 32,
+    max_tokens_per_batch: Optional[int] = None,
+    stats: Optional[PaddingStats] = None,
+) -> list:
+    """Plan length buckets for texts, encode them and return the vectors in input order.
+
+    Shorthand for ``plan_for_texts`` followed by ``run_plan``; call those two
+    directly to time tokenization and inference separately.
+    """
+    plan = plan_for_texts(texts, tokenizer, max_seq_length, max_batch_size, max_tokens_per_batch)
+    results = run_plan(encode, texts, plan)
+    if stats is not None:
+        stats.record(plan)
+    return results
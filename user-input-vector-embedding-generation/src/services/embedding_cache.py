@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Content-addressed cache of embedding vectors.
+
+    Entries are keyed by a hash of the model name and the normalized input text.
+    The in-memory tier is an LRU bounded by the total size of the stored vectors;
+    the optional SQLite tier keeps every vector on local disk so the cache
+    survives restarts. A memory miss that hits on disk is promoted back to memory.
+
+    ``get`` and ``put_many`` only touch memory, so they are safe to call on the
+    event loop. Disk reads go through ``get_from_disk``, which blocks and is
+    meant for a worker thread. Disk writes are queued to a background writer
+    thread that commits them in batches; ``flush`` waits for them.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_path: Optional[str] = None, max_pending_writes: int = 1024):
+        self.max_bytes = max(max_bytes, 0)
+        self.disk_path = disk_path
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Held around the SQLite connection only, so memory lookups never wait on disk I/O
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._writes: "queue.Queue" = queue.Queue(maxsize=max(max_pending_writes, 1))
+        self._writer: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dropped_writes = 0
+
+        if disk_path:
+            self._open_disk_tier(disk_path)
+
+    def _open_disk_tier(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps lookups from blocking on writes; losing the last few writes on a crash is harmless here
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+        self._writer = threading.Thread(target=self._write_loop, name="embedding-cache-writer", daemon=True)
+        self._writer.start()
+        self.logger.info(f"Opened on-disk embedding cache at {path}")
+
+    @property
+    def has_disk(self) -> bool:
+        return self._db is not None
+
+    def _write_loop(self) -> None:
+        """Commit queued ``(key, vector bytes)`` batches, coalescing whatever is waiting into one transaction."""
+        while True:
+            batches = [self._writes.get()]
+            while True:
+                try:
+                    batches.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batches
+            rows = [row for batch in batches if batch is not None for row in batch]
+            try:
+                if rows:
+                    with self._db_lock:
+                        self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                        self._db.commit()
+            except Exception as e:
+                # The disk tier is best effort; the vectors are still cached in memory
+                self.logger.warning(f"Failed to write {len(rows)} embeddings to the on-disk cache: {str(e)}")
+            finally:
+                for _ in batches:
+                    self._writes.task_done()
+            if stop:
+                return
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Canonical form of a text for cache lookups.
+
+        Unicode is NFC-normalized and runs of whitespace collapse to a single space.
+        Sentence-transformer tokenizers treat whitespace purely as a separator, so
+        texts that differ only in spacing produce the same embedding.
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(cls, model_name: str, text: str) -> str:
+        """Build the cache key for a text encoded by a given model."""
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(cls.normalize(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the vector for a key from the memory tier, or None.
+
+        Never touches disk. With a disk tier, a None here is not yet a miss:
+        look the key up with ``get_from_disk``, which counts it.
+        """
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def get_from_disk(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Look keys up in the disk tier and promote the hits to memory. Blocks; run it off the event loop."""
+        found: Dict[str, np.ndarray] = {}
+        keys = list(keys)
+        with self._db_lock:
+            if self._db is not None:
+                for start in range(0, len(keys), 500):
+                    part = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    for key, blob in self._db.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part):
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+        with self._lock:
+            for key, vector in found.items():
+                self._store(key, vector)
+            self.disk_hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        """Cache a single vector in memory and, if enabled, on disk."""
+        self.put_many([(key, vector)])
+
+    def put_many(self, items) -> None:
+        """Cache several ``(key, vector)`` pairs in memory and queue them for the disk tier.
+
+        Never blocks on disk. If the writer has fallen too far behind, the disk
+        copy of these vectors is dropped.
+        """
+        items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in items]
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items:
+                self._store(key, vector)
+        if self._writer is not None:
+            try:
+                # Serialized now, so callers may reuse their arrays before the writer gets to them
+                self._writes.put_nowait([(key, vector.tobytes()) for key, vector in items])
+            except queue.Full:
+                with self._lock:
+                    self.dropped_writes += len(items)
+
+    def flush(self) -> None:
+        """Wait until every queued disk write is committed."""
+        if self._writer is not None:
+            self._writes.join()
+
+    def _store(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the memory tier and evict least recently used entries. Caller holds the lock."""
+        if vector.nbytes > self.max_bytes:
+            return
+
+        # Cached arrays are shared between callers, so they must not be mutated in place
+        vector = vector.copy() if vector.flags.writeable else vector
+        vector.setflags(write=False)
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters plus current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "dropped_disk_writes": self.dropped_writes,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_enabled": self._db is not None,
+            }
+
+    def close(self) -> None:
+        """Write out queued vectors and close the on-disk tier."""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
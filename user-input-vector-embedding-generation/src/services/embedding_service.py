@@ -1,57 +1,319 @@
-from typing import List
+from typing import Callable, List, Sequence
+import asyncio
 import logging
+import threading
+import time
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from ..config.settings import settings
 from ..models.embedding import EmbeddingResponse
+from .backends import create_backend
+from .batcher import MicroBatcher
+from . import metrics
+from .bucketing import PaddingStats, plan_for_texts, run_plan
+from .embedding_cache import EmbeddingCache
+from .inference_pool import InferencePool, ServiceOverloadedError
+
+
+def resolve_model_name(model_name: str) -> str:
+    """Full hub name of a model; bare names refer to the sentence-transformers organization."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
 
 
 class EmbeddingService:
-    
-    def __init__(self, model_name: str = None):
-        self.model_name = f"sentence-transformers/{model_name or settings.default_model}"
+
+    def __init__(
+        self,
+        model_name: str = None,
+        max_batch_size: int = None,
+        max_wait_ms: float = None,
+        cache: EmbeddingCache = None,
+        pool: InferencePool = None,
+        max_concurrency: int = None,
+        on_load: Callable[["EmbeddingService"], None] = None
+    ):
+        self.model_name = resolve_model_name(model_name or settings.default_model)
         self.logger = logging.getLogger(__name__)
         self._model = None
+        self._model_lock = threading.Lock()
+        self._on_load = on_load
+        self._backend = create_backend(settings.inference_backend, settings)
+        
+        # Vectors from different runtimes differ slightly, so they are cached apart
+        self.cache_namespace = self.model_name if self._backend.name == "torch" else f"{self.model_name}@{self._backend.name}"
+        self.chunk_size = settings.embedding_chunk_size
+        self.max_tokens_per_batch = settings.embedding_max_tokens_per_batch
+        self.padding_stats = PaddingStats()
+        self.memory_bytes = 0
+        self.last_used = time.monotonic()
+        
+        # Batches of this model allowed on the inference pool at once, so one model cannot starve the others
+        self.max_concurrency = max_concurrency or settings.inference_workers
+        self._inflight = 0
+        self._slots: asyncio.Semaphore = None
+        self._loop: asyncio.AbstractEventLoop = None
         
-    def _load_model(self) -> None:
+        # Identical texts (edited or retried tickets) are served from the cache instead of re-encoded
+        self._owns_cache = cache is None
+        if cache is None and (settings.embedding_cache_max_bytes > 0 or settings.embedding_cache_path):
+            cache = EmbeddingCache(
+                max_bytes=settings.embedding_cache_max_bytes,
+                disk_path=settings.embedding_cache_path
+            )
+        self._cache = cache
+        
+        # Inference runs on these worker threads so the event loop stays responsive.
+        # A pool passed in is shared with other models and owned by the caller.
+        self._owns_pool = pool is None
+        self._pool = pool or InferencePool(
+            max_workers=settings.inference_workers,
+            max_pending=settings.inference_max_pending_batches
+        )
+        
+        # Concurrent requests are queued here and encoded together in one forward pass
+        self._batcher = MicroBatcher(
+            self._run_batch,
+            max_batch_size=max_batch_size or settings.embedding_max_batch_size,
+            max_wait_ms=settings.embedding_max_wait_ms if max_wait_ms is None else max_wait_ms,
+            max_concurrency=self.max_concurrency,
+            max_queue_size=settings.embedding_queue_size
+        )
+    
+    def _load_model(self) -> SentenceTransformer:
         """Lazy load the embedding model to avoid loading it during service initialization."""
-        if self._model is None:
-            try:
-                self.logger.info(f"Loading embedding model: {self.model_name}")
-                self._model = SentenceTransformer(self.model_name)
-                self.logger.info(f"Successfully loaded model: {self.model_name}")
-            except Exception as e:
-                self.logger.error(f"Failed to load model {self.model_name}: {str(e)}")
-                raise RuntimeError(f"Failed to load embedding model: {str(e)}")
-    
-    def generate_embedding(self, text: str) -> EmbeddingResponse:
+        model = self._model
+        if model is not None:
+            return model
+        
+        # Several inference threads may hit an unloaded model at the same time
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    self.logger.info(f"Loading embedding model: {self.model_name} ({self._backend.name} backend)")
+                    self._model = self._backend.load(self.model_name)
+                    self.memory_bytes = self._measure_memory(self._model)
+                    self.logger.info(f"Successfully loaded model: {self.model_name} ({self.memory_bytes / 2**20:.0f} MiB)")
+                except Exception as e:
+                    self.logger.error(f"Failed to load model {self.model_name}: {str(e)}")
+                    raise RuntimeError(f"Failed to load embedding model: {str(e)}")
+                if self._on_load:
+                    self._on_load(self)
+            return self._model
+    
+    @staticmethod
+    def _measure_memory(model) -> int:
+        """Approximate resident size of a model's weights and buffers in bytes."""
         try:
-            self._load_model()
-            
-            # Generate embedding
-            embedding_vector = self._model.encode(text).tolist()
-            
-            # Create response
-            response = EmbeddingResponse(
-                embedding=embedding_vector,
-                model_name=self.model_name,
-                text_length=len(text)
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+        except Exception:
+            return 0
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+    
+    @property
+    def is_idle(self) -> bool:
+        """True when no request is queued for or running on this model."""
+        return self._inflight == 0 and self._batcher.queue_depth == 0
+    
+    def unload(self) -> None:
+        """Drop the model weights; the next request loads them again.
+        
+        Inference threads that already hold a reference finish with it undisturbed.
+        """
+        with self._model_lock:
+            if self._model is not None:
+                self.logger.info(f"Unloading embedding model: {self.model_name}")
+                self._model = None
+    
+    def _warmup(self, text_lengths: Sequence[int]) -> dict:
+        """Load the model and run dummy encodes of each length. Runs on an inference thread."""
+        phases = {}
+        started = time.perf_counter()
+        self._load_model()
+        phases["model_load_seconds"] = round(time.perf_counter() - started, 4)
+        
+        # The first passes at each sequence length pay for kernel selection and allocator growth
+        for length in text_lengths:
+            started = time.perf_counter()
+            self._encode_batch([" ".join(["warmup"] * length)])
+            phases[f"encode_{length}_words_seconds"] = round(time.perf_counter() - started, 4)
+        return phases
+    
+    async def warmup(self, text_lengths: Sequence[int]) -> dict:
+        """Load the model ahead of traffic and return the time spent in each phase."""
+        phases = await self._pool.run(self._warmup, list(text_lengths), wait=True)
+        self.logger.info(f"Warmed up {self.model_name}: {phases}")
+        return phases
+    
+    def _encode_batch(self, texts: List[str]):
+        """Encode a batch of texts, one forward pass per token-length bucket. Runs on an inference thread."""
+        model = self._load_model()
+        metrics.BATCH_SIZE.observe(len(texts))
+        
+        started = time.perf_counter()
+        plan = plan_for_texts(
+            texts,
+            tokenizer=getattr(model, "tokenizer", None),
+            max_seq_length=getattr(model, "max_seq_length", None),
+            max_batch_size=len(texts),
+            max_tokens_per_batch=self.max_tokens_per_batch
+        )
+        tokenized = time.perf_counter()
+        vectors = run_plan(
+            lambda bucket: model.encode(bucket, batch_size=len(bucket), convert_to_numpy=True), texts, plan
+        )
+        metrics.TOKENIZE_LATENCY.observe(tokenized - started)
+        metrics.INFERENCE_LATENCY.observe(time.perf_counter() - tokenized)
+        
+        self.padding_stats.record(plan)
+        metrics.PADDING_EFFICIENCY.labels(self.model_name).set(self.padding_stats.padding_efficiency)
+        return np.stack(vectors)
+    
+    async def _run_on_pool(self, fn, *args, wait: bool = False):
+        """Run a job on the inference pool within this model's concurrency limit."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self._slots.locked() and not wait:
+            raise ServiceOverloadedError(
+                f"Model {self.model_name} is at its concurrency limit ({self.max_concurrency} batches)"
             )
+        
+        async with self._slots:
+            self._inflight += 1
+            self.last_used = time.monotonic()
+            try:
+                return await self._pool.run(fn, *args, wait=wait)
+            finally:
+                self._inflight -= 1
+                self.last_used = time.monotonic()
+    
+    async def _run_batch(self, texts: List[str]):
+        """Hand a batch to the inference pool without blocking the event loop."""
+        return await self._run_on_pool(self._encode_batch, texts)
+    
+    async def embed(self, text: str):
+        """Return the raw embedding vector for a single text as a numpy array."""
+        try:
+            cache_key = EmbeddingCache.make_key(self.cache_namespace, text) if self._cache else None
+            vector = self._cache.get(cache_key) if self._cache else None
+            if vector is None and self._cache and self._cache.has_disk:
+                # Disk reads run on a worker thread; the event loop only ever looks at memory
+                vector = (await asyncio.to_thread(self._cache.get_from_disk, [cache_key])).get(cache_key)
             
-            self.logger.info(f"Generated embedding for text of length {len(text)}")
-            return response
+            if vector is None:
+                # Generate embedding; the batcher groups this text with other in-flight requests
+                vector = await self._batcher.submit(text)
+                metrics.TEXTS_EMBEDDED.labels("model").inc()
+                if self._cache:
+                    self._cache.put(cache_key, vector)
+            else:
+                metrics.TEXTS_EMBEDDED.labels("cache").inc()
             
+            # Hot path: lazy %-formatting so nothing is built unless debug logging is on
+            self.logger.debug("Generated embedding for text of length %d", len(text))
+            return vector
+        
+        except ServiceOverloadedError:
+            raise
         except Exception as e:
             self.logger.error(f"Failed to generate embedding: {str(e)}")
             raise RuntimeError(f"Failed to generate embedding: {str(e)}")
     
+    async def generate_embedding(self, text: str) -> EmbeddingResponse:
+        vector = await self.embed(text)
+        
+        # Create response
+        return EmbeddingResponse(
+            embedding=vector.tolist(),
+            model_name=self.model_name,
+            text_length=len(text)
+        )
+    
+    async def generate_embeddings(self, texts: Sequence[str], wait: bool = False) -> list:
+        """Encode many texts in model-sized chunks and return their vectors in input order.
+        
+        Bulk requests bypass the micro-batcher since they already form full batches.
+        Only the first chunk is subject to admission control; once a request has been
+        admitted its remaining chunks wait for pool capacity instead of failing halfway.
+        """
+        try:
+            vectors = [None] * len(texts)
+            keys = [None] * len(texts)
+            if self._cache:
+                for i, text in enumerate(texts):
+                    keys[i] = EmbeddingCache.make_key(self.cache_namespace, text)
+                    vectors[i] = self._cache.get(keys[i])
+                if self._cache.has_disk:
+                    unseen = [i for i, vector in enumerate(vectors) if vector is None]
+                    if unseen:
+                        found = await asyncio.to_thread(self._cache.get_from_disk, [keys[i] for i in unseen])
+                        for i in unseen:
+                            vectors[i] = found.get(keys[i])
+            
+            # Only cache misses are sent to the model
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            for start in range(0, len(missing), self.chunk_size):
+                positions = missing[start:start + self.chunk_size]
+                encoded = await self._run_on_pool(
+                    self._encode_batch, [texts[i] for i in positions], wait=wait or start > 0
+                )
+                for i, vector in zip(positions, encoded):
+                    vectors[i] = vector
+                if self._cache:
+                    self._cache.put_many([(keys[i], vectors[i]) for i in positions])
+            
+            metrics.TEXTS_EMBEDDED.labels("model").inc(len(missing))
+            metrics.TEXTS_EMBEDDED.labels("cache").inc(len(vectors) - len(missing))
+            self.logger.debug("Generated %d embeddings (%d from cache)", len(vectors), len(vectors) - len(missing))
+            return vectors
+        
+        except ServiceOverloadedError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to generate embeddings: {str(e)}")
+            raise RuntimeError(f"Failed to generate embeddings: {str(e)}")
+    
+    async def close(self) -> None:
+        """Stop the batching loop and release the inference threads and cache it owns."""
+        await self._batcher.close()
+        if self._owns_pool:
+            self._pool.shutdown(wait=False)
+        if self._owns_cache and self._cache:
+            self._cache.close()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting to join a batch."""
+        return self._batcher.queue_depth
+    
+    @property
+    def inference_pending(self) -> int:
+        """Batches queued or running on the inference pool."""
+        return self._pool.pending
+    
+    def get_cache_stats(self) -> dict:
+        """Get embedding cache counters, or a disabled marker if caching is off."""
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.stats()}
+    
     def get_model_info(self) -> dict:
         """Get information about the loaded model."""
         if self._model is None:
-            return {"status": "not_loaded"}
+            return {"status": "not_loaded", "model_name": self.model_name}
         
         return {
             "status": "loaded",
             "model_name": self.model_name,
-            "max_seq_length": self._model.max_seq_length if hasattr(self._model, 'max_seq_length') else "unknown"
+            "max_seq_length": self._model.max_seq_length if hasattr(self._model, 'max_seq_length') else "unknown",
+            "backend": self._backend.name,
+            "memory_bytes": self.memory_bytes,
+            "inflight_batches": self._inflight,
+            "padding": self.padding_stats.as_dict()
         }
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class ServiceOverloadedError(RuntimeError):
+    """Raised when a request is rejected because the inference queues are full."""
+
+
+class InferencePool:
+    """Bounded thread pool that runs blocking model inference off the event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_pending`` jobs
+    may be queued or running; anything beyond that is rejected immediately
+    with ``ServiceOverloadedError`` instead of adding latency for everyone.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 8, thread_name_prefix: str = "inference"):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._pending = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently queued or running."""
+        return self._pending
+
+    async def run(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """Run ``fn(*args)`` on the pool and await its result.
+
+        With ``wait=True`` a full pool delays the caller instead of rejecting it,
+        which suits long-running bulk work that has already been admitted.
+        """
+        slots = self._semaphore()
+        if slots.locked() and not wait:
+            raise ServiceOverloadedError(
+                f"Inference queue is full ({self._pending}/{self.max_pending} jobs pending)"
+            )
+
+        async with slots:
+            self._pending += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            finally:
+                self._pending -= 1
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Pending-job slots on the running event loop; waiting callers are woken in arrival order."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and release the worker threads."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
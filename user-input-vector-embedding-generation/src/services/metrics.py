@@ -0,0 +1,71 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Latency buckets from sub-millisecond cache hits up to multi-second cold loads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    "embedding_http_requests_total",
+    "HTTP requests handled, by route and status code",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "embedding_http_request_duration_seconds",
+    "End-to-end HTTP request latency, by route",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Per-stage breakdown of an embedding request:
+#   validation    - request body read, parsed and validated before the handler runs
+#   queue_wait    - time a text waits in the micro-batcher before its batch starts
+#   tokenize      - tokenization used to plan length buckets
+#   inference     - model forward passes
+#   serialization - building the response body from the vector
+#   search        - nearest-neighbour lookup in the search index (POST /search)
+#   lexical       - BM25 lookup in the lexical index (lexical and hybrid search)
+#   ticket_similar - lookup in the ticket index (GET /tickets/{id}/similar)
+STAGE_LATENCY = Histogram(
+    "embedding_stage_duration_seconds",
+    "Time spent in each stage of an embedding request",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Texts per batch sent to the inference pool",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+TEXTS_EMBEDDED = Counter(
+    "embedding_texts_total",
+    "Texts embedded, by source of the vector",
+    ["source"],
+)
+REJECTED = Counter(
+    "embedding_rejected_total",
+    "Requests rejected because the queues were full",
+)
+
+QUEUE_DEPTH = Gauge(
+    "embedding_queue_depth",
+    "Texts waiting in the micro-batchers",
+)
+INFERENCE_PENDING = Gauge(
+    "embedding_inference_pending",
+    "Batches queued or running on the inference pool",
+)
+PADDING_EFFICIENCY = Gauge(
+    "embedding_padding_efficiency",
+    "Share of encoded token slots holding real tokens, by model",
+    ["model"],
+)
+
+# Pre-bound stage children keep label lookups off the hot path
+VALIDATION_LATENCY = STAGE_LATENCY.labels("validation")
+QUEUE_WAIT_LATENCY = STAGE_LATENCY.labels("queue_wait")
+TOKENIZE_LATENCY = STAGE_LATENCY.labels("tokenize")
+INFERENCE_LATENCY = STAGE_LATENCY.labels("inference")
+SERIALIZATION_LATENCY = STAGE_LATENCY.labels("serialization")
+SEARCH_LATENCY = STAGE_LATENCY.labels("search")
+LEXICAL_LATENCY = STAGE_LATENCY.labels("lexical")
+TICKET_SIMILAR_LATENCY = STAGE_LATENCY.labels("ticket_similar")
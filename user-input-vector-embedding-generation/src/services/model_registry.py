@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from ..config.settings import settings
+from .embedding_cache import EmbeddingCache
+from .embedding_service import EmbeddingService, resolve_model_name
+from .inference_pool import InferencePool
+
+
+class ModelNotAvailableError(LookupError):
+    """Raised when a request names a model that this deployment does not serve."""
+
+
+class ModelRegistry:
+    """Serve several sentence-transformer models side by side.
+
+    Each allowed model gets its own ``EmbeddingService`` (and so its own batcher
+    and concurrency limit), created on first use. All of them share one inference
+    pool and one embedding cache. Model weights load lazily. When the loaded
+    models exceed the memory budget, the least recently used idle ones are unloaded.
+    """
+
+    def __init__(
+        self,
+        default_model: str = None,
+        available_models: List[str] = None,
+        memory_budget_bytes: int = None,
+        max_concurrency: int = None
+    ):
+        self.default_model = resolve_model_name(default_model or settings.default_model)
+        allowed = [resolve_model_name(name) for name in (available_models or settings.available_models)]
+        self.available_models = list(dict.fromkeys([self.default_model] + allowed))
+        self.memory_budget_bytes = (
+            settings.model_memory_budget_mb * 1024 * 1024 if memory_budget_bytes is None else memory_budget_bytes
+        )
+        self.max_concurrency = max_concurrency or settings.model_max_concurrency
+        self.logger = logging.getLogger(__name__)
+
+        self._pool = InferencePool(
+            max_workers=settings.inference_workers,
+            max_pending=settings.inference_max_pending_batches
+        )
+        self._cache = None
+        if settings.embedding_cache_max_bytes > 0 or settings.embedding_cache_path:
+            self._cache = EmbeddingCache(
+                max_bytes=settings.embedding_cache_max_bytes,
+                disk_path=settings.embedding_cache_path
+            )
+
+        # Most recently used last
+        self._services: "OrderedDict[str, EmbeddingService]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Readiness: "pending" until warmup finishes, then "ready" or "failed"
+        self.warmup_state = "pending"
+        self.warmup_error: Optional[str] = None
+        self.startup_phases: dict = {}
+
+    def resolve(self, model_name: Optional[str]) -> str:
+        """Map a requested model name to the full name of a served model."""
+        if not model_name:
+            return self.default_model
+        full_name = resolve_model_name(model_name)
+        if full_name not in self.available_models:
+            raise ModelNotAvailableError(
+                f"Model '{model_name}' is not available; choose one of: {', '.join(self.available_models)}"
+            )
+        return full_name
+
+    def get(self, model_name: Optional[str] = None) -> EmbeddingService:
+        """Return the service for a model, creating it on first use."""
+        full_name = self.resolve(model_name)
+        service = self._services.get(full_name)
+        if service is None:
+            service = EmbeddingService(
+                model_name=full_name,
+                cache=self._cache,
+                pool=self._pool,
+                max_concurrency=self.max_concurrency,
+                on_load=self._on_model_loaded
+            )
+            self._services[full_name] = service
+        self._services.move_to_end(full_name)
+
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        return service
+
+    def _on_model_loaded(self, service: EmbeddingService) -> None:
+        """Called on an inference thread after a model finishes loading."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.enforce_memory_budget, service.model_name)
+        else:
+            self.enforce_memory_budget(service.model_name)
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(service.memory_bytes for service in self._services.values() if service.is_loaded)
+
+    def enforce_memory_budget(self, keep: Optional[str] = None) -> List[str]:
+        """Unload least recently used idle models until the loaded ones fit the budget.
+
+        The model named by ``keep`` (usually the one just loaded) is never unloaded.
+        Returns the names of the models that were unloaded.
+        """
+        unloaded = []
+        for name, service in list(self._services.items()):
+            if self.loaded_bytes <= self.memory_budget_bytes:
+                break
+            if name == keep or not service.is_loaded or not service.is_idle:
+                continue
+            service.unload()
+            unloaded.append(name)
+
+        if self.loaded_bytes > self.memory_budget_bytes:
+            self.logger.warning(
+                f"Loaded models use {self.loaded_bytes / 2**20:.0f} MiB, above the "
+                f"{self.memory_budget_bytes / 2**20:.0f} MiB budget; remaining models are busy"
+            )
+        return unloaded
+
+    @property
+    def ready(self) -> bool:
+        return self.warmup_state == "ready"
+
+    def mark_ready(self) -> None:
+        """Declare the registry ready without warming up (lazy loading on first request)."""
+        self.warmup_state = "ready"
+
+    async def warmup(self, models: List[str] = None, text_lengths: List[int] = None) -> dict:
+        """Load models and run dummy encodes before traffic arrives.
+
+        Warms the default model plus any listed in ``models``. Per-model phase
+        timings are recorded in ``startup_phases``; the registry becomes ready
+        only if every model warmed up successfully.
+        """
+        text_lengths = text_lengths or settings.warmup_text_lengths
+        started = time.perf_counter()
+        try:
+            for name in dict.fromkeys([self.default_model] + [self.resolve(model) for model in (models or [])]):
+                self.startup_phases[name] = await self.get(name).warmup(text_lengths)
+            self.startup_phases["total_seconds"] = round(time.perf_counter() - started, 4)
+            self.warmup_state = "ready"
+            self.logger.info(f"Warmup finished in {self.startup_phases['total_seconds']}s")
+        except Exception as e:
+            self.warmup_state = "failed"
+            self.warmup_error = str(e)
+            self.logger.error(f"Warmup failed: {str(e)}")
+        return self.startup_phases
+
+    @property
+    def queue_depth(self) -> int:
+        """Texts waiting in the micro-batchers of all models."""
+        return sum(service.queue_depth for service in self._services.values())
+
+    @property
+    def inference_pending(self) -> int:
+        """Batches queued or running on the shared inference pool."""
+        return self._pool.pending
+
+    def list_models(self) -> List[dict]:
+        """Status of every model this deployment can serve."""
+        models = []
+        for name in self.available_models:
+            service = self._services.get(name)
+            info = service.get_model_info() if service else {"status": "not_loaded", "model_name": name}
+            info["default"] = name == self.default_model
+            models.append(info)
+        return models
+
+    def get_stats(self) -> dict:
+        """Registry-wide memory, queue and cache figures."""
+        return {
+            "models": self.list_models(),
+            "loaded_bytes": self.loaded_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "queue_depth": self.queue_depth,
+            "inference_pending": self.inference_pending,
+            "cache": {"enabled": False} if self._cache is None else {"enabled": True, **self._cache.stats()}
+        }
+
+    async def close(self) -> None:
+        """Stop every model's batcher, then release the shared pool and cache."""
+        for service in self._services.values():
+            await service.close()
+        self._pool.shutdown(wait=False)
+        if self._cache:
+            self._cache.close()
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..config.settings import settings
+from . import metrics
+from .lexical_index import LEXICAL_INDEX_FILE, LexicalIndex, reciprocal_rank_fusion
+from .local_index import LocalIndex, matches_filter
+
+
+class SearchIndexUnavailableError(RuntimeError):
+    """Raised when no search index is configured or it cannot be opened."""
+
+
+class LocalSearchBackend:
+    """Searches an on-disk index written by the ingestion service.
+
+    The index is written by another process, so it is opened read-only and
+    reopened when its header changes, checked at most every ``refresh_seconds``.
+    If a reopen fails, the index already open keeps serving until the next check.
+    """
+
+    name = "local"
+
+    def __init__(self, path: str, nprobe: int = 16, refresh_seconds: float = 30.0, rerank: int = 8):
+        self.path = path
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.refresh_seconds = refresh_seconds
+        self.logger = logging.getLogger(__name__)
+        self._index: Optional[LocalIndex] = None
+        self._header_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_index(self) -> LocalIndex:
+        with self._lock:
+            now = time.monotonic()
+            if self._index is not None and now - self._checked_at < self.refresh_seconds:
+                return self._index
+            self._checked_at = now
+
+            try:
+                mtime = os.stat(os.path.join(self.path, "index.json")).st_mtime_ns
+            except FileNotFoundError:
+                raise SearchIndexUnavailableError(f"No search index found at {self.path}")
+            if self._index is None or mtime != self._header_mtime:
+                try:
+                    index = LocalIndex(self.path, nprobe=self.nprobe, rerank=self.rerank, read_only=True)
+                except Exception as e:
+                    if self._index is None:
+                        raise SearchIndexUnavailableError(f"Search index at {self.path} could not be opened: {str(e)}")
+                    self.logger.warning(f"Could not reopen search index at {self.path}, still serving the previous one: {str(e)}")
+                    return self._index
+                if self._index is not None:
+                    self._index.close()
+                self._index = index
+                self._header_mtime = mtime
+                self.logger.info(f"Loaded search index at {self.path} ({len(self._index)} vectors)")
+            return self._index
+
+    def search(self, vector, top_k: int, filter: Optional[dict] = None,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        return self._current_index().search(vector, top_k=top_k, filter=filter, candidate_ids=candidate_ids)
+
+    def fetch_metadata(self, ids: Iterable[str]) -> Dict[str, dict]:
+        index = self._current_index()
+        found = {}
+        for vector_id in ids:
+            item = index.get(vector_id)
+            if item is not None:
+                found[vector_id] = item["metadata"]
+        return found
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+class PineconeSearchBackend:
+    """Searches the Pinecone index the ingestion service writes to."""
+
+    name = "pinecone"
+
+    # Pinecone limits ids per fetch call
+    FETCH_BATCH_SIZE = 1000
+
+    def __init__(self, api_key: Optional[str], index_name: Optional[str]):
+        if not api_key or not index_name:
+            raise SearchIndexUnavailableError("SEARCH_BACKEND=pinecone needs PINECONE_API_KEY and INDEX_NAME")
+        try:
+            from pinecone import Pinecone
+        except ImportError:
+            raise SearchIndexUnavailableError("The pinecone search backend needs the pinecone package")
+        self.index = Pinecone(api_key=api_key).Index(index_name)
+
+    def _fetch(self, ids: Iterable[str]) -> dict:
+        ids = list(ids)
+        vectors = {}
+        for i in range(0, len(ids), self.FETCH_BATCH_SIZE):
+            vectors.update(self.index.fetch(ids=ids[i:i + self.FETCH_BATCH_SIZE]).vectors)
+        return vectors
+
+    def search(self, vector, top_k: int, filter: Optional[dict] = None,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        if candidate_ids is not None:
+            # Pinecone cannot restrict a query to ids, so score the candidates here
+            fetched = [item for item in self._fetch(candidate_ids).values() if matches_filter(item.metadata or {}, filter)]
+            if not fetched:
+                return []
+            matrix = np.asarray([item.values for item in fetched], dtype=np.float32)
+            query = np.asarray(vector, dtype=np.float32)
+            scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+            best = np.argsort(-scores)[:top_k]
+            return [{"id": fetched[i].id, "score": float(scores[i]), "metadata": fetched[i].metadata or {}} for i in best]
+
+        response = self.index.query(vector=vector.tolist(), top_k=top_k, filter=filter or None, include_metadata=True)
+        return [
+            {"id": match.id, "score": match.score, "metadata": match.metadata or {}}
+            for match in response.matches
+        ]
+
+    def fetch_metadata(self, ids: Iterable[str]) -> Dict[str, dict]:
+        return {vector_id: item.metadata or {} for vector_id, item in self._fetch(ids).items()}
+
+    def close(self) -> None:
+        pass
+
+
+class SearchService:
+    """Vector, lexical (BM25) and hybrid search over the indexes the ingestion service writes.
+
+    The backend is created on first use, so the service starts even before
+    any index has been built. Searches run on a worker thread to keep the
+    event loop free.
+    """
+
+    def __init__(self, backend: str = None):
+        self.backend_name = (backend or settings.search_backend).lower()
+        self.logger = logging.getLogger(__name__)
+        self._backend = None
+        self._lexical: Optional[LexicalIndex] = None
+
+    def _get_backend(self):
+        if self._backend is None:
+            if self.backend_name == LocalSearchBackend.name:
+                self._backend = LocalSearchBackend(
+                    settings.search_index_path,
+                    nprobe=settings.search_nprobe,
+                    refresh_seconds=settings.search_refresh_seconds,
+                    rerank=settings.search_rerank
+                )
+            elif self.backend_name == PineconeSearchBackend.name:
+                self._backend = PineconeSearchBackend(settings.pinecone_api_key, settings.pinecone_index_name)
+            else:
+                raise SearchIndexUnavailableError(f"Search is disabled (SEARCH_BACKEND={self.backend_name})")
+        return self._backend
+
+    def _get_lexical(self) -> LexicalIndex:
+        if self._lexical is None:
+            path = os.path.join(settings.search_index_path, LEXICAL_INDEX_FILE)
+            if not os.path.exists(path):
+                raise SearchIndexUnavailableError(f"No lexical index found at {path}")
+            # The ingestion service owns this file; never write to it from here
+            try:
+                self._lexical = LexicalIndex(path, read_only=True)
+            except sqlite3.Error as e:
+                raise SearchIndexUnavailableError(f"Lexical index at {path} could not be opened: {str(e)}")
+        return self._lexical
+
+    def _vector_search(self, vector, top_k: int, filter: Optional[dict],
+                       candidate_ids: Optional[List[str]] = None) -> List[dict]:
+        started = time.perf_counter()
+        results = self._get_backend().search(vector, top_k, filter, candidate_ids)
+        metrics.SEARCH_LATENCY.observe(time.perf_counter() - started)
+        return results
+
+    def _lexical_search(self, query: str, top_k: int, filter: Optional[dict]) -> List[dict]:
+        """BM25 matches that are still stored as vectors and pass the filter, with their metadata."""
+        started = time.perf_counter()
+        hits = self._get_lexical().search(query, top_k=settings.search_lexical_candidates if filter else top_k)
+        metadata = self._get_backend().fetch_metadata([hit["id"] for hit in hits])
+        results = [
+            {"id": hit["id"], "score": hit["score"], "metadata": metadata[hit["id"]]}
+            for hit in hits
+            if hit["id"] in metadata and matches_filter(metadata[hit["id"]], filter)
+        ]
+        metrics.LEXICAL_LATENCY.observe(time.perf_counter() - started)
+        return results[:top_k]
+
+    def _hybrid_search(self, query: str, vector, top_k: int, filter: Optional[dict], prefilter: bool) -> List[dict]:
+        lexical = self._lexical_search(query, settings.search_lexical_candidates, filter)
+        if prefilter and lexical:
+            # Only chunks sharing a term with the query are scored densely
+            dense = self._vector_search(vector, len(lexical), None, [hit["id"] for hit in lexical])
+        else:
+            dense = self._vector_search(vector, max(top_k, settings.search_fusion_depth), filter)
+
+        depth = max(top_k, settings.search_fusion_depth)
+        fused = reciprocal_rank_fusion(
+            [[hit["id"] for hit in lexical[:depth]], [hit["id"] for hit in dense[:depth]]],
+            k=settings.search_rrf_k
+        )
+        lexical_by_id = {hit["id"]: hit for hit in lexical}
+        dense_by_id = {hit["id"]: hit for hit in dense}
+        results = []
+        for vector_id, score in fused[:top_k]:
+            hit = dense_by_id.get(vector_id) or lexical_by_id[vector_id]
+            results.append({
+                "id": vector_id,
+                "score": score,
+                "metadata": hit["metadata"],
+                "vector_score": dense_by_id[vector_id]["score"] if vector_id in dense_by_id else None,
+                "lexical_score": lexical_by_id[vector_id]["score"] if vector_id in lexical_by_id else None,
+            })
+        return results
+
+    async def search(self, vector, top_k: int = 5, filter: Optional[dict] = None) -> List[dict]:
+        """Top ``top_k`` matches for a query vector as ``{"id", "score", "metadata"}`` dicts."""
+        return await asyncio.to_thread(self._vector_search, vector, top_k, filter)
+
+    async def lexical_search(self, query: str, top_k: int = 5, filter: Optional[dict] = None) -> List[dict]:
+        """Top ``top_k`` BM25 matches for a query text."""
+        return await asyncio.to_thread(self._lexical_search, query, top_k, filter)
+
+    async def hybrid_search(self, query: str, vector, top_k: int = 5, filter: Optional[dict] = None,
+                            prefilter: bool = False) -> List[dict]:
+        """Lexical and vector rankings fused by reciprocal rank.
+
+        With ``prefilter`` the vector ranking only scores the lexical candidates
+        instead of searching the whole index; it falls back to a full vector
+        search when no chunk shares a term with the query.
+        """
+        return await asyncio.to_thread(self._hybrid_search, query, vector, top_k, filter, prefilter)
+
+    def close(self) -> None:
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+        if self._lexical is not None:
+            self._lexical.close()
+            self._lexical = None
@@ -0,0 +1,187 @@
+"""Vector index of support tickets, for finding related tickets.
+
+The ticketing system embeds every ticket's title and description and stores
+the vector with the ticket (see ``ticketing-system/EMBEDDING_INTEGRATION.md``).
+This index keeps those vectors in a ``LocalIndex`` keyed by ticket id, so
+similar tickets come from an IVF search over compact codes instead of a scan
+of every stored embedding.
+
+Tickets are upserted and deleted one at a time as they change. ``start_rebuild``
+and ``finish_rebuild`` load a whole export into a fresh directory and swap it
+in. Writes that arrive during a rebuild go to the live index and are replayed
+onto the new one before the swap, so none are lost.
+
+IVF lists are trained only by a rebuild, on the staging index before it is
+swapped in. Single upserts never retrain the live index, which would hold up
+every lookup for the length of a k-means run; tickets added between rebuilds
+go to the nearest existing list.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional, Sequence
+
+from .local_index import LocalIndex
+
+
+# Smaller IVF lists than the default square-root rule, so a lookup at a million
+# tickets scores a few thousand candidates instead of tens of thousands
+LIST_SIZE = 512
+MAX_LISTS = 8192
+# A train_threshold no index reaches, so upserts never train inline
+NEVER_TRAIN = 2 ** 62
+
+
+class TicketNotIndexedError(LookupError):
+    """Raised when a ticket id is not in the index."""
+
+
+class RebuildInProgressError(RuntimeError):
+    """Raised when a rebuild is requested while another one is running."""
+
+
+class TicketIndex:
+    """Ticket vectors by ticket id, opened on first use.
+
+    ``quantization``, ``nprobe`` and ``rerank`` are passed to ``LocalIndex``.
+    Records are Pinecone-style ``{"id", "values", "metadata"}`` dicts.
+    """
+
+    def __init__(self, path: str, quantization: str = "int8", nprobe: int = 16, rerank: int = 8):
+        self.path = path
+        self.quantization = quantization
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.logger = logging.getLogger(__name__)
+        self._index: Optional[LocalIndex] = None
+        # Writes made while a rebuild runs, as ("upsert", records) or ("delete", ids)
+        self._journal: Optional[list] = None
+        self._lock = threading.Lock()
+        # Lookups search outside the lock; a rebuild waits for them before closing the index they use
+        self._searches = 0
+        self._swapping = False
+        self._idle = threading.Condition(self._lock)
+
+    def _open(self, path: str) -> LocalIndex:
+        return LocalIndex(
+            path,
+            nprobe=self.nprobe,
+            # Trained explicitly by finish_rebuild, never as a side effect of an upsert
+            train_threshold=NEVER_TRAIN,
+            quantization=self.quantization,
+            rerank=self.rerank,
+            list_size=LIST_SIZE,
+            max_lists=MAX_LISTS
+        )
+
+    def _current(self) -> LocalIndex:
+        if self._index is None:
+            self._index = self._open(self.path)
+            self.logger.info(f"Loaded ticket index at {self.path} ({len(self._index)} tickets)")
+        return self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._current())
+
+    def upsert(self, records: Sequence[dict]) -> None:
+        """Insert or overwrite tickets."""
+        with self._lock:
+            self._current().upsert(records)
+            if self._journal is not None:
+                self._journal.append(("upsert", list(records)))
+
+    def delete(self, ticket_ids: Sequence[str]) -> int:
+        """Remove tickets; returns how many were indexed."""
+        with self._lock:
+            removed = self._current().delete(ticket_ids)
+            if self._journal is not None:
+                self._journal.append(("delete", list(ticket_ids)))
+            return removed
+
+    def similar(self, ticket_id: str, top_k: int = 10, filter: Optional[dict] = None) -> List[dict]:
+        """The ``top_k`` tickets closest to ``ticket_id``, best first, without the ticket itself."""
+        with self._lock:
+            self._idle.wait_for(lambda: not self._swapping)
+            index = self._current()
+            self._searches += 1
+        # The search itself runs unlocked so it neither waits behind writes nor holds them up
+        try:
+            item = index.get(ticket_id)
+            if item is None:
+                raise TicketNotIndexedError(f"Ticket {ticket_id} is not indexed")
+            matches = index.search(item["values"], top_k=top_k + 1, filter=filter)
+        finally:
+            with self._lock:
+                self._searches -= 1
+                self._idle.notify_all()
+        return [match for match in matches if match["id"] != ticket_id][:top_k]
+
+    def _wait_for_searches(self) -> None:
+        """Hold off new lookups and wait for running ones to finish. Caller holds the lock."""
+        self._swapping = True
+        self._idle.wait_for(lambda: self._searches == 0)
+
+    # -- bulk rebuild ------------------------------------------------------
+
+    def start_rebuild(self) -> LocalIndex:
+        """An empty index to ``upsert`` a whole export into, for ``finish_rebuild`` to swap in."""
+        with self._lock:
+            if self._journal is not None:
+                raise RebuildInProgressError("A ticket index rebuild is already running")
+            self._journal = []
+        staging = f"{self.path}.rebuild"
+        shutil.rmtree(staging, ignore_errors=True)
+        return self._open(staging)
+
+    def finish_rebuild(self, staging: LocalIndex) -> int:
+        """Train the staging index, replay writes made meanwhile and swap it in; returns its size."""
+        started = time.perf_counter()
+        if len(staging):
+            staging.train()
+        with self._lock:
+            for operation, payload in self._journal:
+                if operation == "upsert":
+                    staging.upsert(payload)
+                else:
+                    staging.delete(payload)
+            self._journal = None
+            staging.close()
+
+            self._wait_for_searches()
+            try:
+                if self._index is not None:
+                    self._index.close()
+                    self._index = None
+                previous = f"{self.path}.previous"
+                shutil.rmtree(previous, ignore_errors=True)
+                if os.path.exists(self.path):
+                    os.rename(self.path, previous)
+                os.rename(staging.path, self.path)
+                shutil.rmtree(previous, ignore_errors=True)
+                size = len(self._current())
+            finally:
+                self._swapping = False
+                self._idle.notify_all()
+        self.logger.info(f"Rebuilt ticket index at {self.path}: {size} tickets, swapped in after {time.perf_counter() - started:.1f}s")
+        return size
+
+    def abort_rebuild(self, staging: LocalIndex) -> None:
+        staging.close()
+        shutil.rmtree(staging.path, ignore_errors=True)
+        with self._lock:
+            self._journal = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._wait_for_searches()
+            try:
+                if self._index is not None:
+                    self._index.close()
+                    self._index = None
+            finally:
+                self._swapping = False
+                self._idle.notify_all()
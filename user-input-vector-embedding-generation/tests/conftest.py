@@ -0,0 +1,52 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.config.settings import settings
+
+
+class StubModel:
+    """Returns a constant vector per text; enough to drive the routes without a real model."""
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class StubBackend:
+    """Loads ``StubModel`` once ``release`` is set, or raises ``error`` if one is given."""
+
+    name = "torch"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.error = None
+
+    def load(self, model_name: str) -> StubModel:
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return StubModel()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """The app wired to a fresh model registry whose models come from ``StubBackend``."""
+    pytest.importorskip("sentence_transformers")
+    from src.api import app as app_module
+    from src.api.routes import embedding, health
+    from src.services import embedding_service
+    from src.services.model_registry import ModelRegistry
+
+    backend = StubBackend()
+    monkeypatch.setattr(embedding_service, "create_backend", lambda name, config: backend)
+    monkeypatch.setattr(settings, "embedding_cache_max_bytes", 0)
+    monkeypatch.setattr(settings, "embedding_cache_path", None)
+    monkeypatch.setattr(settings, "warmup_text_lengths", [8])
+
+    registry = ModelRegistry(default_model="org/stub", available_models=[])
+    for module in (app_module, embedding, health):
+        monkeypatch.setattr(module, "model_registry", registry)
+    return SimpleNamespace(app=app_module.app, backend=backend, registry=registry)
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.services.batcher import MicroBatcher
+from src.services.inference_pool import ServiceOverloadedError
+
+
+def test_concurrent_items_share_one_batch():
+    batches = []
+
+    async def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+
+    async def process(items):
+        sizes.append(len(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=3, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(main()) == list(range(7))
+    assert sizes == [3, 3, 1]
+
+
+def test_batch_error_reaches_every_caller():
+    async def process(items):
+        raise ValueError("encode failed")
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=10)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        finally:
+            await batcher.close()
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_full_queue_rejects_new_items():
+    release = None
+
+    async def process(items):
+        await release.wait()
+        return items
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+        try:
+            running = asyncio.create_task(batcher.submit("running"))
+            await asyncio.sleep(0.01)
+            queued = asyncio.create_task(batcher.submit("queued"))
+            await asyncio.sleep(0.01)
+            with pytest.raises(ServiceOverloadedError):
+                await batcher.submit("rejected")
+            release.set()
+            return await asyncio.gather(running, queued)
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(main()) == ["running", "queued"]
+
+
+def test_close_fails_queued_and_inflight_callers():
+    async def process(items):
+        await asyncio.sleep(60)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=1, max_queue_size=10)
+        callers = [asyncio.create_task(batcher.submit(i)) for i in range(5)]
+        await asyncio.sleep(0.05)
+        await batcher.close()
+        return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), timeout=1)
+
+    results = asyncio.run(main())
+    assert len(results) == 5
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,67 @@
+from src.services.bucketing import PaddingStats, encode_bucketed, plan_buckets, plan_for_texts, run_plan
+
+
+def test_plan_covers_every_position_once_shortest_first():
+    lengths = [40, 3, 17, 3, 90, 8]
+    plan = plan_buckets(lengths, max_batch_size=2)
+    positions = [position for batch in plan.batches for position in batch]
+    assert sorted(positions) == list(range(len(lengths)))
+    assert [lengths[position] for position in positions] == sorted(lengths)
+    assert plan.real_tokens == sum(lengths)
+
+
+def test_plan_respects_max_batch_size():
+    plan = plan_buckets([5] * 10, max_batch_size=4)
+    assert [len(batch) for batch in plan.batches] == [4, 4, 2]
+    assert plan.padding_efficiency == 1.0
+
+
+def test_plan_respects_token_budget():
+    lengths = [10, 10, 10, 50, 50, 200]
+    plan = plan_buckets(lengths, max_batch_size=32, max_tokens_per_batch=100)
+    for batch in plan.batches:
+        # A single text over the budget still gets a batch of its own
+        assert len(batch) == 1 or max(lengths[p] for p in batch) * len(batch) <= 100
+    assert plan.batches == [[0, 1, 2], [3, 4], [5]]
+    assert plan.padded_tokens == 30 + 100 + 200
+
+
+def test_padding_efficiency():
+    plan = plan_buckets([2, 8], max_batch_size=2)
+    assert plan.padded_tokens == 16
+    assert plan.padding_efficiency == 10 / 16
+    assert plan_buckets([], max_batch_size=4).padding_efficiency == 1.0
+
+    stats = PaddingStats()
+    stats.record(plan)
+    stats.record(plan_buckets([4, 4], max_batch_size=1))
+    assert stats.as_dict() == {
+        "batches": 3, "texts": 4, "real_tokens": 18, "padded_tokens": 24, "padding_efficiency": 0.75,
+    }
+
+
+def test_run_plan_returns_vectors_in_input_order():
+    texts = ["a b c d e f", "a", "a b c", "a b", "a b c d"]
+    calls = []
+
+    def encode(batch):
+        calls.append(batch)
+        return [f"vector of {text}" for text in batch]
+
+    plan = plan_for_texts(texts, max_batch_size=2)
+    assert run_plan(encode, texts, plan) == [f"vector of {text}" for text in texts]
+    assert [len(batch) for batch in calls] == [2, 2, 1]
+    assert calls[0] == ["a", "a b"]
+
+    stats = PaddingStats()
+    assert encode_bucketed(encode, texts, max_batch_size=2, stats=stats) == [f"vector of {text}" for text in texts]
+    assert stats.texts == len(texts)
+
+
+def test_plan_for_texts_caps_lengths_at_max_seq_length():
+    def tokenizer(texts, **kwargs):
+        return {"input_ids": [[0] * (len(text) + 2) for text in texts]}
+
+    plan = plan_for_texts(["x" * 100, "xx"], tokenizer=tokenizer, max_seq_length=16, max_batch_size=8)
+    assert plan.real_tokens == 16 + 4
+    assert plan.padded_tokens == 32
@@ -0,0 +1,118 @@
+import threading
+
+import numpy as np
+
+from src.services.embedding_cache import EmbeddingCache
+
+
+def vector(value: float, dimension: int = 4) -> np.ndarray:
+    return np.full(dimension, value, dtype=np.float32)
+
+
+def test_keys_ignore_spacing_and_unicode_form_but_not_the_model():
+    key = EmbeddingCache.make_key("model-a", "café  printer\nerror")
+    assert EmbeddingCache.make_key("model-a", " café printer error ") == key
+    assert EmbeddingCache.make_key("model-b", "café printer error") != key
+    assert EmbeddingCache.make_key("model-a", "cafe printer error") != key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    # Room for two 16-byte vectors
+    cache = EmbeddingCache(max_bytes=32)
+    cache.put("a", vector(1))
+    cache.put("b", vector(2))
+    assert cache.get("a") is not None
+    cache.put("c", vector(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == 1
+    assert cache.get("c")[0] == 3
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 32
+    assert stats["evictions"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cached_vectors_are_read_only_copies():
+    cache = EmbeddingCache(max_bytes=1024)
+    original = vector(1)
+    cache.put("a", original)
+    original[:] = 5
+
+    cached = cache.get("a")
+    assert cached[0] == 1
+    assert not cached.flags.writeable
+
+
+def test_disk_tier_survives_reopening_and_refills_memory(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.db")
+    cache = EmbeddingCache(max_bytes=1024, disk_path=path)
+    cache.put_many([("a", vector(1)), ("b", vector(2))])
+    cache.close()
+
+    reopened = EmbeddingCache(max_bytes=1024, disk_path=path)
+    try:
+        assert reopened.get("b") is None, "memory lookups never read the disk tier"
+        found = reopened.get_from_disk(["b", "missing"])
+        assert list(found) == ["b"] and found["b"][0] == 2
+        assert reopened.get("b")[0] == 2
+        stats = reopened.stats()
+        assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 1)
+        assert stats["entries"] == 1
+    finally:
+        reopened.close()
+
+
+def test_disk_writes_happen_on_the_writer_thread(tmp_path, monkeypatch):
+    cache = EmbeddingCache(max_bytes=1024, disk_path=str(tmp_path / "embeddings.db"))
+    writer_threads = set()
+    commit = cache._db.commit
+
+    class Connection:
+        """Records which thread commits; sqlite3 connections cannot be patched directly."""
+
+        def __getattr__(self, name):
+            return getattr(connection, name)
+
+        def commit(self):
+            writer_threads.add(threading.current_thread().name)
+            commit()
+
+    connection = cache._db
+    monkeypatch.setattr(cache, "_db", Connection())
+    try:
+        original = vector(1)
+        cache.put("a", original)
+        original[:] = 5
+        cache.flush()
+        assert writer_threads == {"embedding-cache-writer"}
+        cache._entries.clear()
+        assert cache.get_from_disk(["a"])["a"][0] == 1
+    finally:
+        cache.close()
+
+
+def test_disk_writes_are_dropped_rather_than_blocking(tmp_path):
+    cache = EmbeddingCache(max_bytes=1024, disk_path=str(tmp_path / "embeddings.db"), max_pending_writes=1)
+    try:
+        with cache._db_lock:
+            # The writer is stuck behind the lock, so the queue fills up
+            for i in range(5):
+                cache.put(f"k{i}", vector(i))
+            assert cache.stats()["dropped_disk_writes"] >= 3
+            assert cache.get("k4")[0] == 4
+    finally:
+        cache.close()
+
+
+def test_vectors_larger_than_the_memory_budget_stay_on_disk_only(tmp_path):
+    cache = EmbeddingCache(max_bytes=8, disk_path=str(tmp_path / "embeddings.db"))
+    try:
+        cache.put("a", vector(1))
+        cache.flush()
+        assert cache.stats()["entries"] == 0
+        assert cache.get("a") is None
+        assert cache.get_from_disk(["a"])["a"][0] == 1
+    finally:
+        cache.close()
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from src.api.routes.embedding import _stream_embeddings
+from src.config.settings import settings
+
+
+class FakeRequest:
+    """Request whose body arrives chunk by chunk as the test feeds it."""
+
+    def __init__(self):
+        self.chunks = asyncio.Queue()
+
+    async def stream(self):
+        while True:
+            chunk = await self.chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+
+class FakeService:
+    chunk_size = 4
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate_embeddings(self, texts, wait=False):
+        self.calls.append(list(texts))
+        return [np.full(2, len(text), dtype=np.float32) for text in texts]
+
+
+def item(index: int) -> bytes:
+    return json.dumps({"id": f"t{index}", "text": "x" * index}).encode() + b"\n"
+
+
+def test_invalid_lines_are_written_without_waiting_for_more_input():
+    service = FakeService()
+
+    async def run():
+        request = FakeRequest()
+        stream = _stream_embeddings(request, service)
+        await request.chunks.put(b"not json\n")
+        first = await asyncio.wait_for(stream.__anext__(), 1)
+        await request.chunks.put(None)
+        rest = [chunk async for chunk in stream]
+        return first, rest
+
+    first, rest = asyncio.run(run())
+    assert json.loads(first)["index"] == 0 and "error" in json.loads(first)
+    assert rest == []
+    assert service.calls == []
+
+
+def test_pending_lines_are_capped_at_batch_max_items(monkeypatch):
+    monkeypatch.setattr(settings, "batch_max_items", 3)
+    service = FakeService()
+
+    async def run():
+        request = FakeRequest()
+        for chunk in [item(1), b"{}\n", b"{}\n", b"{}\n", item(2), b"{}\n", item(3), None]:
+            request.chunks.put_nowait(chunk)
+        return [chunk async for chunk in _stream_embeddings(request, service)]
+
+    chunks = asyncio.run(run())
+    lines = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [line["index"] for line in lines] == list(range(7))
+    assert ["embedding" in line for line in lines] == [True, False, False, False, True, False, True]
+    # One valid item with two errors behind it reaches the cap; the next error is written on its own
+    assert [len(chunk.splitlines()) for chunk in chunks] == [3, 1, 3]
+    assert service.calls == [["x"], ["xx", "xxx"]]
@@ -0,0 +1,51 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from src.config.settings import settings
+
+
+def wait_for_ready(client: TestClient, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    response = client.get("/ready")
+    while response.json()["status"] == "pending" and time.monotonic() < deadline:
+        time.sleep(0.01)
+        response = client.get("/ready")
+    return response
+
+
+def test_ready_returns_503_until_warmup_finishes(api, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_enabled", True)
+    api.backend.release.clear()
+
+    with TestClient(api.app) as client:
+        # Liveness answers while the model is still loading
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "pending"
+
+        api.backend.release.set()
+        response = wait_for_ready(client)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ready"
+        assert "encode_8_words_seconds" in body["startup_phases"]["org/stub"]
+
+
+def test_ready_stays_503_when_warmup_fails(api, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_enabled", True)
+    api.backend.error = OSError("weights not found")
+
+    with TestClient(api.app) as client:
+        response = wait_for_ready(client)
+        assert response.status_code == 503
+        assert response.json()["status"] == "failed"
+        assert "weights not found" in response.json()["error"]
+
+
+def test_ready_without_warmup(api, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_enabled", False)
+
+    with TestClient(api.app) as client:
+        assert client.get("/ready").status_code == 200
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.services.inference_pool import InferencePool, ServiceOverloadedError
+
+
+def test_runs_blocking_work_off_the_event_loop():
+    async def main():
+        pool = InferencePool(max_workers=1, max_pending=2)
+        try:
+            return await pool.run(threading.current_thread)
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(main()) is not threading.main_thread()
+
+
+def test_full_pool_rejects_unless_the_caller_waits():
+    release = threading.Event()
+
+    async def main():
+        pool = InferencePool(max_workers=1, max_pending=1)
+        try:
+            running = asyncio.create_task(pool.run(release.wait))
+            await asyncio.sleep(0.01)
+            assert pool.pending == 1
+            with pytest.raises(ServiceOverloadedError):
+                await pool.run(lambda: "rejected")
+
+            waiting = asyncio.create_task(pool.run(lambda: "waited", wait=True))
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+            release.set()
+            return await asyncio.wait_for(asyncio.gather(running, waiting), timeout=1)
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(main()) == [True, "waited"]
+
+
+def test_waiting_callers_run_in_arrival_order():
+    order = []
+    release = threading.Event()
+
+    async def main():
+        pool = InferencePool(max_workers=1, max_pending=1)
+        try:
+            first = asyncio.create_task(pool.run(release.wait))
+            await asyncio.sleep(0.01)
+            waiters = [asyncio.create_task(pool.run(order.append, i, wait=True)) for i in range(4)]
+            await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.wait_for(asyncio.gather(first, *waiters), timeout=1)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3]
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def scrape(client: TestClient) -> dict:
+    """Samples from /metrics as ``{(name, sorted label items): value}``."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def value(samples: dict, name: str, **labels) -> float:
+    return samples.get((name, tuple(sorted(labels.items()))), 0.0)
+
+
+def test_request_and_stage_metrics_after_an_embedding(api):
+    with TestClient(api.app) as client:
+        before = scrape(client)
+        assert client.post("/embed/", json={"text": "printer on floor three is offline"}).status_code == 200
+        assert client.get("/no/such/route").status_code == 404
+        after = scrape(client)
+
+    def delta(name, **labels):
+        return value(after, name, **labels) - value(before, name, **labels)
+
+    # Middleware: requests counted and timed by route template and status
+    assert delta("embedding_http_requests_total", method="POST", route="/embed/", status="200") == 1
+    assert delta("embedding_http_requests_total", method="GET", route="unmatched", status="404") == 1
+    assert delta("embedding_http_request_duration_seconds_count", method="POST", route="/embed/") == 1
+    assert delta("embedding_http_request_duration_seconds_bucket", method="POST", route="/embed/", le="+Inf") == 1
+    assert delta("embedding_http_request_duration_seconds_sum", method="POST", route="/embed/") > 0
+
+    # Handler and model stages
+    for stage in ("validation", "queue_wait", "tokenize", "inference", "serialization"):
+        assert delta("embedding_stage_duration_seconds_count", stage=stage) == 1, stage
+    assert delta("embedding_batch_size_count") == 1
+    assert delta("embedding_texts_total", source="model") == 1
+    assert ("embedding_queue_depth", ()) in after
+    assert ("embedding_inference_pending", ()) in after
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from src.config.settings import settings
+from src.services import embedding_service
+from src.services.inference_pool import ServiceOverloadedError
+from src.services.model_registry import ModelRegistry
+
+
+class FakeTensor:
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+    def numel(self) -> int:
+        return self.nbytes
+
+    def element_size(self) -> int:
+        return 1
+
+
+class FakeModel:
+    """Stands in for a SentenceTransformer of a given size; ``gate`` holds encodes until set."""
+
+    def __init__(self, name: str, nbytes: int, gate: threading.Event):
+        self.name = name
+        self.nbytes = nbytes
+        self.gate = gate
+        self.encoding = threading.Event()
+
+    def parameters(self):
+        return [FakeTensor(self.nbytes)]
+
+    def buffers(self):
+        return []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.encoding.set()
+        self.gate.wait(5)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class FakeBackend:
+    name = "torch"
+
+    def __init__(self):
+        self.loads = []
+        self.models = {}
+        self.gates = {}
+
+    def gate(self, model_name: str) -> threading.Event:
+        if model_name not in self.gates:
+            self.gates[model_name] = threading.Event()
+            self.gates[model_name].set()
+        return self.gates[model_name]
+
+    def load(self, model_name: str) -> FakeModel:
+        self.loads.append(model_name)
+        self.models[model_name] = FakeModel(model_name, 100, self.gate(model_name))
+        return self.models[model_name]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(embedding_service, "create_backend", lambda name, config: backend)
+    monkeypatch.setattr(settings, "embedding_cache_max_bytes", 0)
+    monkeypatch.setattr(settings, "embedding_cache_path", None)
+    return backend
+
+
+def make_registry(**kwargs) -> ModelRegistry:
+    return ModelRegistry(default_model="org/a", available_models=["org/b", "org/c"], **kwargs)
+
+
+def test_models_load_on_first_use(backend):
+    registry = make_registry(memory_budget_bytes=1000)
+
+    async def run():
+        service = registry.get("org/b")
+        assert not service.is_loaded and backend.loads == []
+        await registry.get("org/b").generate_embeddings(["hello"])
+        await registry.get("org/b").generate_embeddings(["again"])
+        await registry.close()
+        return service
+
+    service = asyncio.run(run())
+    assert service.is_loaded
+    assert backend.loads == ["org/b"]
+    assert registry.loaded_bytes == 100
+
+
+def test_least_recently_used_model_is_unloaded_over_budget(backend):
+    registry = make_registry(memory_budget_bytes=250)
+
+    async def use(name):
+        await registry.get(name).generate_embeddings([name])
+        # Enforcement is scheduled onto the loop by the inference thread that loaded the model
+        await asyncio.sleep(0)
+
+    async def run():
+        await use("org/a")
+        await use("org/b")
+        assert registry.loaded_bytes == 200
+        await use("org/c")
+        loaded_after_c = [name for name in registry.available_models if registry._services[name].is_loaded]
+        registry.get("org/b")
+        await use("org/a")
+        loaded_after_a = [name for name in registry.available_models if registry._services[name].is_loaded]
+        await registry.close()
+        return loaded_after_c, loaded_after_a
+
+    loaded_after_c, loaded_after_a = asyncio.run(run())
+    assert loaded_after_c == ["org/b", "org/c"]
+    # org/b was used more recently than org/c, so org/c goes when org/a comes back
+    assert loaded_after_a == ["org/a", "org/b"]
+    assert backend.loads == ["org/a", "org/b", "org/c", "org/a"]
+
+
+def test_budget_is_enforced_on_the_event_loop(backend):
+    registry = make_registry(memory_budget_bytes=150)
+    enforced_on = []
+    enforce = registry.enforce_memory_budget
+
+    def record(keep=None):
+        enforced_on.append((threading.current_thread(), keep))
+        return enforce(keep)
+
+    registry.enforce_memory_budget = record
+
+    async def run():
+        await registry.get("org/a").generate_embeddings(["a"])
+        await registry.get("org/b").generate_embeddings(["b"])
+        await asyncio.sleep(0)
+        await registry.close()
+
+    asyncio.run(run())
+    assert enforced_on == [(threading.main_thread(), "org/a"), (threading.main_thread(), "org/b")]
+    assert not registry.get("org/a").is_loaded
+    assert registry.get("org/b").is_loaded
+
+
+def test_busy_models_are_not_unloaded(backend):
+    registry = make_registry(memory_budget_bytes=150)
+
+    async def run():
+        await registry.get("org/a").generate_embeddings(["a"])
+        backend.gate("org/a").clear()
+        busy = asyncio.ensure_future(registry.get("org/a").generate_embeddings(["busy"]))
+        while not backend.models["org/a"].encoding.is_set():
+            await asyncio.sleep(0.01)
+
+        # Loading org/b goes over budget, but org/a is mid-batch and stays loaded
+        await registry.get("org/b").generate_embeddings(["b"])
+        await asyncio.sleep(0)
+        assert registry.loaded_bytes == 200
+
+        backend.gate("org/a").set()
+        await busy
+        assert registry.enforce_memory_budget() == ["org/a"]
+        await registry.close()
+
+    asyncio.run(run())
+
+
+def test_each_model_has_its_own_concurrency_limit(backend):
+    registry = make_registry(memory_budget_bytes=1000, max_concurrency=1)
+
+    async def run():
+        await registry.get("org/a").generate_embeddings(["warm"])
+        backend.gate("org/a").clear()
+        first = asyncio.ensure_future(registry.get("org/a").generate_embeddings(["first"]))
+        while registry.get("org/a").is_idle:
+            await asyncio.sleep(0.01)
+
+        # org/a's only slot is taken, so another batch for it is turned away...
+        with pytest.raises(ServiceOverloadedError):
+            await registry.get("org/a").generate_embeddings(["second"])
+        # ...while org/b still has its own
+        await registry.get("org/b").generate_embeddings(["other"])
+        backend.gate("org/a").set()
+        await first
+        await registry.close()
+
+    asyncio.run(run())
@@ -0,0 +1,15 @@
+import pytest
+from pydantic import ValidationError
+
+from src.models.search import SearchFilter, SearchRequest
+
+
+def test_filter_translates_to_a_metadata_filter():
+    search_filter = SearchFilter(source="a.pdf", page=[3, 4])
+    assert search_filter.to_metadata_filter() == {"source": "a.pdf", "page": {"$in": [3, 4]}}
+    assert SearchFilter().to_metadata_filter() == {}
+
+
+def test_filter_rejects_fields_that_are_not_stored():
+    with pytest.raises(ValidationError):
+        SearchRequest(query="printer", filter={"category": "hardware"})
@@ -0,0 +1,132 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from src.config.settings import settings
+from src.services.lexical_index import LEXICAL_INDEX_FILE, LexicalIndex
+from src.services.local_index import LocalIndex
+from src.services.search_service import LocalSearchBackend, SearchIndexUnavailableError, SearchService
+
+
+def unit_vectors(count: int, dimension: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def records(vectors: np.ndarray, start: int = 0) -> list:
+    return [
+        {"id": f"v{i}", "values": vectors[i], "metadata": {"chunk_text": f"chunk {i}"}}
+        for i in range(start, len(vectors))
+    ]
+
+
+def test_backend_follows_a_live_writer_without_touching_its_files(tmp_path):
+    vectors = unit_vectors(3000)
+    writer = LocalIndex(str(tmp_path))
+    writer.upsert(records(vectors[:10]))
+    backend = LocalSearchBackend(str(tmp_path), refresh_seconds=0)
+    assert backend.search(vectors[5], top_k=1)[0]["id"] == "v5"
+
+    writer.upsert(records(vectors, start=10))
+    # The header mtime is how the backend notices; make sure it moved
+    stat = os.stat(tmp_path / "index.json")
+    os.utime(tmp_path / "index.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    match = backend.search(vectors[2999], top_k=1)[0]
+    assert match["id"] == "v2999"
+    assert match["metadata"]["chunk_text"] == "chunk 2999"
+    assert backend.fetch_metadata(["v1", "missing"]) == {"v1": {"chunk_text": "chunk 1"}}
+
+    backend.close()
+    writer.close()
+    assert len(LocalIndex(str(tmp_path))) == 3000
+
+
+def test_missing_index_is_unavailable(tmp_path):
+    with pytest.raises(SearchIndexUnavailableError):
+        LocalSearchBackend(str(tmp_path / "nothing")).search(unit_vectors(1)[0], top_k=1)
+
+
+def test_unreadable_index_is_unavailable_and_a_bad_reopen_keeps_the_old_one(tmp_path):
+    vectors = unit_vectors(10)
+    writer = LocalIndex(str(tmp_path))
+    writer.upsert(records(vectors))
+    writer.close()
+    header = (tmp_path / "index.json").read_text()
+
+    backend = LocalSearchBackend(str(tmp_path), refresh_seconds=0)
+    assert len(backend.search(vectors[0], top_k=3)) == 3
+    (tmp_path / "index.json").write_text("{")
+    assert len(backend.search(vectors[0], top_k=3)) == 3
+
+    with pytest.raises(SearchIndexUnavailableError):
+        LocalSearchBackend(str(tmp_path)).search(vectors[0], top_k=3)
+    (tmp_path / "index.json").write_text(header)
+    assert LocalSearchBackend(str(tmp_path)).search(vectors[0], top_k=1)[0]["id"] == "v0"
+
+
+def hybrid_service(tmp_path, monkeypatch) -> SearchService:
+    """A local index of four chunks with its BM25 index, served from ``tmp_path``."""
+    texts = [
+        "Error E-102 means the paper tray is not seated",
+        "Error E-201 means the toner is low",
+        "Hold the power button to reset the network settings",
+        "The paper tray holds 250 sheets",
+    ]
+    vectors = unit_vectors(len(texts))
+    writer = LocalIndex(str(tmp_path))
+    writer.upsert([
+        {"id": f"v{i}", "values": vector, "metadata": {"chunk_text": text, "source": "b.pdf" if i == 3 else "a.pdf"}}
+        for i, (vector, text) in enumerate(zip(vectors, texts))
+    ])
+    writer.close()
+    lexical = LexicalIndex(os.path.join(str(tmp_path), LEXICAL_INDEX_FILE))
+    lexical.add([(f"v{i}", text) for i, text in enumerate(texts)])
+    # Lexical hits whose vectors are gone are dropped
+    lexical.add([("deleted", "E-102 on the old printer")])
+    lexical.close()
+    monkeypatch.setattr(settings, "search_index_path", str(tmp_path))
+    return SearchService(backend="local")
+
+
+def test_lexical_search_returns_stored_chunks_with_metadata(tmp_path, monkeypatch):
+    service = hybrid_service(tmp_path, monkeypatch)
+    results = asyncio.run(service.lexical_search("E-102", top_k=5))
+    assert results[0]["id"] == "v0"
+    assert "deleted" not in {result["id"] for result in results}
+    assert results[0]["metadata"]["chunk_text"].startswith("Error E-102")
+
+    results = asyncio.run(service.lexical_search("paper tray", top_k=5, filter={"source": "b.pdf"}))
+    assert [result["id"] for result in results] == ["v3"]
+    service.close()
+
+
+@pytest.mark.parametrize("prefilter", [False, True])
+def test_hybrid_search_fuses_both_rankings(tmp_path, monkeypatch, prefilter):
+    service = hybrid_service(tmp_path, monkeypatch)
+    vector = unit_vectors(4)[2]
+    results = asyncio.run(service.hybrid_search("paper tray", vector, top_k=4, prefilter=prefilter))
+
+    by_id = {result["id"]: result for result in results}
+    assert by_id["v0"]["lexical_score"] is not None and by_id["v0"]["vector_score"] is not None
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+    if prefilter:
+        assert set(by_id) == {"v0", "v3"}
+    else:
+        assert by_id["v2"]["lexical_score"] is None
+        assert results[0]["id"] in {"v0", "v2", "v3"}
+    service.close()
+
+
+def test_lexical_search_without_an_index_is_unavailable(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "search_index_path", str(tmp_path))
+    with pytest.raises(SearchIndexUnavailableError):
+        asyncio.run(SearchService(backend="local").lexical_search("printer"))
+
+
+def test_corrupt_lexical_index_is_unavailable(tmp_path, monkeypatch):
+    (tmp_path / LEXICAL_INDEX_FILE).write_bytes(b"not a database")
+    monkeypatch.setattr(settings, "search_index_path", str(tmp_path))
+    with pytest.raises(SearchIndexUnavailableError):
+        asyncio.run(SearchService(backend="local").lexical_search("printer"))
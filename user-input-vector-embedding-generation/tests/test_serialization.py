@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.api import serialization
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, serialization.JSON_MEDIA_TYPE),
+    ("*/*", serialization.JSON_MEDIA_TYPE),
+    ("application/octet-stream", serialization.BINARY_MEDIA_TYPE),
+    ("application/json, application/octet-stream", serialization.JSON_MEDIA_TYPE),
+    ("application/json;q=0.5, application/octet-stream", serialization.BINARY_MEDIA_TYPE),
+    ("application/x-msgpack", "application/msgpack"),
+    ("application/octet-stream;q=0, text/html", serialization.JSON_MEDIA_TYPE),
+])
+def test_negotiate_media_type(accept, expected):
+    assert serialization.negotiate_media_type(accept) == expected
+
+
+def test_float_dtypes_round_trip():
+    vector = np.array([0.25, -1.5, 3.0], dtype=np.float32)
+
+    payload, scale = serialization.encode_vector(vector, "float32")
+    assert scale is None
+    assert np.array_equal(np.frombuffer(payload, dtype="<f4"), vector)
+
+    payload, scale = serialization.encode_vector(vector, "float16")
+    assert scale is None
+    assert np.array_equal(np.frombuffer(payload, dtype="<f2").astype(np.float32), vector)
+
+
+def test_int8_round_trips_within_one_quantization_step():
+    vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+    payload, scale = serialization.encode_vector(vector, "int8")
+
+    decoded = np.frombuffer(payload, dtype="i1").astype(np.float32) * scale
+    assert len(payload) == 384
+    assert np.max(np.abs(decoded - vector)) <= scale / 2 + 1e-6
+
+
+def test_int8_of_a_zero_vector_has_a_usable_scale():
+    payload, scale = serialization.encode_vector(np.zeros(4, dtype=np.float32), "int8")
+    assert payload == bytes(4)
+    assert scale == 1.0
+
+
+def test_unknown_dtype_is_rejected():
+    with pytest.raises(ValueError):
+        serialization.encode_vector(np.zeros(4), "bfloat16")
+
+
+def test_binary_headers_carry_the_scale_only_for_int8():
+    headers = serialization.embedding_headers("model", 384, "int8", 12, 0.01)
+    assert headers["X-Embedding-Dimension"] == "384"
+    assert float(headers["X-Embedding-Scale"]) == 0.01
+    assert "X-Embedding-Scale" not in serialization.embedding_headers("model", 384, "float32", 12, None)
+
+
+def test_msgpack_body():
+    msgpack = pytest.importorskip("msgpack")
+    payload, scale = serialization.encode_vector(np.ones(3, dtype=np.float32), "int8")
+    body = msgpack.unpackb(serialization.pack_msgpack(payload, "model", 3, "int8", 5, scale), raw=False)
+    assert body["embedding"] == payload
+    assert body["dimension"] == 3
+    assert body["scale"] == scale
@@ -0,0 +1,20 @@
+import filecmp
+import os
+
+import pytest
+
+# Modules each project ships an identical copy of, since the two are deployed independently
+SHARED_MODULES = ["bucketing.py", "local_index.py", "lexical_index.py"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGESTION_SERVICE = os.path.join(os.path.dirname(ROOT), "ingestion-service")
+
+
+@pytest.mark.skipif(not os.path.isdir(INGESTION_SERVICE), reason="ingestion-service is not checked out alongside")
+@pytest.mark.parametrize("module", SHARED_MODULES)
+def test_shared_module_copies_match(module):
+    ours = os.path.join(ROOT, "src", "services", module)
+    theirs = os.path.join(INGESTION_SERVICE, module)
+    assert filecmp.cmp(ours, theirs, shallow=False), (
+        f"src/services/{module} and ingestion-service/{module} have diverged; copy the changes across"
+    )
@@ -0,0 +1,118 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.services.ticket_index import RebuildInProgressError, TicketIndex, TicketNotIndexedError
+
+
+def tickets(count: int, prefix: str = "t", seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        {"id": f"{prefix}{i}", "values": rng.standard_normal(16).tolist(), "metadata": {"status": "open"}}
+        for i in range(count)
+    ]
+
+
+def test_upsert_similar_and_delete(tmp_path):
+    index = TicketIndex(str(tmp_path / "tickets"))
+    records = tickets(30)
+    index.upsert(records)
+    index.upsert([{"id": "copy", "values": records[0]["values"], "metadata": {"status": "closed"}}])
+
+    matches = index.similar("t0", top_k=3)
+    assert len(matches) == 3
+    assert "t0" not in {match["id"] for match in matches}
+    assert matches[0]["id"] == "copy"
+    assert matches[0]["metadata"] == {"status": "closed"}
+
+    assert index.delete(["copy", "missing"]) == 1
+    assert len(index) == 30
+    with pytest.raises(TicketNotIndexedError):
+        index.similar("copy")
+    index.close()
+
+
+def test_upserts_never_train_the_live_index(tmp_path):
+    index = TicketIndex(str(tmp_path / "tickets"))
+    for start in range(0, 5000, 1000):
+        index.upsert(tickets(1000, prefix=f"b{start}-", seed=start))
+    assert index._current()._centroids is None
+    index.close()
+
+
+def test_rebuild_replays_writes_made_meanwhile(tmp_path):
+    index = TicketIndex(str(tmp_path / "tickets"))
+    index.upsert(tickets(5, prefix="old"))
+
+    staging = index.start_rebuild()
+    with pytest.raises(RebuildInProgressError):
+        index.start_rebuild()
+    staging.upsert(tickets(2000))
+    index.upsert(tickets(1, prefix="live", seed=1))
+    index.delete(["t7"])
+
+    assert index.finish_rebuild(staging) == 2000
+    assert index._current()._centroids is not None
+    assert len(index) == 2000
+    with pytest.raises(TicketNotIndexedError):
+        index.similar("old0")
+    with pytest.raises(TicketNotIndexedError):
+        index.similar("t7")
+    assert len(index.similar("live0", top_k=5)) == 5
+    assert not (tmp_path / "tickets.rebuild").exists()
+
+    # The next rebuild may start once this one is done
+    index.abort_rebuild(index.start_rebuild())
+    index.close()
+
+
+def test_aborted_rebuild_keeps_the_live_index(tmp_path):
+    index = TicketIndex(str(tmp_path / "tickets"))
+    index.upsert(tickets(10))
+    staging = index.start_rebuild()
+    staging.upsert(tickets(3, prefix="new"))
+
+    index.abort_rebuild(staging)
+    assert len(index) == 10
+    assert not (tmp_path / "tickets.rebuild").exists()
+    index.abort_rebuild(index.start_rebuild())
+    index.close()
+
+
+def test_similar_searches_outside_the_lock(tmp_path):
+    index = TicketIndex(str(tmp_path / "tickets"))
+    index.upsert(tickets(10))
+    live = index._current()
+    searching, release = threading.Event(), threading.Event()
+    search = live.search
+
+    def slow_search(*args, **kwargs):
+        searching.set()
+        release.wait(5)
+        return search(*args, **kwargs)
+
+    live.search = slow_search
+    results = []
+    lookup = threading.Thread(target=lambda: results.append(index.similar("t0", top_k=3)))
+    lookup.start()
+    assert searching.wait(5)
+
+    # Writes go ahead while the lookup is searching
+    index.upsert(tickets(1, prefix="new", seed=1))
+    assert len(index) == 11
+
+    # The swap waits for the lookup before closing the index it searches
+    staging = index.start_rebuild()
+    staging.upsert(tickets(5, prefix="next"))
+    rebuild = threading.Thread(target=index.finish_rebuild, args=(staging,))
+    rebuild.start()
+    rebuild.join(0.2)
+    assert rebuild.is_alive()
+
+    release.set()
+    lookup.join(5)
+    rebuild.join(5)
+    assert len(results[0]) == 3
+    assert len(index) == 5
+    index.close()